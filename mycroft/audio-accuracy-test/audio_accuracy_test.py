@@ -12,102 +12,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-import time
 import wave
 from glob import glob
 
 import os
-import pyee
 from os.path import dirname, join
-from speech_recognition import AudioSource
 
-from mycroft.client.speech.listener import RecognizerLoop
+from mycroft.client.speech.hotword_factory import HotWordFactory
 from mycroft.client.speech.mic import ResponsiveRecognizer
+from mycroft.client.speech.replay import ListenerReplay, ReplaySource
+from mycroft.configuration import ConfigurationManager
 
 
 def to_percent(val):
     return "{0:.2f}".format(100.0 * val) + "%"
 
 
-class FileStream(object):
-    MIN_S_TO_DEBUG = 5.0
-
-    # How long between printing debug info to screen
-    UPDATE_INTERVAL_S = 1.0
-
-    def __init__(self, file_name):
-        self.file = wave.open(file_name, 'rb')
-        self.size = self.file.getnframes()
-        self.sample_rate = self.file.getframerate()
-        self.sample_width = self.file.getsampwidth()
-        self.last_update_time = 0.0
-
-        self.total_s = self.size / self.sample_rate / self.sample_width
-        if self.total_s > self.MIN_S_TO_DEBUG:
-            self.debug = True
-        else:
-            self.debug = False
-
-    def calc_progress(self):
-        return float(self.file.tell()) / self.size
-
-    def read(self, chunk_size):
-
-        progress = self.calc_progress()
-        if progress == 1.0:
-            raise EOFError
-
-        if self.debug:
-            cur_time = time.time()
-            dt = cur_time - self.last_update_time
-            if dt > self.UPDATE_INTERVAL_S:
-                self.last_update_time = cur_time
-                print(to_percent(progress))
-
-        return self.file.readframes(chunk_size)
-
-    def close(self):
-        self.file.close()
-
-
-class FileMockMicrophone(AudioSource):
-    def __init__(self, file_name):
-        self.stream = FileStream(file_name)
-        self.SAMPLE_RATE = self.stream.sample_rate
-        self.SAMPLE_WIDTH = self.stream.sample_width
-        self.CHUNK = 1024
-
-    def close(self):
-        self.stream.close()
-
-
 class AudioTester(object):
     def __init__(self, samp_rate):
         print  # Pad debug messages
-        self.ww_recognizer = RecognizerLoop().create_mycroft_recognizer(
-            samp_rate, 'en-us')
+        config = ConfigurationManager.get()
+        self.ww_recognizer = HotWordFactory.create_hotword(
+            config.get('listener').get('wake_word'), lang=config.get('lang'))
         self.listener = ResponsiveRecognizer(self.ww_recognizer)
+        self.replay = ListenerReplay(self.listener)
         print
 
     def test_audio(self, file_name):
-        source = FileMockMicrophone(file_name)
-        ee = pyee.EventEmitter()
-
-        class SharedData:
-            times_found = 0
-
-        def on_found_wake_word():
-            SharedData.times_found += 1
-
-        ee.on('recognizer_loop:record_begin', on_found_wake_word)
-
-        try:
-            while True:
-                self.listener.listen(source, ee)
-        except EOFError:
-            pass
-
-        return SharedData.times_found
+        # Replayed faster than realtime through the real listener
+        source = ReplaySource.from_wav(file_name)
+        return len(self.replay.replay(source))
 
 
 class Color:
@@ -67,7 +67,7 @@ def handle_speak(event):
                           utterance)
         for chunk in chunks:
             try:
-                mute_and_speak(chunk)
+                mute_and_speak(chunk, event.context)
             except KeyboardInterrupt:
                 raise
             except:
@@ -75,15 +75,16 @@ def handle_speak(event):
             if _last_stop_signal > start or check_for_signal('buttonPress'):
                 break
     else:
-        mute_and_speak(utterance)
+        mute_and_speak(utterance, event.context)
 
 
-def mute_and_speak(utterance):
+def mute_and_speak(utterance, context=None):
     """
         Mute mic and start speaking the utterance using selected tts backend.
 
         Args:
             utterance: The sentence to be spoken
+            context: context of the speak message, carrying its trace
     """
     global tts_hash
 
@@ -101,6 +102,7 @@ def mute_and_speak(utterance):
 
     LOG.info("Speak: " + utterance)
     try:
+        tts.context = context
         tts.execute(utterance)
     finally:
         lock.release()
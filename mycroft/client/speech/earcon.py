@@ -0,0 +1,138 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Short system sounds played from memory
+
+Spawning a player and setting up an audio stream for every beep takes
+longer than the beep itself.  The sounds are decoded once and written to
+an output stream by a player thread.  The stream is opened for the first
+sound and kept open while sounds follow each other, so the beeps of a
+conversation start within a few milliseconds of being requested.  It is
+closed once idle, leaving the device to the other players.
+"""
+import wave
+from Queue import Queue, Empty
+from threading import Thread
+
+import pyaudio
+
+from mycroft.client.speech.reference import SAMPLE_WIDTH, convert_pcm
+from mycroft.util import resolve_resource_file
+from mycroft.util.log import LOG
+
+
+class EarconPlayer(Thread):
+    """Play the configured sounds on an output stream opened on demand.
+
+    Args:
+        sounds (dict): resource file of each sound, by name
+        sample_rate (int): sample rate of the output stream
+        device_index (int): output device, None for the default one
+        idle_sec (float): seconds without sounds before the stream is
+                          closed
+    """
+
+    def __init__(self, sounds, sample_rate=16000, device_index=None,
+                 idle_sec=10.0):
+        super(EarconPlayer, self).__init__()
+        self.daemon = True
+        self.sample_rate = sample_rate
+        self.device_index = device_index
+        self.idle_sec = idle_sec
+        self.sounds = {}
+        for name, resource in sounds.iteritems():
+            self.load(name, resource)
+        self.queue = Queue()
+        self.audio = None
+        self.stream = None
+        self.start()
+
+    def load(self, name, resource):
+        """ Decode a sound, it is then played by name. """
+        filename = resolve_resource_file(resource) if resource else None
+        if not filename:
+            LOG.warning('Sound ' + str(resource) + ' not found')
+            return
+        try:
+            wav = wave.open(filename, 'rb')
+            try:
+                self.sounds[name] = convert_pcm(
+                    wav.readframes(wav.getnframes()), wav.getframerate(),
+                    wav.getsampwidth(), wav.getnchannels(), self.sample_rate)
+            finally:
+                wav.close()
+        except (IOError, EOFError, wave.Error) as e:
+            LOG.warning('Could not load sound ' + filename + ': ' + repr(e))
+
+    def play(self, name):
+        """Start playing a sound.
+
+        Args:
+            name (str): name of the sound
+
+        Returns:
+            float: duration of the sound in seconds, 0 if it isn't loaded
+        """
+        frame_data = self.sounds.get(name)
+        if not frame_data:
+            return 0.0
+        self.queue.put(frame_data)
+        return float(len(frame_data)) / (SAMPLE_WIDTH * self.sample_rate)
+
+    def run(self):
+        while True:
+            try:
+                # Only times out while the stream is open
+                frame_data = self.queue.get(
+                    timeout=self.idle_sec if self.stream else None)
+            except Empty:
+                self._close()
+                continue
+            if frame_data is None:
+                break
+            try:
+                if not self.stream:
+                    self._open()
+                if self.stream:
+                    self.stream.write(frame_data)
+            except IOError as e:
+                LOG.warning('Could not play sound: ' + repr(e))
+                self._close()
+        self._close()
+
+    def _open(self):
+        try:
+            self.audio = pyaudio.PyAudio()
+            self.stream = self.audio.open(
+                format=pyaudio.paInt16, channels=1, rate=self.sample_rate,
+                output=True, output_device_index=self.device_index)
+        except Exception as e:
+            LOG.warning('Could not open sound output: ' + repr(e))
+            self._close()
+
+    def _close(self):
+        try:
+            if self.stream:
+                self.stream.close()
+            if self.audio:
+                self.audio.terminate()
+        except Exception as e:
+            LOG.warning('Could not close sound output: ' + repr(e))
+        self.stream = None
+        self.audio = None
+
+    def close(self):
+        """ Stop the player once the queued sounds are played. """
+        self.queue.put(None)
+        self.join()
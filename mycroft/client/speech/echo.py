@@ -0,0 +1,333 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Echo cancellation of the TTS output for barge-in
+
+While Mycroft speaks, the microphone hears the speaker.  The audio played
+is published by the audio process (see mycroft.client.speech.reference)
+and an adaptive filter learns the path from the speaker to the microphone,
+the estimated echo is subtracted from each chunk before the wake word
+gate.
+
+The reference is placed on the clock when the player starts, the audio is
+heard later by the output and input latencies.  This bulk delay is
+estimated by cross-correlating the microphone with the reference, the
+filter only covers the room after it.
+"""
+from collections import deque
+
+import os
+
+from mycroft.metrics.trace import monotonic
+from mycroft.client.speech.reference import ReferenceReader, get_reference_file
+from mycroft.util.log import LOG
+
+
+class EchoCanceller(object):
+    """Partitioned block frequency domain normalized LMS filter
+    (overlap-save).
+
+    The filter is made of blocks partitions as long as a block, it covers
+    echo paths up to blocks * block_size samples once the reference has
+    been aligned on the capture.  Adaptation is frozen during double talk,
+    detected when the microphone peak is louder than double_talk_ratio
+    times the recent reference peak, so the user's voice doesn't make the
+    filter diverge.
+
+    Args:
+        block_size (int): samples per block, the chunk size
+        step (float): adaptation step, 0 to 1
+        double_talk_ratio (float): see above
+        blocks (int): partitions of the filter
+    """
+
+    def __init__(self, block_size, step=0.2, double_talk_ratio=1.0,
+                 blocks=1):
+        # Echo canceller module imports
+        import numpy
+        self.np = numpy
+        self.block_size = block_size
+        self.step = step
+        self.double_talk_ratio = double_talk_ratio
+        self.blocks = blocks
+        self.reset()
+
+    def reset(self):
+        np = self.np
+        n = self.block_size
+        self.weights = np.zeros((self.blocks, n + 1), dtype=np.complex128)
+        # Spectra of the last blocks of reference, the newest first
+        self.spectra = np.zeros((self.blocks, n + 1), dtype=np.complex128)
+        self.power = np.zeros(n + 1)
+        self.previous = np.zeros(n)
+        self.reference_peak = 0.0
+
+    def clear(self):
+        """ Forget the audio played before, the echo path is kept. """
+        self.spectra[:] = 0
+        self.previous[:] = 0
+
+    def shift(self, samples):
+        """Move the echo path learnt to a new alignment of the reference.
+
+        Args:
+            samples (int): samples the reference is now read earlier by
+        """
+        np = self.np
+        n = self.block_size
+        path = np.fft.irfft(self.weights)[:, :n].reshape(-1)
+        if samples >= 0:
+            path = np.concatenate((path[samples:], np.zeros(samples)))
+        else:
+            path = np.concatenate((np.zeros(-samples), path[:samples]))
+        path = path[:self.blocks * n].reshape(self.blocks, n)
+        self.weights = np.fft.rfft(
+            np.concatenate((path, np.zeros((self.blocks, n))), axis=1))
+        self.clear()
+
+    def process(self, mic, reference):
+        """Remove the echo of the reference from the microphone audio.
+
+        Args:
+            mic (str): 16 bit PCM block captured
+            reference (str): 16 bit PCM block played, aligned on mic
+
+        Returns:
+            str: the microphone audio minus the estimated echo
+        """
+        np = self.np
+        n = self.block_size
+        near = np.frombuffer(mic, dtype=np.int16).astype(np.float64)
+        far = np.frombuffer(reference, dtype=np.int16).astype(np.float64)
+        if len(near) != n or len(far) != n:
+            raise ValueError('Blocks must have %d samples' % n)
+
+        spectrum = np.fft.rfft(np.concatenate((self.previous, far)))
+        self.previous = far
+        self.spectra = np.roll(self.spectra, 1, axis=0)
+        self.spectra[0] = spectrum
+        echo = np.fft.irfft(np.sum(self.spectra * self.weights,
+                                   axis=0))[n:]
+        error = near - echo
+
+        far_peak = np.max(np.abs(far))
+        self.reference_peak = max(far_peak, 0.9 * self.reference_peak)
+        double_talk = (np.max(np.abs(near)) >
+                       self.double_talk_ratio * self.reference_peak)
+        if far_peak > 0 and not double_talk:
+            self.power = 0.9 * self.power + 0.1 * np.abs(spectrum) ** 2
+            error_spectrum = np.fft.rfft(np.concatenate((np.zeros(n),
+                                                         error)))
+            # Every partition is normalized by the power of the reference,
+            # regularized so quiet bands don't get huge steps
+            power = self.power + 0.1 * np.mean(self.power) + 1e-6
+            gradient = np.fft.irfft(np.conj(self.spectra) * error_spectrum /
+                                    power)[:, :n]
+            self.weights += self.step * np.fft.rfft(
+                np.concatenate((gradient, np.zeros((self.blocks, n))),
+                               axis=1))
+
+        return np.clip(error, -32768, 32767).astype(np.int16).tostring()
+
+
+class EchoSuppressor(object):
+    """Cancel the echo of the TTS in the captured chunks.
+
+    Chunks captured while nothing was played go through untouched.  The
+    delay from playing to hearing starts at delay_sec, it is estimated
+    again every ESTIMATE_SEC while audio is played, searching up to
+    max_delay_sec.
+
+    Args:
+        config (dict): listener barge_in configuration
+        sample_rate (int): sample rate of the microphone
+        filename (str): reference channel, the default one if None
+    """
+
+    # Seconds between attempts to open the reference channel
+    RETRY_SEC = 5.0
+
+    # Seconds of microphone audio cross-correlated with the reference,
+    # also the time between two estimates of the delay
+    ESTIMATE_SEC = 1.0
+
+    # Height of the correlation peak, in standard deviations of the
+    # correlation, for the estimate to be trusted
+    MIN_PEAK_SCORE = 8.0
+
+    # Seconds of reference fed to the filter before the direct path, so its
+    # onset stays within the filter.  Estimates closer than this to the
+    # current delay are left to the filter.
+    DELAY_MARGIN_SEC = 0.01
+
+    # Seconds the capture times may jitter by, the reference read follows
+    # the samples captured as long as they agree within this
+    MAX_JITTER_SEC = 0.005
+
+    def __init__(self, config, sample_rate, filename=None):
+        self.config = config
+        self.sample_rate = sample_rate
+        self.filename = filename or get_reference_file()
+        # Seconds from writing audio to hearing it until estimated
+        self.delay_sec = config.get('delay_sec', 0.05)
+        self.max_delay_sec = config.get('max_delay_sec', 0.5)
+        self.step = config.get('step', 0.2)
+        self.double_talk_ratio = config.get('double_talk_ratio', 1.0)
+        self.filter_blocks = config.get('filter_blocks', 4)
+        self.reader = None
+        self.canceller = None
+        self.retry_at = 0.0
+        # Index past the reference read for the last chunk
+        self.reference_end = None
+        # Last chunks captured, contiguous, for the delay estimate
+        self.history = deque()
+        self.history_samples = 0
+        self.estimated_at = 0.0
+        # Echo canceller module imports, checked before barge-in is enabled
+        import numpy
+        self.np = numpy
+
+    def _get_reader(self, now):
+        if self.reader is None and now >= self.retry_at:
+            self.retry_at = now + self.RETRY_SEC
+            if os.path.exists(self.filename):
+                try:
+                    reader = ReferenceReader(self.filename)
+                except (IOError, OSError, ValueError) as e:
+                    LOG.warning('Can\'t read echo reference: ' + repr(e))
+                    return None
+                if reader.sample_rate != self.sample_rate:
+                    LOG.warning('Echo reference sample rate differs from '
+                                'the microphone\'s, not cancelling echo')
+                    reader.close()
+                    return None
+                self.reader = reader
+        return self.reader
+
+    def _add_history(self, chunk, captured_at):
+        num_samples = len(chunk) / 2
+        if self.history:
+            expected = (self.history[-1][0] +
+                        float(num_samples) / self.sample_rate)
+            if abs(captured_at - expected) * self.sample_rate > num_samples:
+                # Audio was lost, the chunks don't follow each other
+                self.history.clear()
+                self.history_samples = 0
+        self.history.append((captured_at, chunk))
+        self.history_samples += num_samples
+        window = int(self.ESTIMATE_SEC * self.sample_rate)
+        while self.history_samples - len(self.history[0][1]) / 2 >= window:
+            self.history_samples -= len(self.history.popleft()[1]) / 2
+
+    def estimate_delay(self, reader, captured_at):
+        """Find the delay of the echo in the last chunks captured.
+
+        The generalized cross-correlation with phase transform (GCC-PHAT)
+        of the microphone and the reference peaks at the delay, whatever
+        the spectrum of the audio played.
+
+        Args:
+            reader (ReferenceReader): the reference channel
+            captured_at (float): monotonic time the last chunk ended
+
+        Returns:
+            float: seconds from playing to hearing, None if unsure
+        """
+        np = self.np
+        mic = np.frombuffer(''.join(chunk for _, chunk in self.history),
+                            dtype=np.int16).astype(np.float64)
+        max_lag = int(self.max_delay_sec * self.sample_rate)
+        start = reader.index(captured_at) - len(mic) - max_lag
+        reference = np.frombuffer(reader.read(start, len(mic) + max_lag),
+                                  dtype=np.int16).astype(np.float64)
+        # Long enough for the correlation not to wrap around
+        size = 1 << int(np.ceil(np.log2(len(mic) + len(reference))))
+        cross = (np.conj(np.fft.rfft(mic, size)) *
+                 np.fft.rfft(reference, size))
+        correlation = np.fft.irfft(cross / (np.abs(cross) + 1e-10),
+                                   size)[:max_lag + 1]
+        # Lag of the reference ahead of the microphone audio
+        best = np.argmax(correlation)
+        score = ((correlation[best] - np.mean(correlation)) /
+                 (np.std(correlation) + 1e-10))
+        if score < self.MIN_PEAK_SCORE:
+            return None
+        return float(max_lag - best) / self.sample_rate
+
+    def _update_delay(self, reader, captured_at):
+        self.estimated_at = captured_at
+        delay = self.estimate_delay(reader, captured_at)
+        if delay is None:
+            return
+        delay = max(0.0, delay - self.DELAY_MARGIN_SEC)
+        if abs(delay - self.delay_sec) > self.DELAY_MARGIN_SEC:
+            LOG.debug('Echo delay: %.3f seconds' % delay)
+            if self.canceller:
+                # Keeps the part of the echo path learnt the filter covers
+                self.canceller.shift(int(round(
+                    (delay - self.delay_sec) * self.sample_rate)))
+            self.delay_sec = delay
+
+    def process(self, chunk, captured_at=None):
+        """Cancel the echo in a chunk.
+
+        Args:
+            chunk (str): 16 bit PCM captured
+            captured_at (float): monotonic time the capture of the chunk
+                                 ended, now if None
+
+        Returns:
+            str: the chunk without the echo
+        """
+        if captured_at is None:
+            captured_at = monotonic()
+        reader = self._get_reader(captured_at)
+        if not reader:
+            return chunk
+        num_samples = len(chunk) / 2
+        if self.max_delay_sec > 0:
+            self._add_history(chunk, captured_at)
+            window = int(self.ESTIMATE_SEC * self.sample_rate)
+            now = reader.index(captured_at)
+            max_lag = int(self.max_delay_sec * self.sample_rate)
+            if (captured_at - self.estimated_at >= self.ESTIMATE_SEC and
+                    self.history_samples >= window and
+                    reader.is_active(now - window - max_lag, now)):
+                self._update_delay(reader, captured_at)
+        end = reader.index(captured_at - self.delay_sec)
+        if (self.reference_end is not None and abs(
+                end - self.reference_end - num_samples) <=
+                self.MAX_JITTER_SEC * self.sample_rate):
+            end = self.reference_end + num_samples
+        elif self.canceller:
+            # Out of sync, the audio played before doesn't follow
+            self.canceller.clear()
+        self.reference_end = end
+        start = end - num_samples
+        if not reader.is_active(start - self.filter_blocks * num_samples,
+                                end):
+            if self.canceller:
+                # The echo path is kept, the audio played before isn't
+                self.canceller.clear()
+            return chunk
+        if not self.canceller or self.canceller.block_size != num_samples:
+            self.canceller = EchoCanceller(num_samples, self.step,
+                                           self.double_talk_ratio,
+                                           self.filter_blocks)
+        return self.canceller.process(chunk, reader.read(start, num_samples))
+
+    def close(self):
+        if self.reader:
+            self.reader.close()
+            self.reader = None
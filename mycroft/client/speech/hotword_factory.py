@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import json
 import tempfile
 import time
+from threading import Lock
 
 import os
 from os.path import dirname, exists, join, abspath
@@ -36,65 +38,388 @@ class HotWordEngine(object):
             config = config.get(self.key_phrase, {})
         self.config = config
         self.listener_config = ConfigurationManager.get().get("listener", {})
+        # Engines able to decode continuously set this and implement update()
+        self.streaming = False
 
     def found_wake_word(self, frame_data):
         return False
 
+    def update(self, chunk):
+        """Feed newly captured audio to a streaming engine.
 
-class PocketsphinxHotWord(HotWordEngine):
-    def __init__(self, key_phrase="hey mycroft", config=None, lang="en-us"):
-        super(PocketsphinxHotWord, self).__init__(key_phrase, config, lang)
-        # Hotword module imports
-        from pocketsphinx import Decoder
-        # Hotword module config
-        module = self.config.get("module")
-        if module != "pocketsphinx":
-            LOG.warning(
-                str(module) + " module does not match with "
-                              "Hotword class pocketsphinx")
-        # Hotword module params
-        self.phonemes = self.config.get("phonemes", "HH EY . M AY K R AO F T")
-        self.num_phonemes = len(self.phonemes.split())
-        self.threshold = self.config.get("threshold", 1e-90)
-        self.sample_rate = self.listener_config.get("sample_rate", 1600)
-        dict_name = self.create_dict(key_phrase, self.phonemes)
-        config = self.create_config(dict_name, Decoder.default_config())
-        self.decoder = Decoder(config)
+        Args:
+            chunk (str): audio captured since the previous call
+
+        Returns:
+            bool: True if the wake word was spotted
+        """
+        return False
+
+    def reset(self):
+        """ Drop any audio buffered by a streaming engine. """
+        pass
+
+    def close(self):
+        """ Release what the engine holds, it is no longer used. """
+        pass
+
+    def is_recognized(self, frame_data, metrics=None):
+        return self.found_wake_word(frame_data)
+
+    def find_wake_word_segment(self, frame_data):
+        """Locate the wake word in a clip.
+
+        Args:
+            frame_data (str): raw audio
+
+        Returns:
+            tuple: (start, end) in seconds, None if the wake word was not
+                   found or the engine can't tell where it is
+        """
+        return None
+
+
+class KeyphraseSpotter(object):
+    """Pocketsphinx decoder spotting several keyphrases in one pass.
 
-    def create_dict(self, key_phrase, phonemes):
+    The acoustic model is loaded once per language and sample rate.  Every
+    registered keyphrase is listed in a kws file with its own threshold and
+    the decoder reports which of them were heard.  Use get() to obtain the
+    instance shared by all hotword engines, each engine removes its
+    keyphrase when it is closed.
+
+    Complete clips are decoded by the shared decoder, each streaming
+    engine gets its own utterance and decoder from stream().
+
+    Args:
+        lang (str): language of the acoustic model
+        sample_rate (int): sample rate of the audio to decode
+    """
+    _instances = {}
+    _instances_lock = Lock()
+
+    def __init__(self, lang, sample_rate):
+        self.lang = lang
+        self.sample_rate = sample_rate
+        self.keyphrases = {}
+        # Engines registering each keyphrase
+        self.users = {}
+        self.decoder = None
+        self.lock = Lock()
+        # Changed with the keyphrases, the streams then rebuild their
+        # decoder
+        self.version = 0
+
+    @staticmethod
+    def get(lang, sample_rate):
+        with KeyphraseSpotter._instances_lock:
+            key = (lang, sample_rate)
+            if key not in KeyphraseSpotter._instances:
+                KeyphraseSpotter._instances[key] = KeyphraseSpotter(
+                    lang, sample_rate)
+            return KeyphraseSpotter._instances[key]
+
+    def add_keyphrase(self, key_phrase, phonemes, threshold):
+        """Register a keyphrase, the decoders are rebuilt on next use.
+
+        Args:
+            key_phrase (str): words of the keyphrase
+            phonemes (str): phonemes of each word, words separated by '.'
+            threshold (float): detection threshold of this keyphrase
+        """
+        with self.lock:
+            self.users[key_phrase] = self.users.get(key_phrase, 0) + 1
+            if self.keyphrases.get(key_phrase) == (phonemes, threshold):
+                return
+            self.keyphrases[key_phrase] = (phonemes, threshold)
+            self.decoder = None
+            self.version += 1
+
+    def remove_keyphrase(self, key_phrase):
+        """Unregister a keyphrase once no engine uses it any more.
+
+        Args:
+            key_phrase (str): words of the keyphrase
+        """
+        with self.lock:
+            users = self.users.get(key_phrase, 0) - 1
+            if users > 0:
+                self.users[key_phrase] = users
+                return
+            self.users.pop(key_phrase, None)
+            if self.keyphrases.pop(key_phrase, None):
+                self.decoder = None
+                self.version += 1
+
+    def create_dict(self):
         (fd, file_name) = tempfile.mkstemp()
-        words = key_phrase.split()
-        phoneme_groups = phonemes.split('.')
         with os.fdopen(fd, 'w') as f:
-            for word, phoneme in zip(words, phoneme_groups):
-                f.write(word + ' ' + phoneme + '\n')
+            written = set()
+            for key_phrase, (phonemes, _) in self.keyphrases.items():
+                words = key_phrase.split()
+                phoneme_groups = phonemes.split('.')
+                for word, phoneme in zip(words, phoneme_groups):
+                    if word not in written:
+                        f.write(word + ' ' + phoneme + '\n')
+                        written.add(word)
         return file_name
 
-    def create_config(self, dict_name, config):
+    def create_kws_list(self):
+        (fd, file_name) = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            for key_phrase, (_, threshold) in self.keyphrases.items():
+                f.write('%s /%s/\n' % (key_phrase, repr(float(threshold))))
+        return file_name
+
+    def create_config(self, dict_name, kws_name, config):
         model_file = join(RECOGNIZER_DIR, 'model', self.lang, 'hmm')
         if not exists(model_file):
             LOG.error('PocketSphinx model not found at ' + str(model_file))
         config.set_string('-hmm', model_file)
         config.set_string('-dict', dict_name)
-        config.set_string('-keyphrase', self.key_phrase)
-        config.set_float('-kws_threshold', float(self.threshold))
+        config.set_string('-kws', kws_name)
         config.set_float('-samprate', self.sample_rate)
         config.set_int('-nfft', 2048)
         config.set_string('-logfn', '/dev/null')
         return config
 
+    def create_decoder(self):
+        """Load a decoder for the registered keyphrases.
+
+        Must be called with the lock held.
+        """
+        # Hotword module imports
+        from pocketsphinx import Decoder
+        LOG.info("Loading keyphrase decoder for: " +
+                 ", ".join(self.keyphrases))
+        dict_name = self.create_dict()
+        kws_name = self.create_kws_list()
+        config = self.create_config(dict_name, kws_name,
+                                    Decoder.default_config())
+        try:
+            return Decoder(config)
+        finally:
+            os.remove(dict_name)
+            os.remove(kws_name)
+
+    def _get_decoder(self):
+        if not self.decoder:
+            self.decoder = self.create_decoder()
+        return self.decoder
+
+    def _decode(self, byte_data, full_utt=False):
+        # Must be called with the lock held
+        decoder = self._get_decoder()
+        decoder.start_utt()
+        decoder.process_raw(byte_data, False, full_utt)
+        decoder.end_utt()
+        return decoder
+
+    def transcribe(self, byte_data):
+        with self.lock:
+            return self._decode(byte_data).hyp()
+
+    def find_segments(self, frame_data):
+        """Decode a complete clip and locate the keyphrases.
+
+        Args:
+            frame_data (str): raw audio
+
+        Returns:
+            list: (keyphrase, start, end) of each keyphrase heard, times
+                  in seconds from the start of the clip
+        """
+        with self.lock:
+            decoder = self._decode(frame_data, True)
+            frame_rate = float(decoder.get_config().get_int('-frate'))
+            return [(keyphrase_of(seg), seg.start_frame / frame_rate,
+                     (seg.end_frame + 1) / frame_rate)
+                    for seg in decoder.seg()
+                    if keyphrase_of(seg) in self.keyphrases]
+
+    def find_keyphrases(self, frame_data):
+        """Decode a complete clip.
+
+        Args:
+            frame_data (str): raw audio
+
+        Returns:
+            list: the registered keyphrases heard in the audio
+        """
+        with self.lock:
+            return found_keyphrases(self._decode(frame_data),
+                                    self.keyphrases)
+
+    def stream(self):
+        """Start a continuously decoded utterance.
+
+        Returns:
+            KeyphraseStream: decoding audio as it is captured
+        """
+        return KeyphraseStream(self)
+
+
+def keyphrase_of(seg):
+    """ The words of a decoder segment, as the keyphrases are registered. """
+    return seg.word.strip().lower()
+
+
+def found_keyphrases(decoder, keyphrases):
+    """The keyphrases detected in the utterance of a decoder.
+
+    Each detection is a segment holding the whole keyphrase, so a
+    keyphrase is never reported because it is part of a longer one.
+    """
+    detected = set(keyphrase_of(seg) for seg in decoder.seg())
+    return [k for k in keyphrases if k in detected]
+
+
+class KeyphraseStream(object):
+    """Utterance of a streaming hotword engine, decoded as it is captured.
+
+    The stream has its own decoder for the keyphrases of the spotter, so
+    clips decoded by other engines or threads never end its utterance.
+
+    Args:
+        spotter (KeyphraseSpotter): the keyphrases to spot
+    """
+    # Restart the utterance after this much silence
+    SILENCE_SEC = 3.0
+
+    # Upper bound on the length of an utterance
+    MAX_SEC = 60.0
+
+    def __init__(self, spotter):
+        self.spotter = spotter
+        self.decoder = None
+        self.keyphrases = {}
+        self.version = None
+        self.lock = Lock()
+
+        self.in_utterance = False
+        self.utterance_sec = 0.0
+        self.silence_sec = 0.0
+
+    def _get_decoder(self):
+        spotter = self.spotter
+        with spotter.lock:
+            if self.version != spotter.version:
+                self._end_utterance()
+                self.decoder = spotter.create_decoder()
+                self.keyphrases = dict(spotter.keyphrases)
+                self.version = spotter.version
+        return self.decoder
+
+    def _end_utterance(self):
+        if self.in_utterance:
+            self.decoder.end_utt()
+            self.in_utterance = False
+
+    def update(self, chunk):
+        """Decode only new audio in a continuously open utterance.
+
+        Keyphrases are reported as soon as the decoder spots them.  The
+        utterance is restarted after a detection or a long silence.
+
+        Args:
+            chunk (str): audio captured since the previous call
+
+        Returns:
+            list: the registered keyphrases just heard
+        """
+        with self.lock:
+            decoder = self._get_decoder()
+            if not self.in_utterance:
+                decoder.start_utt()
+                self.in_utterance = True
+                self.utterance_sec = 0.0
+                self.silence_sec = 0.0
+
+            decoder.process_raw(chunk, False, False)
+            found = found_keyphrases(decoder, self.keyphrases)
+            if found:
+                self._end_utterance()
+                return found
+
+            chunk_sec = len(chunk) / (2.0 * self.spotter.sample_rate)
+            self.utterance_sec += chunk_sec
+            if decoder.get_in_speech():
+                self.silence_sec = 0.0
+            else:
+                self.silence_sec += chunk_sec
+            if (self.silence_sec > self.SILENCE_SEC or
+                    self.utterance_sec > self.MAX_SEC):
+                self._end_utterance()
+            return []
+
+    def reset(self):
+        with self.lock:
+            self._end_utterance()
+
+
+class PocketsphinxHotWord(HotWordEngine):
+    def __init__(self, key_phrase="hey mycroft", config=None, lang="en-us"):
+        super(PocketsphinxHotWord, self).__init__(key_phrase, config, lang)
+        # Hotword module config
+        module = self.config.get("module")
+        if module != "pocketsphinx":
+            LOG.warning(
+                str(module) + " module does not match with "
+                              "Hotword class pocketsphinx")
+        # Hotword module params
+        self.phonemes = self.config.get("phonemes", "HH EY . M AY K R AO F T")
+        self.num_phonemes = len(self.phonemes.split())
+        self.threshold = self.config.get("threshold", 1e-90)
+        self.sample_rate = self.listener_config.get("sample_rate", 1600)
+        # All pocketsphinx hotwords share one decoder for clips
+        self.spotter = KeyphraseSpotter.get(self.lang, self.sample_rate)
+        self.spotter.add_keyphrase(self.key_phrase, self.phonemes,
+                                   self.threshold)
+        self.registered = True
+        self.streaming = self.config.get("streaming", False)
+        # Utterance decoded by update(), created on first use
+        self.stream = None
+
     def transcribe(self, byte_data, metrics=None):
         start = time.time()
-        self.decoder.start_utt()
-        self.decoder.process_raw(byte_data, False, False)
-        self.decoder.end_utt()
+        hyp = self.spotter.transcribe(byte_data)
         if metrics:
             metrics.timer("mycroft.stt.local.time_s", time.time() - start)
-        return self.decoder.hyp()
+        return hyp
 
     def found_wake_word(self, frame_data):
-        hyp = self.transcribe(frame_data)
-        return hyp and self.key_phrase in hyp.hypstr.lower()
+        if not self.registered:
+            return False
+        return self.key_phrase in self.spotter.find_keyphrases(frame_data)
+
+    def update(self, chunk):
+        if not self.registered:
+            # Closed while its source was still feeding it
+            return False
+        if not self.stream:
+            self.stream = self.spotter.stream()
+        return self.key_phrase in self.stream.update(chunk)
+
+    def find_wake_word_segment(self, frame_data):
+        if not self.registered:
+            return None
+        for key_phrase, start, end in self.spotter.find_segments(frame_data):
+            if key_phrase == self.key_phrase:
+                return start, end
+        return None
+
+    def reset(self):
+        if self.stream:
+            self.stream.reset()
+
+    def close(self):
+        if self.registered:
+            self.registered = False
+            self.spotter.remove_keyphrase(self.key_phrase)
+            if self.stream:
+                self.stream.reset()
+            # A closed engine is not handed out again
+            HotWordFactory.forget(self)
 
 
 class SnowboyHotWord(HotWordEngine):
@@ -129,12 +454,41 @@ class HotWordFactory(object):
         "snowboy": SnowboyHotWord
     }
 
+    # Engines already created, shared by everybody asking for the same one
+    engines = {}
+
     @staticmethod
-    def create_hotword(hotword="hey mycroft", config=None, lang="en-us"):
-        LOG.info("creating " + hotword)
+    def create_hotword(hotword="hey mycroft", config=None, lang="en-us",
+                       shared=True):
+        """Get the engine of a hotword.
+
+        Args:
+            hotword (str): the hotword
+            config (dict): hotwords configuration, None for the current one
+            lang (str): language of the hotword
+            shared (bool): False for a new engine, e.g. one keeping the
+                           streaming state of a capture source
+
+        Returns:
+            HotWordEngine: the engine
+        """
         if not config:
             config = ConfigurationManager.get().get("hotwords", {})
         module = config.get(hotword).get("module", "pocketsphinx")
         config = config.get(hotword, {"module": module})
-        clazz = HotWordFactory.CLASSES.get(module)
-        return clazz(hotword, config, lang=lang)
+        key = (hotword, lang, json.dumps(config, sort_keys=True))
+        if not shared or key not in HotWordFactory.engines:
+            LOG.info("creating " + hotword)
+            clazz = HotWordFactory.CLASSES.get(module)
+            engine = clazz(hotword, config, lang=lang)
+            if not shared:
+                return engine
+            HotWordFactory.engines[key] = engine
+        return HotWordFactory.engines[key]
+
+    @staticmethod
+    def forget(engine):
+        """ Stop sharing an engine, the next one asked for is new. """
+        for key, shared in HotWordFactory.engines.items():
+            if shared is engine:
+                del HotWordFactory.engines[key]
@@ -0,0 +1,241 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Hotword decoders running in worker processes
+
+Decoding holds the interpreter lock, so with several capture sources one
+process can only use one core for the wake word.  The pool runs the
+decoders in worker processes instead.  Each engine, one per capture
+source, stays on the worker it was created on.  Only the newly captured
+audio is sent to it, the worker keeps the decoding state of the source
+between chunks.
+"""
+import signal
+from itertools import count
+from multiprocessing import Pipe, Process, cpu_count
+from threading import Lock
+
+from mycroft.client.speech.hotword_factory import HotWordEngine, \
+    HotWordFactory
+from mycroft.client.speech.mic import ResponsiveRecognizer
+from mycroft.configuration import ConfigurationManager
+from mycroft.util.log import LOG
+
+
+class WindowedEngine(object):
+    """Streaming adapter for an engine decoding clips.
+
+    Keeps the last seconds of audio of one source and decodes them every
+    SEC_BETWEEN_WW_CHECKS, as the listener does for such engines.
+
+    Args:
+        engine (HotWordEngine): engine implementing found_wake_word()
+        sample_rate (int): samples per second of the 16 bit audio
+        phoneme_duration (int): milliseconds per phoneme of the wake word
+    """
+
+    def __init__(self, engine, sample_rate, phoneme_duration):
+        self.engine = engine
+        bytes_per_sec = sample_rate * 2
+        window_sec = int(engine.num_phonemes * phoneme_duration / 1000.0)
+        self.window_size = window_sec * bytes_per_sec
+        self.check_size = int(ResponsiveRecognizer.SEC_BETWEEN_WW_CHECKS *
+                              bytes_per_sec)
+        self.silence = '\0' * int(ResponsiveRecognizer.SILENCE_SEC *
+                                  bytes_per_sec)
+        self.window = None
+        self.unchecked = 0
+        self.reset()
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    def update(self, chunk):
+        window = self.window + chunk
+        self.window = window[max(0, len(window) - self.window_size):]
+        self.unchecked += len(chunk)
+        if self.unchecked < self.check_size:
+            return False
+        self.unchecked = 0
+        return self.engine.found_wake_word(self.window + self.silence)
+
+    def reset(self):
+        self.window = '\0' * self.window_size
+        self.unchecked = 0
+
+
+def _create_engine(hotword, config, lang, sample_rate, phoneme_duration):
+    # Not shared, the engine keeps the state of one source
+    engine = HotWordFactory.create_hotword(hotword, config, lang,
+                                           shared=False)
+    if not engine.streaming:
+        engine = WindowedEngine(engine, sample_rate, phoneme_duration)
+    return engine
+
+
+def _handle(engines, engine_id, method, args):
+    """Run a request of the voice process.
+
+    Args:
+        engines (dict): engines of this worker, by id
+        engine_id (int): engine the request is for
+        method (str): "create", "close" or a method of the engine
+        args (tuple): arguments of the method
+
+    Returns:
+        the number of phonemes for "create", else the result of the method,
+        None for engines already closed
+    """
+    if method == 'create':
+        engines[engine_id] = _create_engine(*args)
+        return engines[engine_id].num_phonemes
+    if method == 'close':
+        engines.pop(engine_id, None)
+        return None
+    if engine_id not in engines:
+        # Replaced while its source was still feeding it
+        return None
+    return getattr(engines[engine_id], method)(*args)
+
+
+def _work(connection, inherited):
+    # Interrupts are handled by the voice process, terminating the worker
+    # must not run the handlers inherited from it (the PID lock's)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Only the voice process may hold the other ends, or closing them
+    # wouldn't stop the workers
+    for other in inherited:
+        other.close()
+    engines = {}
+    while True:
+        try:
+            engine_id, method, args = connection.recv()
+        except EOFError:
+            return
+        try:
+            connection.send((True, _handle(engines, engine_id, method, args)))
+        except Exception:
+            LOG.exception('Hotword worker failed to ' + method)
+            connection.send((False, None))
+
+
+class HotwordWorker(object):
+    """A worker process, shared by the engines created on it.
+
+    Args:
+        others (list): connections of the workers forked before, the
+                       process closes its copies
+    """
+
+    def __init__(self, others=()):
+        self.connection, child = Pipe()
+        self.process = Process(target=_work, args=(
+            child, [self.connection] + list(others)))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+        self.lock = Lock()
+        # Engines created on this worker and not closed yet
+        self.engines = 0
+
+    def call(self, engine_id, method, *args):
+        with self.lock:
+            self.connection.send((engine_id, method, args))
+            success, result = self.connection.recv()
+        if not success:
+            raise RuntimeError('Hotword worker failed to ' + method)
+        return result
+
+    def close(self):
+        self.connection.close()
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class HotwordPool(object):
+    """Worker processes decoding hotwords for all capture sources.
+
+    Create the pool before starting threads, the workers are forked.
+
+    Args:
+        workers (int): number of processes, None for one per core
+    """
+
+    def __init__(self, workers=None):
+        self.workers = []
+        for _ in range(workers or cpu_count()):
+            self.workers.append(HotwordWorker(
+                [w.connection for w in self.workers]))
+        self.engine_ids = count()
+        self.lock = Lock()
+
+    def create_hotword(self, hotword="hey mycroft", config=None,
+                       lang="en-us", shared=False):
+        """Get an engine decoding in the pool.
+
+        Takes the arguments of HotWordFactory.create_hotword(), every
+        engine has its own state in its worker, they are never shared.
+        The engine goes to the worker with the fewest engines.
+        """
+        with self.lock:
+            worker = min(self.workers, key=lambda w: w.engines)
+            worker.engines += 1
+            engine_id = next(self.engine_ids)
+        return PooledHotWord(worker, engine_id, hotword, config, lang)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+class PooledHotWord(HotWordEngine):
+    """Hotword engine proxy, decoding in a worker of a HotwordPool.
+
+    Always streaming, engines decoding clips are fed by a WindowedEngine
+    in the worker.
+    """
+
+    def __init__(self, worker, engine_id, key_phrase="hey mycroft",
+                 config=None, lang="en-us"):
+        super(PooledHotWord, self).__init__(key_phrase, {}, lang)
+        self.worker = worker
+        self.engine_id = engine_id
+        # The workers only have the configuration they were forked with
+        if not config:
+            config = ConfigurationManager.get().get("hotwords", {})
+        self.num_phonemes = worker.call(
+            engine_id, 'create', key_phrase, config, lang,
+            self.listener_config.get('sample_rate', 16000),
+            self.listener_config.get('phoneme_duration', 120))
+        self.streaming = True
+
+    def found_wake_word(self, frame_data):
+        return self.worker.call(self.engine_id, 'found_wake_word',
+                                frame_data)
+
+    def update(self, chunk):
+        return self.worker.call(self.engine_id, 'update', chunk)
+
+    def reset(self):
+        self.worker.call(self.engine_id, 'reset')
+
+    def find_wake_word_segment(self, frame_data):
+        return self.worker.call(self.engine_id, 'find_wake_word_segment',
+                                frame_data)
+
+    def close(self):
+        self.worker.call(self.engine_id, 'close')
+        self.worker.engines -= 1
@@ -14,7 +14,8 @@
 #
 import time
 from Queue import Queue, Empty
-from threading import Thread
+from copy import deepcopy
+from threading import Thread, Lock
 
 import speech_recognition as sr
 from pyee import EventEmitter
@@ -22,10 +23,20 @@ from requests import HTTPError
 from requests.exceptions import ConnectionError
 
 import mycroft.dialog
+from mycroft.client.speech.earcon import EarconPlayer
 from mycroft.client.speech.hotword_factory import HotWordFactory
-from mycroft.client.speech.mic import MutableMicrophone, ResponsiveRecognizer
+from mycroft.client.speech.hotword_pool import HotwordPool
+from mycroft.client.speech.mic import (
+    MutableMicrophone,
+    ResponsiveRecognizer,
+    UtteranceStream
+)
+from mycroft.client.speech.sources import AudioSourceFactory
+from mycroft.client.speech.stt_executor import STTExecutor
+from mycroft.client.speech.utterance_recorder import UtteranceRecorder
 from mycroft.configuration import ConfigurationManager
 from mycroft.metrics import MetricsAggregator
+from mycroft.metrics.trace import monotonic, stamp
 from mycroft.session import SessionManager
 from mycroft.stt import STTFactory
 from mycroft.util.log import LOG
@@ -36,9 +47,12 @@ class AudioProducer(Thread):
     AudioProducer
     given a mic and a recognizer implementation, continuously listens to the
     mic for potential speech chunks and pushes them onto the queue.
+    The audio is tagged with the name of the capture source, None for the
+    default one.
     """
 
-    def __init__(self, state, queue, mic, recognizer, emitter):
+    def __init__(self, state, queue, mic, recognizer, emitter,
+                 stream_audio=False, source=None):
         super(AudioProducer, self).__init__()
         self.daemon = True
         self.state = state
@@ -46,14 +60,24 @@ class AudioProducer(Thread):
         self.mic = mic
         self.recognizer = recognizer
         self.emitter = emitter
+        self.stream_audio = stream_audio
+        self.source = source
 
     def run(self):
         with self.mic as source:
-            self.recognizer.adjust_for_ambient_noise(source)
             while self.state.running:
                 try:
-                    audio = self.recognizer.listen(source, self.emitter)
-                    self.queue.put(audio)
+                    if self.stream_audio and not self.state.sleeping:
+                        # The stream is queued as soon as recording begins
+                        # so transcription overlaps with the user speaking
+                        stream = UtteranceStream(self.queue.put,
+                                                 self.source)
+                        self.recognizer.listen(source, self.emitter, stream)
+                    else:
+                        audio = self.recognizer.listen(source, self.emitter)
+                        if audio is not None:
+                            audio.source = self.source
+                        self.queue.put(audio)
                 except IOError, ex:
                     # NOTE: Audio stack on raspi is slightly different, throws
                     # IOError every other listen, almost like it can't handle
@@ -70,6 +94,40 @@ class AudioProducer(Thread):
         self.recognizer.stop()
 
 
+class DuplicateFilter(object):
+    """
+    Drops the utterances heard by several capture sources.
+
+    A wake word detected within window_sec of the one of an utterance
+    accepted from another source is taken for the same utterance.
+    """
+
+    def __init__(self, window_sec=1.0):
+        self.window_sec = window_sec
+        # Time of the last accepted wake word, by source
+        self.accepted = {}
+        self.lock = Lock()
+
+    def accept(self, source, detected_at):
+        """
+        Check an utterance is not a duplicate, and remember it if not.
+
+        Args:
+            source (str): name of the capture source
+            detected_at (float): monotonic time of the wake word
+
+        Returns:
+            bool: True if the utterance should be handled
+        """
+        with self.lock:
+            for other, accepted_at in self.accepted.iteritems():
+                if (other != source and
+                        abs(detected_at - accepted_at) < self.window_sec):
+                    return False
+            self.accepted[source] = detected_at
+            return True
+
+
 class AudioConsumer(Thread):
     """
     AudioConsumer
@@ -80,7 +138,8 @@ class AudioConsumer(Thread):
     MIN_AUDIO_SIZE = 0.5
 
     def __init__(self, state, queue, emitter, stt,
-                 wakeup_recognizer, wakeword_recognizer):
+                 wakeup_recognizer, wakeword_recognizer,
+                 duplicate_filter=None, utterance_recorder=None):
         super(AudioConsumer, self).__init__()
         self.daemon = True
         self.queue = queue
@@ -89,11 +148,20 @@ class AudioConsumer(Thread):
         self.stt = stt
         self.wakeup_recognizer = wakeup_recognizer
         self.wakeword_recognizer = wakeword_recognizer
+        self.duplicate_filter = duplicate_filter
+        self.utterance_recorder = utterance_recorder
         self.metrics = MetricsAggregator()
+        config = ConfigurationManager.get().get('stt', {})
+        self.executor = STTExecutor(self._emit_utterance,
+                                    config.get('workers', 2),
+                                    config.get('deadline_sec', 15.0),
+                                    config.get('supersede', True),
+                                    self.metrics)
 
     def run(self):
         while self.state.running:
             self.read()
+        self.executor.shutdown()
 
     def read(self):
         try:
@@ -104,7 +172,9 @@ class AudioConsumer(Thread):
         if audio is None:
             return
 
-        if self.state.sleeping:
+        if isinstance(audio, UtteranceStream):
+            self.process_stream(audio)
+        elif self.state.sleeping:
             self.wake_up(audio)
         else:
             self.process(audio)
@@ -112,9 +182,11 @@ class AudioConsumer(Thread):
     # TODO: Localization
     def wake_up(self, audio):
         if self.wakeup_recognizer.found_wake_word(audio.frame_data):
-            SessionManager.touch()
+            source = getattr(audio, 'source', None)
+            SessionManager.touch(source)
             self.state.sleeping = False
-            self.__speak(mycroft.dialog.get("i am awake", self.stt.lang))
+            self.__speak(mycroft.dialog.get("i am awake", self.stt.lang),
+                         source)
             self.metrics.increment("mycroft.wakeup")
 
     @staticmethod
@@ -122,26 +194,108 @@ class AudioConsumer(Thread):
         return float(len(audio.frame_data)) / (
             audio.sample_rate * audio.sample_width)
 
-    # TODO: Localization
-    def process(self, audio):
-        SessionManager.touch()
+    def _is_duplicate(self, audio):
+        """
+        Check if another capture source already heard the utterance.
+
+        Args:
+            audio (AudioData or UtteranceStream): the utterance
+        """
+        if not self.duplicate_filter:
+            return False
+        trace = (getattr(audio, 'trace', None) or {}).get('trace', {})
+        detected_at = trace.get('stamps', {}).get('wakeword', monotonic())
+        if self.duplicate_filter.accept(audio.source, detected_at):
+            return False
+        LOG.debug("Utterance already heard, dropped from " + audio.source)
+        self.metrics.increment("mycroft.duplicate_utterance")
+        return True
+
+    @staticmethod
+    def _context(audio):
+        # Message context of the utterance, with its trace and source
+        context = dict(getattr(audio, 'trace', None) or {})
+        source = getattr(audio, 'source', None)
+        if source:
+            context['source'] = source
+        return context
+
+    def _emit_wakeword(self, source=None):
+        SessionManager.touch(source)
         payload = {
             'utterance': self.wakeword_recognizer.key_phrase,
-            'session': SessionManager.get().session_id,
+            'session': SessionManager.get(source).session_id,
         }
+        if source:
+            payload['source'] = source
         self.emitter.emit("recognizer_loop:wakeword", payload)
 
+    # TODO: Localization
+    def process(self, audio):
+        if self._is_duplicate(audio):
+            return
+        self._emit_wakeword(getattr(audio, 'source', None))
+
         if self._audio_length(audio) < self.MIN_AUDIO_SIZE:
             LOG.warning("Audio too short to be processed")
         else:
             self.transcribe(audio)
 
+    def process_stream(self, stream):
+        if self._is_duplicate(stream):
+            # Nothing reads the chunks, they go with the stream
+            return
+        self._emit_wakeword(stream.source)
+        self.transcribe_stream(stream)
+
     def transcribe(self, audio):
+        self.executor.submit(
+            lambda: self._transcribe(lambda: self.stt.execute(audio)),
+            context=self._context(audio),
+            key=getattr(audio, 'source', None))
+
+    def transcribe_stream(self, stream):
+        """Transcribe an utterance while it is being recorded.
+
+        Args:
+            stream (UtteranceStream): the utterance, closed when recording
+                                      ends
+        """
+        context = self._context(stream)
+        stt = self.stt
+
+        def execute():
+            # Superseded streams may still run, each has its own state
+            transcription = stt.start_stream(stream.sample_rate,
+                                             stream.sample_width)
+            for chunk in stream:
+                partial = transcription.feed(chunk)
+                if partial:
+                    self.emitter.emit("recognizer_loop:partial_utterance",
+                                      {'utterance': partial,
+                                       'lang': stt.lang})
+            text = transcription.finish()
+            # The recording is over, its trace is complete
+            context.update(stream.trace or {})
+            if stream.duration() < self.MIN_AUDIO_SIZE:
+                LOG.warning("Audio too short to be processed")
+                return None
+            return text
+
+        # The deadline only starts once the recording could be complete
+        deadline = (self.executor.deadline_sec +
+                    ResponsiveRecognizer.RECORDING_TIMEOUT)
+        self.executor.submit(lambda: self._transcribe(execute), deadline,
+                             context, stream.source)
+
+    def _transcribe(self, execute):
         text = None
         try:
             # Invoke the STT engine on the audio clip
-            text = self.stt.execute(audio).lower().strip()
-            LOG.debug("STT: " + text)
+            text = execute()
+            if text:
+                text = text.lower().strip()
+                LOG.debug("STT: " + text)
         except sr.RequestError as e:
             LOG.error("Could not request Speech Recognition {0}".format(e))
         except ConnectionError as e:
@@ -154,20 +308,29 @@ class AudioConsumer(Thread):
         except Exception as e:
             LOG.error(e)
             LOG.error("Speech Recognition could not understand audio")
-        if text:
-            # STT succeeded, send the transcribed speech on for processing
-            payload = {
-                'utterances': [text],
-                'lang': self.stt.lang,
-                'session': SessionManager.get().session_id
-            }
-            self.emitter.emit("recognizer_loop:utterance", payload)
-            self.metrics.attr('utterances', [text])
-
-    def __speak(self, utterance):
+        return text
+
+    def _emit_utterance(self, text, context=None):
+        # STT succeeded, send the transcribed speech on for processing
+        source = context.get('source') if context else None
+        payload = {
+            'utterances': [text],
+            'lang': self.stt.lang,
+            'session': SessionManager.get(source).session_id
+        }
+        if context:
+            # Message context of the utterance, carrying its trace
+            # and source
+            payload['context'] = stamp(context, 'utterance')
+        self.emitter.emit("recognizer_loop:utterance", payload)
+        self.metrics.attr('utterances', [text])
+        if self.utterance_recorder:
+            self.utterance_recorder.add_transcript(context, text)
+
+    def __speak(self, utterance, source=None):
         payload = {
             'utterance': utterance,
-            'session': SessionManager.get().session_id
+            'session': SessionManager.get(source).session_id
         }
         self.emitter.emit("speak", payload)
 
@@ -182,12 +345,43 @@ class RecognizerLoop(EventEmitter):
     """
         EventEmitter loop running speech recognition. Local wake word
         recognizer and remote general speech recognition.
+
+        Configuration changes only rebuild what they affect, only the
+        capture settings need the microphone to be reopened.
+
+        With several capture sources configured, each gets a producer
+        thread, its own session and its own wake word engine, decoding in
+        a pool of worker processes.  The utterances go through one consumer
+        dropping those heard by more than one source.
     """
 
+    # Configuration sections the loop is built from
+    SECTIONS = ['listener', 'hotwords', 'stt', 'lang', 'sounds']
+
+    # Listener settings requiring a full reload
+    CAPTURE_SETTINGS = {'sample_rate', 'device_index', 'channels',
+                        'wake_word_upload', 'record_wake_words', 'sources',
+                        'duplicate_window_sec', 'barge_in', 'earcons',
+                        'utterance_recording'}
+
+    # Listener settings used to create the hotword engines
+    HOTWORD_SETTINGS = {'wake_word', 'stand_up_word', 'phonemes',
+                        'threshold', 'phoneme_duration'}
+
     def __init__(self):
         super(RecognizerLoop, self).__init__()
         self.mute_calls = 0
+        # Forked once, before any thread starts.  Reloads keep it, enabling
+        # several sources later on takes a restart.
+        listener = ConfigurationManager.get().get('listener', {})
+        self.hotword_pool = None
+        if listener.get('sources'):
+            self.hotword_pool = HotwordPool(listener.get('hotword_workers'))
+        self.changed_sections = set()
+        self.changed_lock = Lock()
         self._load_config()
+        ConfigurationManager.add_listener(self._on_config_changed,
+                                          self.SECTIONS)
 
     def _load_config(self):
         """
@@ -195,31 +389,83 @@ class RecognizerLoop(EventEmitter):
         """
         config = ConfigurationManager.get()
         self.config_core = config
-        self._config_hash = hash(str(config))
         self.lang = config.get('lang')
-        self.config = config.get('listener')
-        rate = self.config.get('sample_rate')
-        device_index = self.config.get('device_index')
+        # Copied to find which settings changed on the next update
+        self.config = deepcopy(config.get('listener'))
+        sources = self.config.get('sources')
+        if sources and not self.hotword_pool:
+            LOG.warning('Capture sources enabled, restart the voice client '
+                        'to decode the wake word in worker processes')
 
-        self.microphone = MutableMicrophone(device_index, rate,
-                                            mute=self.mute_calls > 0)
-        # FIXME - channels are not been used
-        self.microphone.CHANNELS = self.config.get('channels')
         self.wakeword_recognizer = self.create_wake_word_recognizer()
         # TODO - localization
         self.wakeup_recognizer = self.create_wakeup_recognizer()
-        self.responsive_recognizer = ResponsiveRecognizer(
-            self.wakeword_recognizer)
+        self.earcons = self.create_earcons()
+        self.utterance_recorder = UtteranceRecorder(
+            self.config.get('utterance_recording', {}))
+        if sources:
+            self.captures = self.create_captures(sources)
+        else:
+            self.captures = [self.create_default_capture()]
+        # The default, or first, capture source
+        _, self.microphone, self.responsive_recognizer = self.captures[0]
+        for _, _, recognizer in self.captures:
+            recognizer.earcons = self.earcons
+            recognizer.utterance_recorder = self.utterance_recorder
+        # The wake word is heard over the TTS if every source cancels its
+        # echo, the microphones then stay open while speaking
+        self.barge_in = all(recognizer.echo
+                            for _, _, recognizer in self.captures)
         self.state = RecognizerLoopState()
 
-    def create_wake_word_recognizer(self):
+    def create_default_capture(self):
+        """
+            Capture from the microphone in the listener settings.
+
+            Returns:
+                tuple: (name, microphone, recognizer), name is None
+        """
+        rate = self.config.get('sample_rate')
+        device_index = self.config.get('device_index')
+        microphone = MutableMicrophone(device_index, rate,
+                                       mute=self.mute_calls > 0)
+        # FIXME - channels are not been used
+        microphone.CHANNELS = self.config.get('channels')
+        recognizer = ResponsiveRecognizer(self.wakeword_recognizer)
+        return None, microphone, recognizer
+
+    def create_captures(self, sources):
+        """
+            Capture from several sources, sharing the wake word upload
+            queue.  Each source has its own wake word engine.
+
+            Args:
+                sources (dict): source configurations, by name
+
+            Returns:
+                list: (name, source, recognizer) tuples, sorted by name
+        """
+        rate = self.config.get('sample_rate')
+        captures = []
+        wake_word_queue = None
+        for name in sorted(sources):
+            source = AudioSourceFactory.create(sources[name], rate,
+                                               mute=self.mute_calls > 0)
+            recognizer = ResponsiveRecognizer(self.create_source_hotword(name),
+                                              name, wake_word_queue)
+            wake_word_queue = recognizer.wake_word_queue
+            captures.append((name, source, recognizer))
+        return captures
+
+    def create_wake_word_recognizer(self, shared=True):
         # Create a local recognizer to hear the wakeup word, e.g. 'Hey Mycroft'
         LOG.info("creating wake word engine")
         word = self.config.get("wake_word", "hey mycroft")
         # TODO remove this, only for server settings compatibility
         phonemes = self.config.get("phonemes")
         thresh = self.config.get("threshold")
-        config = self.config_core.get("hotwords", {word: {}})
+        # Copied, the shared configuration must not change behind its back
+        config = deepcopy(self.config_core.get("hotwords", {word: {}}))
         if word not in config:
             config[word] = {}
         if phonemes:
@@ -228,12 +474,58 @@ class RecognizerLoop(EventEmitter):
             config[word]["threshold"] = thresh
         if phonemes is None or thresh is None:
             config = None
-        return HotWordFactory.create_hotword(word, config, self.lang)
+        return self.hotword_factory().create_hotword(word, config, self.lang,
+                                                     shared=shared)
+
+    def create_source_hotword(self, name):
+        """
+            Wake word engine of a capture source, the default source uses
+            the shared one.  Streaming engines keep the state of their
+            source.
+        """
+        if name is None:
+            return self.wakeword_recognizer
+        return self.create_wake_word_recognizer(shared=False)
 
     def create_wakeup_recognizer(self):
         LOG.info("creating stand up word engine")
         word = self.config.get("stand_up_word", "wake up")
-        return HotWordFactory.create_hotword(word, lang=self.lang)
+        return self.hotword_factory().create_hotword(word, lang=self.lang)
+
+    def create_earcons(self):
+        """
+            Load the system sounds, None if the external player is used
+        """
+        config = self.config.get('earcons', {})
+        if not config.get('enabled', True):
+            return None
+        return EarconPlayer(self.config_core.get('sounds', {}),
+                            self.config.get('sample_rate', 16000),
+                            config.get('device_index'),
+                            config.get('idle_sec', 10.0))
+
+    def reload_earcons(self):
+        """
+            Load the sounds again, they changed
+        """
+        LOG.debug('Sounds changed, reloading...')
+        if self.earcons:
+            self.earcons.close()
+        self.earcons = self.create_earcons()
+        for _, _, recognizer in self.captures:
+            recognizer.earcons = self.earcons
+
+    def hotword_engines(self):
+        engines = {self.wakeword_recognizer, self.wakeup_recognizer}
+        engines.update(recognizer.wake_word_recognizer
+                       for _, _, recognizer in self.captures)
+        return engines
+
+    def hotword_factory(self):
+        # Several sources decode in the pool, one decodes in process
+        if self.config.get('sources') and self.hotword_pool:
+            return self.hotword_pool
+        return HotWordFactory
 
     def start_async(self):
         """
@@ -241,29 +533,61 @@ class RecognizerLoop(EventEmitter):
         """
         self.state.running = True
         queue = Queue()
-        self.producer = AudioProducer(self.state, queue, self.microphone,
-                                      self.responsive_recognizer, self)
-        self.producer.start()
-        self.consumer = AudioConsumer(self.state, queue, self,
-                                      STTFactory.create(),
+        stt = STTFactory.create()
+        self.producers = [AudioProducer(self.state, queue, microphone,
+                                        recognizer, self,
+                                        stream_audio=stt.streaming,
+                                        source=name)
+                          for name, microphone, recognizer in self.captures]
+        self.producer = self.producers[0]
+        for producer in self.producers:
+            producer.start()
+        duplicate_filter = None
+        if len(self.captures) > 1:
+            duplicate_filter = DuplicateFilter(
+                self.config.get('duplicate_window_sec', 1.0))
+        self.consumer = AudioConsumer(self.state, queue, self, stt,
                                       self.wakeup_recognizer,
-                                      self.wakeword_recognizer)
+                                      self.wakeword_recognizer,
+                                      duplicate_filter,
+                                      self.utterance_recorder)
         self.consumer.start()
 
     def stop(self):
+        """
+            Stop the loop for good, the hotword workers exit too
+        """
+        self._stop()
+        if self.hotword_pool:
+            self.hotword_pool.close()
+            self.hotword_pool = None
+
+    def _stop(self):
+        # Stops the threads, the hotword workers are kept for a reload
         self.state.running = False
-        self.producer.stop()
+        for producer in self.producers:
+            producer.stop()
         # wait for threads to shutdown
-        self.producer.join()
+        for producer in self.producers:
+            producer.join()
         self.consumer.join()
+        for engine in self.hotword_engines():
+            engine.close()
+        if self.earcons:
+            self.earcons.close()
+        self.utterance_recorder.stop()
+
+    def sources(self):
+        # Every capture source, the microphone first
+        return [source for _, source, _ in self.captures]
 
     def mute(self):
         """
             Mute microphone and increase number of requests to mute
         """
         self.mute_calls += 1
-        if self.microphone:
-            self.microphone.mute()
+        for source in self.sources():
+            source.mute()
 
     def unmute(self):
         """
@@ -273,10 +597,25 @@ class RecognizerLoop(EventEmitter):
         if self.mute_calls > 0:
             self.mute_calls -= 1
 
-        if self.mute_calls <= 0 and self.microphone:
-            self.microphone.unmute()
+        if self.mute_calls <= 0:
+            for source in self.sources():
+                source.unmute()
             self.mute_calls = 0
 
+    def mute_for_output(self):
+        """
+            Audio output starts, mute unless barge-in is enabled
+        """
+        if not self.barge_in:
+            self.mute()
+
+    def unmute_after_output(self):
+        """
+            Audio output ended, undo mute_for_output()
+        """
+        if not self.barge_in:
+            self.unmute()
+
     def force_unmute(self):
         """
             Completely unmute mic dispite the number of calls to mute
@@ -285,8 +624,9 @@ class RecognizerLoop(EventEmitter):
         self.unmute()
 
     def is_muted(self):
-        if self.microphone:
-            return self.microphone.is_muted()
+        sources = self.sources()
+        if sources:
+            return all(source.is_muted() for source in sources)
         else:
             return True  # consider 'no mic' muted
 
@@ -301,20 +641,86 @@ class RecognizerLoop(EventEmitter):
         while self.state.running:
             try:
                 time.sleep(1)
-                if self._config_hash != hash(
-                        str(ConfigurationManager().get())):
-                    LOG.debug('Config has changed, reloading...')
-                    self.reload()
+                self.apply_config_changes()
             except KeyboardInterrupt as e:
                 LOG.error(e)
                 self.stop()
                 raise  # Re-raise KeyboardInterrupt
 
+    def _on_config_changed(self, sections, version):
+        # Called from the thread changing the configuration, the changes
+        # are applied by the loop
+        with self.changed_lock:
+            self.changed_sections |= sections
+
+    def apply_config_changes(self):
+        """
+            Rebuild the components affected by configuration changes
+            since the last call.
+        """
+        with self.changed_lock:
+            sections = self.changed_sections
+            self.changed_sections = set()
+        if not sections:
+            return
+
+        config = ConfigurationManager.get()
+        listener = config.get('listener', {})
+        changed = set(k for k in set(listener) | set(self.config)
+                      if listener.get(k) != self.config.get(k))
+        if changed & self.CAPTURE_SETTINGS:
+            LOG.debug('Capture settings changed, reloading...')
+            self.reload()
+            return
+
+        self.config_core = config
+        self.config = deepcopy(listener)
+        self.lang = config.get('lang')
+        if ('hotwords' in sections or 'lang' in sections or
+                changed & self.HOTWORD_SETTINGS):
+            self.reload_hotwords()
+        if changed - self.HOTWORD_SETTINGS:
+            LOG.debug('Listener settings changed')
+            for _, _, recognizer in self.captures:
+                recognizer.update_config(self.config)
+        if 'stt' in sections or 'lang' in sections:
+            self.reload_stt()
+        if 'sounds' in sections:
+            self.reload_earcons()
+
+    def reload_hotwords(self):
+        """
+            Replace the wake word and wake up engines, capture goes on
+        """
+        LOG.debug('Hotword settings changed, reloading hotwords...')
+        old_engines = self.hotword_engines()
+        self.wakeword_recognizer = self.create_wake_word_recognizer()
+        self.wakeup_recognizer = self.create_wakeup_recognizer()
+        for name, _, recognizer in self.captures:
+            recognizer.set_wake_word_recognizer(
+                self.create_source_hotword(name), self.config)
+        self.consumer.wakeword_recognizer = self.wakeword_recognizer
+        self.consumer.wakeup_recognizer = self.wakeup_recognizer
+        # A source may still be decoding its last chunk, closed engines
+        # of the pool detect nothing
+        for engine in old_engines - self.hotword_engines():
+            engine.close()
+
+    def reload_stt(self):
+        """
+            Replace the STT engine used for the next utterances
+        """
+        LOG.debug('STT settings changed, reloading STT...')
+        stt = STTFactory.create()
+        for producer in self.producers:
+            producer.stream_audio = stt.streaming
+        self.consumer.stt = stt
+
     def reload(self):
         """
             Reload configuration and restart consumer and producer
         """
-        self.stop()
+        self._stop()
         # load config
         self._load_config()
         # restart
@@ -22,6 +22,7 @@ from mycroft.identity import IdentityManager
 from mycroft.lock import Lock as PIDLock  # Create/Support PID locking file
 from mycroft.messagebus.client.ws import WebsocketClient
 from mycroft.messagebus.message import Message
+from mycroft.stt.grammar import command_grammar
 from mycroft.util.log import LOG
 
 ws = None
@@ -33,6 +34,9 @@ config = ConfigurationManager.get()
 
 def handle_record_begin():
     LOG.info("Begin Recording...")
+    if loop.barge_in:
+        # The user may be interrupting, stop speaking to listen
+        ws.emit(Message('mycroft.audio.speech.stop'))
     ws.emit(Message('recognizer_loop:record_begin'))
 
 
@@ -51,9 +55,18 @@ def handle_wakeword(event):
     ws.emit(Message('recognizer_loop:wakeword', event))
 
 
+def handle_mic_level(event):
+    ws.emit(Message('recognizer_loop:mic_level', event))
+
+
+def handle_partial_utterance(event):
+    ws.emit(Message('recognizer_loop:partial_utterance', event))
+
+
 def handle_utterance(event):
     LOG.info("Utterance: " + str(event['utterances']))
-    ws.emit(Message('recognizer_loop:utterance', event))
+    context = event.pop('context', None)
+    ws.emit(Message('recognizer_loop:utterance', event, context))
 
 
 def handle_speak(event):
@@ -93,9 +106,10 @@ def handle_paired(event):
 
 def handle_audio_start(event):
     """
-        Mute recognizer loop
+        Mute recognizer loop, unless barge-in lets the wake word
+        interrupt the output
     """
-    loop.mute()
+    loop.mute_for_output()
 
 
 def handle_audio_end(event):
@@ -103,7 +117,7 @@ def handle_audio_end(event):
         Request unmute, if more sources has requested the mic to be muted
         it will remain muted.
     """
-    loop.unmute()  # restore
+    loop.unmute_after_output()  # restore
 
 
 def handle_stop(event):
@@ -113,6 +127,21 @@ def handle_stop(event):
     loop.force_unmute()
 
 
+def handle_register_vocab(event):
+    """
+        Add skill vocabulary to the grammar of the local STT
+    """
+    if 'start' in event.data:
+        command_grammar.add_vocabulary(event.data['start'])
+
+
+def handle_register_intent_file(event):
+    try:
+        command_grammar.add_intent_file(event.data['file_name'])
+    except (IOError, KeyError):
+        LOG.warning('Could not add intent file to the command grammar')
+
+
 def handle_open():
     # TODO: Move this into the Enclosure (not speech client)
     # Reset the UI to indicate ready for speech processing
@@ -128,16 +157,20 @@ def main():
     global loop
     global config
     lock = PIDLock("voice")
+    # Created first, the hotword workers must be forked before the
+    # websocket client starts its threads
+    loop = RecognizerLoop()
     ws = WebsocketClient()
     config = ConfigurationManager.get()
     ConfigurationManager.init(ws)
-    loop = RecognizerLoop()
     loop.on('recognizer_loop:utterance', handle_utterance)
+    loop.on('recognizer_loop:partial_utterance', handle_partial_utterance)
     loop.on('speak', handle_speak)
     loop.on('recognizer_loop:record_begin', handle_record_begin)
     loop.on('recognizer_loop:wakeword', handle_wakeword)
     loop.on('recognizer_loop:record_end', handle_record_end)
     loop.on('recognizer_loop:no_internet', handle_no_internet)
+    loop.on('recognizer_loop:mic_level', handle_mic_level)
     ws.on('open', handle_open)
     ws.on('complete_intent_failure', handle_complete_intent_failure)
     ws.on('recognizer_loop:sleep', handle_sleep)
@@ -148,6 +181,8 @@ def main():
     ws.on('recognizer_loop:audio_output_start', handle_audio_start)
     ws.on('recognizer_loop:audio_output_end', handle_audio_end)
     ws.on('mycroft.stop', handle_stop)
+    ws.on('register_vocab', handle_register_vocab)
+    ws.on('padatious:register_intent', handle_register_intent_file)
     event_thread = Thread(target=connect)
     event_thread.setDaemon(True)
     event_thread.start()
@@ -13,29 +13,37 @@
 # limitations under the License.
 #
 import audioop
-import collections
-import datetime
-import shutil
+from Queue import Queue, Empty, Full
 from tempfile import gettempdir
-from threading import Thread, Lock
 from time import sleep, time as get_time
 
-import os
 import pyaudio
 import speech_recognition
-from os import mkdir
-from os.path import isdir, join, expanduser, isfile
+from os.path import join
 from speech_recognition import (
     Microphone,
     AudioSource,
     AudioData
 )
 
+from mycroft.client.speech.echo import EchoSuppressor
+from mycroft.client.speech.mic_level import (
+    MicLevelWriter,
+    get_mic_level_file
+)
+from mycroft.client.speech.noise_floor import NoiseFloorEstimator
+from mycroft.client.speech.ringbuffer import RingBuffer
+from mycroft.client.speech.vad import VADFactory
+from mycroft.client.speech.wake_word_upload import (
+    UploaderFactory,
+    WakeWordUploadQueue
+)
 from mycroft.configuration import ConfigurationManager
+from mycroft.metrics.trace import monotonic, stamp, start_trace
 from mycroft.session import SessionManager
+from mycroft.stt.trimmer import TrimmedAudioData, UtteranceTrimmer
 from mycroft.util import (
     check_for_signal,
-    get_ipc_directory,
     resolve_resource_file,
     play_wav
 )
@@ -43,13 +51,56 @@ from mycroft.util.log import LOG
 
 
 class MutableStream(object):
-    def __init__(self, wrapped_stream, format, muted=False):
-        assert wrapped_stream is not None
-        self.wrapped_stream = wrapped_stream
+    """Microphone stream filled by PyAudio in callback mode.
+
+    PortAudio hands fixed size frames to callback() from its own thread.
+    They are queued as they are and read() blocks on the queue, so nothing
+    polls the device while waiting for audio.  While muted the captured
+    audio is dropped immediately and a single silent sample is queued in
+    its place, which keeps readers running at the capture pace.
+
+    Each frame is queued with the monotonic time its capture ended, from
+    the timing PortAudio gives the callback.  After read(), captured_at is
+    the time the capture of the last sample returned ended.
+    """
+
+    # Frames kept waiting for a reader before new audio is dropped
+    MAX_QUEUED_FRAMES = 64
+
+    # Seconds read() waits for a frame before checking the stream is alive
+    READ_TIMEOUT = 1.0
+
+    def __init__(self, format, muted=False):
+        self.wrapped_stream = None
+        self.format = format
         self.muted = muted
 
         self.SAMPLE_WIDTH = pyaudio.get_sample_size(format)
         self.muted_buffer = b''.join([b'\x00' * self.SAMPLE_WIDTH])
+        self.frames = Queue(self.MAX_QUEUED_FRAMES)
+        self.leftover = b''
+        self.rate = None
+        self.captured_at = None
+
+        # Frames lost because the reader fell behind or PortAudio overflowed
+        self.overflows = 0
+        # Input underflows reported by PortAudio
+        self.underruns = 0
+
+    def open(self, audio, **kwargs):
+        """Open the wrapped input stream on a PyAudio instance.
+
+        Args:
+            audio (PyAudio): PyAudio instance to open the stream with
+            kwargs: additional arguments passed on to PyAudio.open()
+        """
+        self.rate = kwargs.get('rate')
+        self.wrapped_stream = audio.open(format=self.format, input=True,
+                                         stream_callback=self.callback,
+                                         **kwargs)
+        input_latency = self.wrapped_stream.get_input_latency()
+        if input_latency > 0.2:
+            LOG.warning("High input latency: %f" % input_latency)
 
     def mute(self):
         self.muted = True
@@ -57,25 +108,71 @@ class MutableStream(object):
     def unmute(self):
         self.muted = False
 
-    def read(self, size):
-        frames = collections.deque()
-        remaining = size
-        while remaining > 0:
-            to_read = min(self.wrapped_stream.get_read_available(), remaining)
-            if to_read == 0:
-                sleep(.01)
-                continue
-            result = self.wrapped_stream.read(to_read)
-            frames.append(result)
-            remaining -= to_read
+    def capture_time(self, frame_count, time_info):
+        """Monotonic time the capture of a frame ended.
 
-        if self.muted:
-            return self.muted_buffer
-        input_latency = self.wrapped_stream.get_input_latency()
-        if input_latency > 0.2:
-            LOG.warning("High input latency: %f" % input_latency)
-        audio = b"".join(list(frames))
-        return audio
+        PortAudio times the first sample of the frame on the clock of the
+        stream, it is moved to the monotonic clock through the time of the
+        callback.  Host APIs not timing the capture get the callback time.
+
+        Args:
+            frame_count (int): samples in the frame
+            time_info (dict): timing of the callback
+        """
+        now = monotonic()
+        adc_time = time_info.get('input_buffer_adc_time', 0)
+        current_time = time_info.get('current_time', 0)
+        if adc_time <= 0 or not self.rate or not (
+                0 <= current_time - adc_time < 1.0):
+            return now
+        return min(now, now - (current_time - adc_time) +
+                   float(frame_count) / self.rate)
+
+    def callback(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        if status & pyaudio.paInputUnderflow:
+            self.underruns += 1
+        captured_at = self.capture_time(frame_count, time_info)
+        try:
+            self.frames.put_nowait((self.muted_buffer if self.muted
+                                    else in_data, captured_at))
+        except Full:
+            self.overflows += 1
+        return None, pyaudio.paContinue
+
+    def _next_frame(self):
+        while True:
+            try:
+                return self.frames.get(timeout=self.READ_TIMEOUT)
+            except Empty:
+                if not (self.wrapped_stream and
+                        self.wrapped_stream.is_active()):
+                    raise IOError("Microphone stream is not active")
+
+    def read(self, size):
+        num_bytes = size * self.SAMPLE_WIDTH
+        frame, self.captured_at = self._next_frame()
+        if frame is self.muted_buffer:
+            self.leftover = b''
+            return frame
+        if not self.leftover and len(frame) == num_bytes:
+            # Usual case, readers ask for exactly one captured frame
+            return frame
+
+        data = self.leftover + frame
+        while len(data) < num_bytes:
+            frame, self.captured_at = self._next_frame()
+            if frame is self.muted_buffer:
+                self.leftover = b''
+                return frame
+            data += frame
+        self.leftover = data[num_bytes:]
+        if self.rate:
+            # The leftover was captured last
+            self.captured_at -= (float(len(self.leftover)) /
+                                 (self.SAMPLE_WIDTH * self.rate))
+        return data[:num_bytes]
 
     def close(self):
         self.wrapped_stream.close()
@@ -102,12 +199,10 @@ class MutableMicrophone(Microphone):
         assert self.stream is None, \
             "This audio source is already inside a context manager"
         self.audio = pyaudio.PyAudio()
-        self.stream = MutableStream(self.audio.open(
-            input_device_index=self.device_index, channels=1,
-            format=self.format, rate=self.SAMPLE_RATE,
-            frames_per_buffer=self.CHUNK,
-            input=True,  # stream is an input stream
-        ), self.format, self.muted)
+        self.stream = MutableStream(self.format, self.muted)
+        self.stream.open(self.audio, input_device_index=self.device_index,
+                         channels=1, rate=self.SAMPLE_RATE,
+                         frames_per_buffer=self.CHUNK)
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
@@ -131,6 +226,49 @@ class MutableMicrophone(Microphone):
         return self.muted
 
 
+class UtteranceStream(object):
+    """Audio of an utterance handed over while it is being recorded.
+
+    The recognizer puts chunks as they are captured and closes the stream
+    at the end of the phrase.  Iterating the stream yields the chunks,
+    blocking until the next one is available.
+
+    Args:
+        on_open (callable): called with the stream when recording starts
+        source (str): name of the capture source, None for the default one
+    """
+
+    def __init__(self, on_open=None, source=None):
+        self.on_open = on_open
+        self.source = source
+        self.chunks = Queue()
+        self.sample_rate = None
+        self.sample_width = None
+        self.num_bytes = 0
+        # Latency trace of the utterance, see mycroft.metrics.trace
+        self.trace = None
+
+    def open(self, sample_rate, sample_width):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        if self.on_open:
+            self.on_open(self)
+
+    def put(self, chunk):
+        self.num_bytes += len(chunk)
+        self.chunks.put(chunk)
+
+    def close(self):
+        self.chunks.put(None)
+
+    def duration(self):
+        """ Seconds of audio put in the stream so far. """
+        return float(self.num_bytes) / (self.sample_rate * self.sample_width)
+
+    def __iter__(self):
+        return iter(self.chunks.get, None)
+
+
 class ResponsiveRecognizer(speech_recognition.Recognizer):
     # Padding of silence when feeding to pocketsphinx
     SILENCE_SEC = 0.01
@@ -154,11 +292,66 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
     # Time between pocketsphinx checks for the wake word
     SEC_BETWEEN_WW_CHECKS = 0.2
 
-    def __init__(self, wake_word_recognizer):
+    # Seconds of recent audio used to estimate the background noise
+    NOISE_FLOOR_SEC = 5.0
+
+    # Percentile of the recent chunk energies taken as the noise floor
+    NOISE_FLOOR_PERCENTILE = 15.0
 
+    def __init__(self, wake_word_recognizer, source=None,
+                 wake_word_queue=None):
+        """
+        Args:
+            wake_word_recognizer: the wake word engine
+            source (str): name of the capture source listened to, None
+                          for the default one
+            wake_word_queue (WakeWordUploadQueue): queue shared with the
+                                                   other sources, None to
+                                                   create one
+        """
         self.config = ConfigurationManager.instance()
+        self.source = source
         listener_config = self.config.get('listener')
         self.upload_config = listener_config.get('wake_word_upload')
+        self.set_wake_word_recognizer(wake_word_recognizer, listener_config)
+
+        speech_recognition.Recognizer.__init__(self)
+        self.audio = pyaudio.PyAudio()
+        # check the config for the flag to save wake words.
+        self.save_wake_words = listener_config.get('record_wake_words') \
+            or self.upload_config['enable'] or self.config['opt_in']
+        self.save_wake_words_dir = join(gettempdir(), 'mycroft_wake_words')
+        self.wake_word_queue = wake_word_queue
+        if self.save_wake_words and not wake_word_queue:
+            uploader = None
+            if self.upload_config['enable'] or self.config['opt_in']:
+                uploader = UploaderFactory.create(self.upload_config)
+            self.wake_word_queue = WakeWordUploadQueue(
+                self.save_wake_words_dir, self.upload_config, uploader)
+        # Microphone level shared with other processes, e.g. the CLI meter
+        self.mic_level = MicLevelWriter(get_mic_level_file(source))
+        self.last_mic_level_emit = 0.0
+        self.emitter = None
+        self._stop_signaled = False
+        self.noise_floor = None
+        # Player of the start listening sound, see EarconPlayer
+        self.earcons = None
+        # Where utterances go with record_utterances, see UtteranceRecorder
+        self.utterance_recorder = None
+        self.update_config(listener_config)
+        self.decodes_run = 0
+        self.decodes_skipped = 0
+
+    def set_wake_word_recognizer(self, wake_word_recognizer,
+                                 listener_config):
+        """Switch to another wake word engine.
+
+        Takes effect from the next chunk read, the microphone stays open.
+
+        Args:
+            wake_word_recognizer: the new wake word engine
+            listener_config (dict): listener configuration
+        """
         self.wake_word_name = listener_config['wake_word']
         # The maximum audio in seconds to keep for transcribing a phrase
         # The wake word must fit in this time
@@ -167,22 +360,56 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         self.TEST_WW_SEC = int(num_phonemes * len_phoneme)
         self.SAVED_WW_SEC = (10 if self.upload_config['enable']
                              else self.TEST_WW_SEC)
-
-        speech_recognition.Recognizer.__init__(self)
         self.wake_word_recognizer = wake_word_recognizer
-        self.audio = pyaudio.PyAudio()
+
+    def update_config(self, listener_config):
+        """Apply the listener thresholds and recording settings.
+
+        Args:
+            listener_config (dict): listener configuration
+        """
         self.multiplier = listener_config.get('multiplier')
         self.energy_ratio = listener_config.get('energy_ratio')
-        # check the config for the flag to save wake words.
-
         self.save_utterances = listener_config.get('record_utterances', False)
-        self.save_wake_words = listener_config.get('record_wake_words') \
-            or self.upload_config['enable'] or self.config['opt_in']
-        self.upload_lock = Lock()
-        self.save_wake_words_dir = join(gettempdir(), 'mycroft_wake_words')
-        self.filenames_to_upload = []
-        self.mic_level_file = os.path.join(get_ipc_directory(), "mic_level")
-        self._stop_signaled = False
+        # Trim the silence of the utterance while recording it
+        self.trim_utterances = listener_config.get('trim_utterances', True)
+        self.silence_margin_sec = listener_config.get('silence_margin_sec',
+                                                      0.3)
+        # Rate of the optional mic level bus messages, 0 to disable them
+        self.mic_level_rate = listener_config.get('mic_level_rate', 0)
+        # Gate keeping the wake word decoder idle while the room is silent
+        self.vad = VADFactory.create(listener_config.get('vad', {}))
+        # Seconds the start listening sound lingers after it was played,
+        # the output latency and the room echo
+        self.earcon_tail_sec = listener_config.get('earcons', {}).get(
+            'tail_sec', 0.15)
+        # Cancels the echo of the TTS so the wake word is heard over it
+        self.echo = None
+        barge_in = listener_config.get('barge_in', {})
+        if barge_in.get('enabled'):
+            try:
+                self.echo = EchoSuppressor(
+                    barge_in, listener_config.get('sample_rate', 16000))
+            except ImportError:
+                LOG.exception('Barge-in needs numpy, the microphone stays '
+                              'muted while speaking')
+
+    def read_chunk(self, source):
+        """Capture a chunk, minus the echo of the TTS with barge-in."""
+        chunk = self.record_sound_chunk(source)
+        if self.echo:
+            chunk = self.echo.process(chunk, self.captured_at(source))
+        return chunk
+
+    @staticmethod
+    def captured_at(source):
+        """Monotonic time the capture of the last chunk read ended.
+
+        Returns:
+            float: None if the stream doesn't time its chunks
+        """
+        captured_at = getattr(source.stream, 'captured_at', None)
+        return captured_at if isinstance(captured_at, float) else None
 
     @staticmethod
     def record_sound_chunk(source):
@@ -192,7 +419,61 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
     def calc_energy(sound_chunk, sample_width):
         return audioop.rms(sound_chunk, sample_width)
 
-    def _record_phrase(self, source, sec_per_buffer):
+    def _report_mic_level(self, energy):
+        """Publish the energy of the last chunk read.
+
+        Every sample goes to the shared memory ring, only a few per second
+        are sent on the messagebus when mic_level_rate is configured.
+
+        Args:
+            energy (int): energy of the chunk
+        """
+        now = get_time()
+        self.mic_level.write(now, energy, self.energy_threshold)
+        if (self.mic_level_rate > 0 and self.emitter and
+                now - self.last_mic_level_emit >= 1.0 / self.mic_level_rate):
+            self.last_mic_level_emit = now
+            data = {'energy': energy, 'threshold': self.energy_threshold}
+            if self.source:
+                data['source'] = self.source
+            self.emitter.emit("recognizer_loop:mic_level", data)
+
+    def _confirm_listening(self):
+        """Play the start listening sound.
+
+        Returns:
+            tuple: (start, end) monotonic times the microphone hears the
+                   sound between, None when played by an external player
+        """
+        if self.earcons:
+            start = monotonic()
+            duration = self.earcons.play('start_listening')
+            if duration:
+                return start, start + duration + self.earcon_tail_sec
+            return None
+        file = resolve_resource_file(
+            self.config.get('sounds').get('start_listening'))
+        if file:
+            play_wav(file)
+        return None
+
+    def _captured_during(self, source, sec_per_buffer, span):
+        """Check if the last chunk read was captured during a time span.
+
+        Args:
+            source (AudioSource): source the chunk was read from
+            sec_per_buffer (float): seconds in the chunk
+            span (tuple): (start, end) monotonic times
+        """
+        captured_at = self.captured_at(source)
+        if captured_at is None:
+            # Not timed by the stream, assumed to be captured just now
+            captured_at = monotonic()
+        start, end = span
+        return start < captured_at and captured_at - sec_per_buffer < end
+
+    def _record_phrase(self, source, sec_per_buffer, stream=None,
+                       trimmer=None, beep=None):
         """Record an entire spoken phrase.
 
         Essentially, this code waits for a period of silence and then returns
@@ -202,6 +483,12 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         Args:
             source (AudioSource):  Source producing the audio chunks
             sec_per_buffer (float):  Fractional number of seconds in each chunk
+            stream (UtteranceStream): optional stream receiving every chunk
+                                      as soon as it is recorded
+            trimmer (UtteranceTrimmer): optional trimmer fed every chunk
+            beep (tuple): (start, end) monotonic times of the start
+                          listening sound, chunks captured meanwhile are
+                          left out
 
         Returns:
             bytearray: complete audio buffer recorded, including any
@@ -237,14 +524,20 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         max_chunks_of_silence = int(self.RECORDING_TIMEOUT_WITH_SILENCE /
                                     sec_per_buffer)
 
-        # bytearray to store audio in
-        byte_data = '\0' * source.SAMPLE_WIDTH
+        # preallocated buffer to store audio in, large enough to never wrap
+        byte_data = RingBuffer(source.SAMPLE_WIDTH +
+                               max_chunks * source.CHUNK * source.SAMPLE_WIDTH)
+        byte_data.append('\0' * source.SAMPLE_WIDTH)
 
         phrase_complete = False
         while num_chunks < max_chunks and not phrase_complete:
-            chunk = self.record_sound_chunk(source)
-            byte_data += chunk
+            chunk = self.read_chunk(source)
+            if beep and self._captured_during(source, sec_per_buffer, beep):
+                continue
+            byte_data.append(chunk)
             num_chunks += 1
+            if stream:
+                stream.put(chunk)
 
             energy = self.calc_energy(chunk, source.SAMPLE_WIDTH)
             test_threshold = self.energy_threshold * self.multiplier
@@ -254,13 +547,11 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
                 num_loud_chunks += 1
             else:
                 noise = decrease_noise(noise)
-                self._adjust_threshold(energy, sec_per_buffer)
+            self._update_noise_floor(energy, sec_per_buffer)
+            if trimmer:
+                trimmer.add(chunk, is_loud)
 
-            if num_chunks % 10 == 0:
-                with open(self.mic_level_file, 'w') as f:
-                    f.write("Energy:  cur=" + str(energy) + " thresh=" +
-                            str(self.energy_threshold))
-                f.close()
+            self._report_mic_level(energy)
 
             was_loud_enough = num_loud_chunks > min_loud_chunks
 
@@ -279,7 +570,7 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             if check_for_signal('buttonPress'):
                 phrase_complete = True
 
-        return byte_data
+        return byte_data.get().tobytes()
 
     @staticmethod
     def sec_to_bytes(sec, source):
@@ -310,36 +601,8 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             Signal stop and exit waiting state.
         """
         self._stop_signaled = True
-
-    def _upload_file(self, filename):
-        server = self.upload_config['server']
-        keyfile = resolve_resource_file('wakeword_rsa')
-        userfile = expanduser('~/.mycroft/wakeword_rsa')
-
-        if not isfile(userfile):
-            shutil.copy2(keyfile, userfile)
-            os.chmod(userfile, 0o600)
-            keyfile = userfile
-
-        address = self.upload_config['user'] + '@' + \
-            server + ':' + self.upload_config['folder']
-
-        self.upload_lock.acquire()
-        try:
-            self.filenames_to_upload.append(filename)
-            for i, fn in enumerate(self.filenames_to_upload):
-                LOG.debug('Uploading ' + fn + '...')
-                os.chmod(fn, 0o666)
-                cmd = 'scp -o StrictHostKeyChecking=no -P ' + \
-                      str(self.upload_config['port']) + ' -i ' + \
-                      keyfile + ' ' + fn + ' ' + address
-                if os.system(cmd) == 0:
-                    del self.filenames_to_upload[i]
-                    os.remove(fn)
-                else:
-                    LOG.debug('Could not upload ' + fn + ' to ' + server)
-        finally:
-            self.upload_lock.release()
+        if self.wake_word_queue:
+            self.wake_word_queue.stop()
 
     def _wait_until_wake_word(self, source, sec_per_buffer):
         """Listen continuously on source until a wake word is spoken
@@ -353,9 +616,6 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
 
         silence = '\0' * num_silent_bytes
 
-        # bytearray to store audio in
-        byte_data = silence
-
         buffers_per_check = self.SEC_BETWEEN_WW_CHECKS / sec_per_buffer
         buffers_since_check = 0.0
 
@@ -363,88 +623,86 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         max_size = self.sec_to_bytes(self.SAVED_WW_SEC, source)
         test_size = self.sec_to_bytes(self.TEST_WW_SEC, source)
 
-        said_wake_word = False
+        # Audio fed to a streaming engine when the voice activity gate opens
+        pre_roll_size = int(self.sec_to_bytes(self.vad.pre_roll_sec, source))
+
+        # ring buffer to store audio in
+        byte_data = RingBuffer(max(max_size, num_silent_bytes,
+                                   pre_roll_size + source.CHUNK *
+                                   source.SAMPLE_WIDTH))
+        byte_data.append(silence)
 
-        # Rolling buffer to track the audio energy (loudness) heard on
-        # the source recently.  An average audio energy is maintained
-        # based on these levels.
-        energies = []
-        idx_energy = 0
-        avg_energy = 0.0
-        energy_avg_samples = int(5 / sec_per_buffer)  # avg over last 5 secs
+        said_wake_word = False
+        gate_was_open = False
 
-        counter = 0
+        # Audio heard while recording the previous phrase was never fed to
+        # a streaming engine, start over with a fresh utterance
+        self.wake_word_recognizer.reset()
 
         while not said_wake_word and not self._stop_signaled:
             if self._skip_wake_word():
                 break
-            chunk = self.record_sound_chunk(source)
+            chunk = self.read_chunk(source)
 
             energy = self.calc_energy(chunk, source.SAMPLE_WIDTH)
-            if energy < self.energy_threshold * self.multiplier:
-                self._adjust_threshold(energy, sec_per_buffer)
-
-            if len(energies) < energy_avg_samples:
-                # build the average
-                energies.append(energy)
-                avg_energy += float(energy) / energy_avg_samples
+            self._update_noise_floor(energy, sec_per_buffer)
+
+            # Output energy level stats.  This can be used to visualize
+            # the microphone input, e.g. a needle on a meter.
+            self._report_mic_level(energy)
+
+            # Once full, the ring buffer overwrites its oldest audio
+            byte_data.append(chunk)
+
+            # Only run the decoder while speech-like audio is present
+            gate_open = self.vad.is_open(chunk, energy,
+                                         self.energy_threshold *
+                                         self.multiplier, sec_per_buffer)
+
+            if self.wake_word_recognizer.streaming:
+                if gate_open:
+                    # Streaming engines only need the newly captured audio,
+                    # plus the pre-roll when the gate just opened
+                    new_audio = chunk
+                    if not gate_was_open:
+                        new_audio = byte_data.get_last(
+                            pre_roll_size + len(chunk)).tobytes()
+                    said_wake_word = \
+                        self.wake_word_recognizer.update(new_audio)
+                    self.decodes_run += 1
+                else:
+                    if gate_was_open:
+                        self.wake_word_recognizer.reset()
+                    self.decodes_skipped += 1
             else:
-                # maintain the running average and rolling buffer
-                avg_energy -= float(energies[idx_energy]) / energy_avg_samples
-                avg_energy += float(energy) / energy_avg_samples
-                energies[idx_energy] = energy
-                idx_energy = (idx_energy + 1) % energy_avg_samples
-
-                # maintain the threshold using average
-                if energy < avg_energy * 1.5:
-                    if energy > self.energy_threshold:
-                        # bump the threshold to just above this value
-                        self.energy_threshold = energy * 1.2
-
-            # Periodically output energy level stats.  This can be used to
-            # visualize the microphone input, e.g. a needle on a meter.
-            if counter % 3:
-                with open(self.mic_level_file, 'w') as f:
-                    f.write("Energy:  cur=" + str(energy) + " thresh=" +
-                            str(self.energy_threshold))
-                f.close()
-            counter += 1
-
-            # At first, the buffer is empty and must fill up.  After that
-            # just drop the first chunk bytes to keep it the same size.
-            needs_to_grow = len(byte_data) < max_size
-            if needs_to_grow:
-                byte_data += chunk
-            else:  # Remove beginning of audio and add new chunk to end
-                byte_data = byte_data[len(chunk):] + chunk
-
-            buffers_since_check += 1.0
-            if buffers_since_check > buffers_per_check:
-                buffers_since_check -= buffers_per_check
-                chopped = byte_data[-test_size:] \
-                    if test_size < len(byte_data) else byte_data
-                audio_data = chopped + silence
-                said_wake_word = \
-                    self.wake_word_recognizer.found_wake_word(audio_data)
-                # if a wake word is success full then record audio in temp
-                # file.
-                if self.save_wake_words and said_wake_word:
-                    audio = self._create_audio_data(byte_data, source)
-                    stamp = str(int(1000 * get_time()))
-                    uid = SessionManager.get().session_id
-                    if not isdir(self.save_wake_words_dir):
-                        mkdir(self.save_wake_words_dir)
-
-                    dr = self.save_wake_words_dir
-                    ww = self.wake_word_name.replace(' ', '-')
-                    filename = join(dr, ww + '.' + stamp + '.' + uid + '.wav')
-                    with open(filename, 'wb') as f:
-                        f.write(audio.get_wav_data())
-
-                    if self.upload_config['enable'] or self.config['opt_in']:
-                        t = Thread(target=self._upload_file, args=(filename,))
-                        t.daemon = True
-                        t.start()
+                buffers_since_check += 1.0
+                if buffers_since_check > buffers_per_check:
+                    buffers_since_check -= buffers_per_check
+                    if gate_open:
+                        # The binding only takes str, the window is copied
+                        # out of the ring and again with the silence
+                        chopped = byte_data.get_last(test_size)
+                        audio_data = chopped.tobytes() + silence
+                        said_wake_word = self.wake_word_recognizer.\
+                            found_wake_word(audio_data)
+                        self.decodes_run += 1
+                    else:
+                        self.decodes_skipped += 1
+            gate_was_open = gate_open
+
+            if said_wake_word:
+                LOG.debug("Wake word decodes: %d run, %d skipped" %
+                          (self.decodes_run, self.decodes_skipped))
+
+            # if a wake word is success full then record audio in temp
+            # file.  Writing and uploading happen on the queue's worker.
+            if self.save_wake_words and said_wake_word:
+                audio = self._create_audio_data(byte_data.get().tobytes(),
+                                                source)
+                stamp = str(int(1000 * get_time()))
+                uid = SessionManager.get().session_id
+                ww = self.wake_word_name.replace(' ', '-')
+                self.wake_word_queue.put(ww + '.' + stamp + '.' + uid, audio)
 
     @staticmethod
     def _create_audio_data(raw_data, source):
@@ -454,7 +712,7 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
         """
         return AudioData(raw_data, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
 
-    def listen(self, source, emitter):
+    def listen(self, source, emitter, stream=None):
         """Listens for chunks of audio that Mycroft should perform STT on.
 
         This will listen continuously for a wake-up-word, then return the
@@ -465,57 +723,84 @@ class ResponsiveRecognizer(speech_recognition.Recognizer):
             source (AudioSource):  Source producing the audio chunks
             emitter (EventEmitter): Emitter for notifications of when recording
                                     begins and ends.
+            stream (UtteranceStream): optional stream opened when recording
+                                      begins and fed the phrase as it is
+                                      recorded
 
         Returns:
             AudioData: audio with the user's utterance, minus the wake-up-word
         """
         assert isinstance(source, AudioSource), "Source must be an AudioSource"
+        self.emitter = emitter
 
         #        bytes_per_sec = source.SAMPLE_RATE * source.SAMPLE_WIDTH
         sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
 
-        # Every time a new 'listen()' request begins, reset the threshold
-        # used for silence detection.  This is as good of a reset point as
-        # any, as we expect the user and Mycroft to not be talking.
-        # NOTE: adjust_for_ambient_noise() doc claims it will stop early if
-        #       speech is detected, but there is no code to actually do that.
-        self.adjust_for_ambient_noise(source, 1.0)
-
+        # The threshold used for silence detection follows the noise floor
+        # estimated from every chunk read, so listening starts right away
+        # instead of spending time calibrating on ambient noise.
         LOG.debug("Waiting for wake word...")
         self._wait_until_wake_word(source, sec_per_buffer)
         if self._stop_signaled:
             return
 
+        trace = start_trace('wakeword')
         LOG.debug("Recording...")
         emitter.emit("recognizer_loop:record_begin")
 
         # If enabled, play a wave file with a short sound to audibly
         # indicate recording has begun.
+        beep = None
         if self.config.get('confirm_listening'):
-            file = resolve_resource_file(
-                self.config.get('sounds').get('start_listening'))
-            if file:
-                play_wav(file)
-
-        frame_data = self._record_phrase(source, sec_per_buffer)
-        audio_data = self._create_audio_data(frame_data, source)
+            beep = self._confirm_listening()
+
+        # The upload is trimmed while recording, it is encoded by the STT
+        # engine, off the capture thread
+        trimmer = None
+        if self.trim_utterances:
+            trimmer = UtteranceTrimmer(source.SAMPLE_RATE,
+                                       source.SAMPLE_WIDTH,
+                                       margin_sec=self.silence_margin_sec)
+        if stream:
+            stream.trace = trace
+            stream.open(source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+        try:
+            frame_data = self._record_phrase(source, sec_per_buffer,
+                                             stream, trimmer, beep)
+            trace = stamp(trace, 'record_end')
+        finally:
+            if stream:
+                stream.trace = trace
+                stream.close()
+        if trimmer:
+            audio_data = TrimmedAudioData(frame_data, source.SAMPLE_RATE,
+                                          source.SAMPLE_WIDTH,
+                                          trimmer.finish(),
+                                          trimmer.target_rate)
+        else:
+            audio_data = self._create_audio_data(frame_data, source)
+        # Carried along with the audio to the transcription
+        audio_data.trace = trace
         emitter.emit("recognizer_loop:record_end")
-        if self.save_utterances:
-            LOG.info("Recording utterance")
-            stamp = str(datetime.datetime.now())
-            filename = "/tmp/mycroft_utterance%s.wav" % stamp
-            with open(filename, 'wb') as filea:
-                filea.write(audio_data.get_wav_data())
-            LOG.debug("Thinking...")
+        if self.save_utterances and self.utterance_recorder:
+            # Written out by the recorder's worker, not on the way to STT
+            self.utterance_recorder.put(audio_data, self.source)
 
         return audio_data
 
-    def _adjust_threshold(self, energy, seconds_per_buffer):
-        if self.dynamic_energy_threshold and energy > 0:
-            # account for different chunk sizes and rates
-            damping = (
-                self.dynamic_energy_adjustment_damping ** seconds_per_buffer)
-            target_energy = energy * self.energy_ratio
-            self.energy_threshold = (
-                self.energy_threshold * damping +
-                target_energy * (1 - damping))
+    def _update_noise_floor(self, energy, sec_per_buffer):
+        """Track the background noise and derive the energy threshold.
+
+        Args:
+            energy (int): energy of the chunk just read
+            sec_per_buffer (float):  Fractional number of seconds in each chunk
+        """
+        if self.noise_floor is None:
+            self.noise_floor = NoiseFloorEstimator(
+                self.NOISE_FLOOR_SEC / sec_per_buffer,
+                self.NOISE_FLOOR_PERCENTILE)
+        # Muted chunks are digital silence and say nothing about the room
+        if energy > 0:
+            level = self.noise_floor.update(energy)
+            if self.dynamic_energy_threshold:
+                self.energy_threshold = level * self.energy_ratio
@@ -0,0 +1,164 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Shared memory channel for microphone level samples
+
+The voice process writes a (timestamp, energy, threshold) sample for every
+chunk it reads into a small ring stored in a memory mapped file.  Writing
+is a memory copy, no system call is involved, and any process can map the
+file read-only to follow the microphone level, e.g. the CLI meter.
+
+File layout (little endian):
+    header: magic (4s), capacity (I), number of samples written (Q)
+    records: capacity times timestamp (d), energy (f), threshold (f)
+"""
+import mmap
+import struct
+
+import os
+
+from mycroft.util import get_ipc_directory
+
+MAGIC = 'MLV1'
+HEADER = struct.Struct('<4sIQ')
+RECORD = struct.Struct('<dff')
+COUNT_OFFSET = 8
+
+
+def get_mic_level_file(source=None):
+    """Path of the channel in the IPC directory.
+
+    Args:
+        source (str): name of the capture source, None for the default one
+    """
+    if source:
+        return os.path.join(get_ipc_directory(),
+                            "mic_level." + source + ".mmap")
+    return os.path.join(get_ipc_directory(), "mic_level.mmap")
+
+
+class MicLevelWriter(object):
+    """Write microphone level samples to the shared ring.
+
+    Args:
+        filename (str): path of the memory mapped file
+        capacity (int): number of samples kept in the ring
+    """
+
+    def __init__(self, filename, capacity=256):
+        self.capacity = capacity
+        self.count = 0
+        size = HEADER.size + capacity * RECORD.size
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(self.map, 0, MAGIC, capacity, 0)
+
+    def write(self, timestamp, energy, threshold):
+        offset = HEADER.size + (self.count % self.capacity) * RECORD.size
+        RECORD.pack_into(self.map, offset, timestamp, energy, threshold)
+        # Publish the sample only once it is complete
+        self.count += 1
+        struct.pack_into('<Q', self.map, COUNT_OFFSET, self.count)
+
+    def close(self):
+        self.map.close()
+
+
+class MicLevelReader(object):
+    """Follow the microphone level samples written by MicLevelWriter.
+
+    Args:
+        filename (str): path of the memory mapped file
+
+    Raises:
+        IOError, OSError: if the file does not exist or can't be mapped
+        ValueError: if the file is not a microphone level channel
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        # Kept open to notice when the file is removed
+        self.file = open(filename, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            if len(self.map) < HEADER.size:
+                raise ValueError(filename + ' is not a mic level channel')
+            magic, self.capacity, _ = HEADER.unpack_from(self.map, 0)
+            if (magic != MAGIC or len(self.map) <
+                    HEADER.size + self.capacity * RECORD.size):
+                raise ValueError(filename + ' is not a mic level channel')
+        except:
+            self.file.close()
+            raise
+
+    def is_stale(self):
+        """Check if the file was removed or replaced since it was mapped.
+
+        The voice process recreates it when the IPC directory is cleared,
+        the reader must then be opened again.
+
+        Returns:
+            bool: True if the mapping no longer follows the file
+        """
+        if os.fstat(self.file.fileno()).st_nlink == 0:
+            return True
+        try:
+            return (os.stat(self.filename).st_ino !=
+                    os.fstat(self.file.fileno()).st_ino)
+        except OSError:
+            return True
+
+    def count(self):
+        """ Number of samples written so far. """
+        return HEADER.unpack_from(self.map, 0)[2]
+
+    def _sample(self, index):
+        offset = HEADER.size + (index % self.capacity) * RECORD.size
+        return RECORD.unpack_from(self.map, offset)
+
+    def latest(self):
+        """Get the most recent sample.
+
+        Returns:
+            tuple: (timestamp, energy, threshold) or None if nothing written
+        """
+        count = self.count()
+        if count == 0:
+            return None
+        return self._sample(count - 1)
+
+    def read_since(self, index):
+        """Get the samples written after a previous call.
+
+        Args:
+            index (int): count returned by the previous call, 0 at first
+
+        Returns:
+            tuple: (list of samples, count to pass to the next call)
+        """
+        count = self.count()
+        if count < index:
+            # The writer was restarted
+            index = 0
+        index = max(index, count - self.capacity)
+        return [self._sample(i) for i in range(index, count)], count
+
+    def close(self):
+        self.map.close()
+        self.file.close()
@@ -0,0 +1,62 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from bisect import bisect_left, insort
+from collections import deque
+
+
+class NoiseFloorEstimator(object):
+    """Track the background noise level of an audio source.
+
+    The energies of the most recent chunks are kept in a sorted window and
+    a low percentile of them is reported as the noise floor.  Speech only
+    adds loud chunks, so the estimate keeps following the room noise while
+    somebody is talking and no separate calibration pass is needed.
+
+    Args:
+        window (int): number of chunk energies to track
+        percentile (float): percentile (0-100) reported as the noise floor
+    """
+
+    def __init__(self, window, percentile=15.0):
+        self.window = max(int(window), 1)
+        self.percentile = percentile
+        self._history = deque()
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._history)
+
+    def update(self, energy):
+        """Add the energy of a new chunk.
+
+        Args:
+            energy (int): energy of the chunk, e.g. from audioop.rms()
+
+        Returns:
+            float: the updated noise floor
+        """
+        self._history.append(energy)
+        insort(self._sorted, energy)
+        if len(self._history) > self.window:
+            oldest = self._history.popleft()
+            del self._sorted[bisect_left(self._sorted, oldest)]
+        return self.level()
+
+    def level(self):
+        """ Current noise floor, 0 until an energy has been added. """
+        if not self._sorted:
+            return 0
+        index = int(self.percentile / 100.0 * (len(self._sorted) - 1))
+        return self._sorted[index]
@@ -0,0 +1,223 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Shared memory channel for the audio played by the TTS
+
+The audio process writes the PCM of every clip it plays, placed on the
+monotonic clock at the time playback starts, into a ring stored in a
+memory mapped file.  The voice process reads the audio played while a
+chunk was captured and uses it as the reference signal of its echo
+canceller, see mycroft.client.speech.echo.
+
+Samples are 16 bit mono at the listener sample rate, the sample at
+monotonic time t is stored in slot int(t * sample_rate) % capacity.  Only
+the slots between the start and end indexes hold audio, reads outside of
+them return silence.
+
+File layout (little endian):
+    header: magic (4s), sample rate (I), capacity (I), start (q), end (q)
+    samples: capacity times int16
+"""
+import audioop
+import mmap
+import struct
+import wave
+
+import os
+
+from mycroft.metrics.trace import monotonic
+from mycroft.util import get_ipc_directory
+
+MAGIC = 'REF1'
+HEADER = struct.Struct('<4sIIqq')
+RANGE = struct.Struct('<qq')
+RANGE_OFFSET = 12
+SAMPLE_WIDTH = 2
+
+
+def get_reference_file():
+    """ Path of the channel in the IPC directory. """
+    return os.path.join(get_ipc_directory(), "reference.mmap")
+
+
+def convert_pcm(frame_data, sample_rate, sample_width, channels,
+                target_rate):
+    """Convert PCM audio to 16 bit mono.
+
+    Args:
+        frame_data (str): the audio
+        sample_rate (int): sample rate of the audio
+        sample_width (int): bytes per sample of the audio
+        channels (int): channels of the audio, two are mixed down
+        target_rate (int): sample rate to resample to
+
+    Returns:
+        str: 16 bit mono PCM at target_rate
+    """
+    if channels == 2:
+        frame_data = audioop.tomono(frame_data, sample_width, 0.5, 0.5)
+    if sample_width != SAMPLE_WIDTH:
+        frame_data = audioop.lin2lin(frame_data, sample_width, SAMPLE_WIDTH)
+    if sample_rate != target_rate:
+        frame_data, _ = audioop.ratecv(frame_data, SAMPLE_WIDTH, 1,
+                                       sample_rate, target_rate, None)
+    return frame_data
+
+
+class ReferenceWriter(object):
+    """Publish the audio played as the echo reference.
+
+    Args:
+        filename (str): path of the memory mapped file
+        sample_rate (int): sample rate of the microphone
+        capacity_sec (float): seconds of audio kept in the ring, longer
+                              clips are cut
+    """
+
+    def __init__(self, filename, sample_rate=16000, capacity_sec=60.0):
+        self.sample_rate = sample_rate
+        self.capacity = int(capacity_sec * sample_rate)
+        self.start = 0
+        self.end = 0
+        size = HEADER.size + self.capacity * SAMPLE_WIDTH
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(self.map, 0, MAGIC, sample_rate, self.capacity,
+                         0, 0)
+
+    def index(self, timestamp):
+        return int(timestamp * self.sample_rate)
+
+    def write(self, frame_data, sample_rate, sample_width=2, channels=1,
+              start_time=None):
+        """Publish a clip.
+
+        Args:
+            frame_data (str): the PCM played
+            sample_rate (int): sample rate of the clip
+            sample_width (int): bytes per sample of the clip
+            channels (int): channels of the clip, mixed down to mono
+            start_time (float): monotonic time playback starts, now if None
+        """
+        if start_time is None:
+            start_time = monotonic()
+        frame_data = convert_pcm(frame_data, sample_rate, sample_width,
+                                 channels, self.sample_rate)
+        frame_data = frame_data[:self.capacity * SAMPLE_WIDTH]
+
+        start = self.index(start_time)
+        end = start + len(frame_data) / SAMPLE_WIDTH
+        if not self.start <= start <= self.end:
+            self.start = start
+        self._store(start, frame_data)
+        self.end = end
+        self.start = max(self.start, end - self.capacity)
+        # Publish the range only once the audio is in place
+        RANGE.pack_into(self.map, RANGE_OFFSET, self.start, self.end)
+
+    def _store(self, start, frame_data):
+        offset = (start % self.capacity) * SAMPLE_WIDTH
+        first = frame_data[:self.capacity * SAMPLE_WIDTH - offset]
+        self.map[HEADER.size + offset:
+                 HEADER.size + offset + len(first)] = first
+        rest = frame_data[len(first):]
+        self.map[HEADER.size:HEADER.size + len(rest)] = rest
+
+    def write_wav(self, filename, start_time=None):
+        """ Publish the content of a wave file. """
+        wav = wave.open(filename, 'rb')
+        try:
+            frame_data = wav.readframes(wav.getnframes())
+            self.write(frame_data, wav.getframerate(), wav.getsampwidth(),
+                       wav.getnchannels(), start_time)
+        finally:
+            wav.close()
+
+    def stop(self, stop_time=None):
+        """ Playback was interrupted, drop the audio not played. """
+        if stop_time is None:
+            stop_time = monotonic()
+        self.end = max(self.start, min(self.end, self.index(stop_time)))
+        RANGE.pack_into(self.map, RANGE_OFFSET, self.start, self.end)
+
+    def close(self):
+        self.map.close()
+
+
+class ReferenceReader(object):
+    """Read the audio published by ReferenceWriter.
+
+    Args:
+        filename (str): path of the memory mapped file
+
+    Raises:
+        IOError, OSError: if the file does not exist or can't be mapped
+        ValueError: if the file is not a reference channel
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            raise ValueError(filename + ' is not a reference channel')
+        magic, self.sample_rate, self.capacity, _, _ = \
+            HEADER.unpack_from(self.map, 0)
+        if (magic != MAGIC or len(self.map) <
+                HEADER.size + self.capacity * SAMPLE_WIDTH):
+            raise ValueError(filename + ' is not a reference channel')
+
+    def index(self, timestamp):
+        return int(timestamp * self.sample_rate)
+
+    def range(self):
+        """ Indexes of the first sample and past the last one held. """
+        return RANGE.unpack_from(self.map, RANGE_OFFSET)
+
+    def is_active(self, start, end):
+        """ Check if audio was played between the two indexes. """
+        held_start, held_end = self.range()
+        return start < held_end and held_start < end
+
+    def read(self, start, num_samples):
+        """Get the audio played from a sample index on.
+
+        Args:
+            start (int): index of the first sample
+            num_samples (int): samples to read
+
+        Returns:
+            str: 16 bit PCM, silence where nothing was played
+        """
+        held_start, held_end = self.range()
+        first = max(start, held_start, held_end - self.capacity)
+        last = min(start + num_samples, held_end)
+        if first >= last:
+            return '\0' * num_samples * SAMPLE_WIDTH
+        data = []
+        index = first
+        while index < last:
+            slot = index % self.capacity
+            count = min(last - index, self.capacity - slot)
+            offset = HEADER.size + slot * SAMPLE_WIDTH
+            data.append(self.map[offset:offset + count * SAMPLE_WIDTH])
+            index += count
+        return ('\0' * (first - start) * SAMPLE_WIDTH + ''.join(data) +
+                '\0' * (start + num_samples - last) * SAMPLE_WIDTH)
+
+    def close(self):
+        self.map.close()
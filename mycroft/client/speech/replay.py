@@ -0,0 +1,264 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Replay recorded audio through the listener faster than realtime
+
+The audio goes through the same ResponsiveRecognizer.listen() path as the
+microphone: noise floor, voice activity gate, wake word engine and phrase
+recording.  Chunks are handed out as fast as the recognizer asks for them.
+
+Wake words can be labeled with a JSON file next to each WAV file, e.g.
+hey_mycroft_01.json for hey_mycroft_01.wav, listing where they are spoken:
+    {"wake_words": [{"start": 1.2, "end": 1.9}]}
+Files without labels are expected to contain no wake word.
+"""
+import audioop
+import json
+import resource
+import time
+import wave
+
+from os.path import basename, isfile, splitext
+from pyee import EventEmitter
+from speech_recognition import AudioSource
+
+from mycroft.client.speech.vad import VADFactory
+
+
+class ReplayStream(object):
+    """Stream reading from audio held in memory.
+
+    Raises EOFError once all the audio was read.
+    """
+
+    def __init__(self, frame_data, sample_width):
+        self.frame_data = frame_data
+        self.sample_width = sample_width
+        self.position = 0
+
+    def read(self, size):
+        if self.position >= len(self.frame_data):
+            raise EOFError
+        end = self.position + size * self.sample_width
+        chunk = self.frame_data[self.position:end]
+        self.position = end
+        return chunk
+
+
+class ReplaySource(AudioSource):
+    """Audio source replaying audio held in memory.
+
+    Args:
+        frame_data (str): mono audio
+        sample_rate (int): samples per second of the audio
+        sample_width (int): bytes per sample of the audio
+    """
+
+    def __init__(self, frame_data, sample_rate=16000, sample_width=2):
+        self.stream = ReplayStream(frame_data, sample_width)
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+        self.CHUNK = 1024
+
+    @staticmethod
+    def from_wav(filename, sample_rate=16000, sample_width=2):
+        """Load a WAV file, converted to the format used by the listener."""
+        wav = wave.open(filename, 'rb')
+        try:
+            data = wav.readframes(wav.getnframes())
+            width = wav.getsampwidth()
+            if wav.getnchannels() == 2:
+                data = audioop.tomono(data, width, 0.5, 0.5)
+            if width != sample_width:
+                data = audioop.lin2lin(data, width, sample_width)
+            if wav.getframerate() != sample_rate:
+                data, _ = audioop.ratecv(data, sample_width, 1,
+                                         wav.getframerate(), sample_rate,
+                                         None)
+        finally:
+            wav.close()
+        return ReplaySource(data, sample_rate, sample_width)
+
+    def duration(self):
+        """ Seconds of audio in the source. """
+        return float(len(self.stream.frame_data)) / (
+            self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+
+    def time(self):
+        """ Seconds of audio read so far. """
+        return float(min(self.stream.position,
+                         len(self.stream.frame_data))) / (
+            self.SAMPLE_RATE * self.SAMPLE_WIDTH)
+
+
+def load_labels(filename):
+    """Read the wake word labels of a WAV file.
+
+    Returns:
+        list: (start, end) in seconds of each wake word
+    """
+    labels = splitext(filename)[0] + '.json'
+    if not isfile(labels):
+        return []
+    with open(labels) as f:
+        return [(w['start'], w['end']) for w in json.load(f)['wake_words']]
+
+
+def score(detections, labels, max_latency):
+    """Match detections with labeled wake words.
+
+    A detection belongs to a wake word if it happens after the wake word
+    started and at most max_latency seconds after it ended.
+
+    Returns:
+        tuple: (latencies of the detected wake words, false accepts)
+    """
+    latencies = []
+    false_accepts = 0
+    remaining = sorted(labels)
+    for t in detections:
+        for label in remaining:
+            start, end = label
+            if start <= t <= end + max_latency:
+                latencies.append(t - end)
+                remaining.remove(label)
+                break
+        else:
+            false_accepts += 1
+    return latencies, false_accepts
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100.0), len(values) - 1)]
+
+
+class ListenerReplay(object):
+    """Replays WAV files through a ResponsiveRecognizer and scores it.
+
+    Args:
+        recognizer (ResponsiveRecognizer): the listener to evaluate
+    """
+
+    # Detections later than this after the end of a wake word are false
+    MAX_LATENCY_SEC = 2.0
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.initial_threshold = recognizer.energy_threshold
+        # Replays must not beep or keep the audio
+        recognizer.config = dict(recognizer.config, confirm_listening=False)
+        recognizer.save_wake_words = False
+        recognizer.save_utterances = False
+
+    def _reset(self):
+        """ Start each file without state left from the previous one. """
+        recognizer = self.recognizer
+        recognizer.energy_threshold = self.initial_threshold
+        recognizer.noise_floor = None
+        recognizer.vad = VADFactory.create(
+            recognizer.config.get('listener', {}).get('vad', {}))
+
+    def replay(self, source):
+        """Run the listener until the source is exhausted.
+
+        Returns:
+            list: seconds into the audio at which wake words were detected
+        """
+        self._reset()
+        detections = []
+        emitter = EventEmitter()
+        emitter.on('recognizer_loop:record_begin',
+                   lambda: detections.append(source.time()))
+        try:
+            while True:
+                self.recognizer.listen(source, emitter)
+        except EOFError:
+            pass
+        return detections
+
+    def run(self, filenames, on_file=None):
+        """Replay files and build a report.
+
+        Args:
+            filenames (list): WAV files to replay
+            on_file (callable): called with the result of each file
+
+        Returns:
+            dict: results per file and a summary
+        """
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_start = usage.ru_utime + usage.ru_stime
+        wall_start = time.time()
+        decodes_run = self.recognizer.decodes_run
+        decodes_skipped = self.recognizer.decodes_skipped
+
+        results = []
+        for filename in filenames:
+            source = ReplaySource.from_wav(filename)
+            labels = load_labels(filename)
+            detections = self.replay(source)
+            latencies, false_accepts = score(detections, labels,
+                                             self.MAX_LATENCY_SEC)
+            result = {
+                'file': basename(filename),
+                'duration_sec': source.duration(),
+                'wake_words': len(labels),
+                'detections': detections,
+                'hits': len(latencies),
+                'false_accepts': false_accepts,
+                'latencies_sec': latencies
+            }
+            results.append(result)
+            if on_file:
+                on_file(result)
+
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_sec = usage.ru_utime + usage.ru_stime - cpu_start
+        wall_sec = time.time() - wall_start
+        audio_sec = sum(r['duration_sec'] for r in results)
+        audio_hours = audio_sec / 3600.0
+        wake_words = sum(r['wake_words'] for r in results)
+        hits = sum(r['hits'] for r in results)
+        false_accepts = sum(r['false_accepts'] for r in results)
+        latencies = [l for r in results for l in r['latencies_sec']]
+
+        summary = {
+            'files': len(results),
+            'audio_sec': audio_sec,
+            'wall_sec': wall_sec,
+            'realtime_factor': audio_sec / wall_sec if wall_sec else None,
+            'wake_words': wake_words,
+            'hits': hits,
+            'misses': wake_words - hits,
+            'recall': float(hits) / wake_words if wake_words else None,
+            'false_accepts': false_accepts,
+            'false_accepts_per_hour': (false_accepts / audio_hours
+                                       if audio_hours else None),
+            'latency_mean_sec': (sum(latencies) / len(latencies)
+                                 if latencies else None),
+            'latency_median_sec': percentile(latencies, 50),
+            'latency_p90_sec': percentile(latencies, 90),
+            'latency_max_sec': max(latencies) if latencies else None,
+            'cpu_sec_per_audio_hour': (cpu_sec / audio_hours
+                                       if audio_hours else None),
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_mb': usage.ru_maxrss / 1024.0,
+            'decodes_run': self.recognizer.decodes_run - decodes_run,
+            'decodes_skipped': (self.recognizer.decodes_skipped -
+                                decodes_skipped)
+        }
+        return {'summary': summary, 'files': results}
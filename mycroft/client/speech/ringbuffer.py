@@ -0,0 +1,99 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+class RingBuffer(object):
+    """Fixed size byte buffer holding the most recently appended audio.
+
+    The storage is preallocated once and every byte is written twice, at
+    its position in the ring and again one ring length further.  This way
+    the newest N bytes always lie contiguously in memory and can be handed
+    out as a memoryview without joining the two halves of the ring.
+
+    Args:
+        size (int): maximum number of bytes kept in the buffer
+    """
+
+    def __init__(self, size):
+        self.size = int(size)
+        self._data = bytearray(2 * self.size)
+        self._view = memoryview(self._data)
+        self._pos = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def is_full(self):
+        return self._len == self.size
+
+    def clear(self):
+        """ Forget all buffered audio, keeping the allocated storage. """
+        self._pos = 0
+        self._len = 0
+
+    def append(self, chunk):
+        """Add bytes at the end of the buffer.
+
+        Once the buffer is full the oldest bytes are overwritten.  The cost
+        is proportional to the size of the chunk, not of the buffer.
+
+        Args:
+            chunk (str): raw audio bytes
+        """
+        chunk = memoryview(chunk)
+        num_bytes = len(chunk)
+        if num_bytes >= self.size:
+            # Only the tail of the chunk can survive
+            chunk = chunk[num_bytes - self.size:]
+            num_bytes = self.size
+
+        size = self.size
+        pos = self._pos
+        end = pos + num_bytes
+        if end <= size:
+            self._view[pos:end] = chunk
+            self._view[pos + size:end + size] = chunk
+        else:
+            first = size - pos
+            self._view[pos:size] = chunk[:first]
+            self._view[pos + size:] = chunk[:first]
+            self._view[:num_bytes - first] = chunk[first:]
+            self._view[size:size + num_bytes - first] = chunk[first:]
+
+        self._pos = end % size
+        self._len = min(self._len + num_bytes, size)
+
+    def get_last(self, num_bytes):
+        """Get the newest bytes in the buffer.
+
+        The returned memoryview shares memory with the buffer, so it is
+        only valid until the next call to append().  Use tobytes() on it to
+        keep a copy.
+
+        Args:
+            num_bytes (int): number of bytes wanted, at most len(self) will
+                             be returned
+
+        Returns:
+            memoryview: the last num_bytes bytes, oldest first
+        """
+        num_bytes = min(int(num_bytes), self._len)
+        end = self._pos + self.size
+        return self._view[end - num_bytes:end]
+
+    def get(self):
+        """ Get everything in the buffer as a memoryview, oldest first. """
+        return self.get_last(self._len)
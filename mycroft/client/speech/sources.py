@@ -0,0 +1,215 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Capture sources besides the local microphone
+
+Sources deliver 16 bit mono PCM at the listener sample rate.  Reads never
+block for long: when a source has no data, e.g. no writer is connected,
+the missing audio is filled with silence so the listener keeps running
+and can be stopped.
+"""
+import errno
+import select
+import socket
+import time
+from abc import ABCMeta, abstractmethod
+
+import os
+from speech_recognition import AudioSource
+
+from mycroft.client.speech.mic import MutableMicrophone
+from mycroft.util.log import LOG
+
+
+class RawStream(object):
+    """ Stream of a RawAudioSource, as read by the listener. """
+
+    def __init__(self, source):
+        self.source = source
+
+    def read(self, size):
+        num_bytes = size * self.source.SAMPLE_WIDTH
+        chunk = self.source.read_bytes(num_bytes)
+        if self.source.muted:
+            return '\0' * num_bytes
+        return chunk
+
+
+class RawAudioSource(AudioSource):
+    """Raw PCM audio received from outside the process.
+
+    Args:
+        sample_rate (int): samples per second
+        chunk_size (int): samples per chunk read by the listener
+        mute (bool): start muted
+    """
+    __metaclass__ = ABCMeta
+
+    SAMPLE_WIDTH = 2
+
+    # Seconds to wait before retrying a source which failed
+    RETRY_SEC = 1.0
+
+    def __init__(self, sample_rate=16000, chunk_size=1024, mute=False):
+        self.SAMPLE_RATE = sample_rate
+        self.CHUNK = chunk_size
+        self.stream = None
+        self.muted = mute
+        self.pending = ''
+        self.retry_at = 0
+        # Longest wait for a chunk, twice the time it takes to capture it
+        self.timeout = 2.0 * chunk_size / sample_rate
+
+    def __enter__(self):
+        self.stream = RawStream(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.stream = None
+
+    @abstractmethod
+    def receive(self, num_bytes, timeout):
+        """Read what is available, up to num_bytes.
+
+        Returns:
+            str: the data, empty if none arrived within timeout
+        """
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    def read_bytes(self, num_bytes):
+        """ Read a chunk, missing audio is replaced by silence. """
+        data = self.pending
+        deadline = time.time() + self.timeout
+        while len(data) < num_bytes:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            if time.time() < self.retry_at:
+                time.sleep(min(remaining, self.retry_at - time.time()))
+                continue
+            try:
+                data += self.receive(num_bytes - len(data), remaining)
+            except (IOError, OSError, socket.error) as e:
+                LOG.warning('Capture source failed: ' + repr(e))
+                self.close()
+                self.retry_at = time.time() + self.RETRY_SEC
+        self.pending = data[num_bytes:]
+        data = data[:num_bytes]
+        return data + '\0' * (num_bytes - len(data))
+
+    def mute(self):
+        self.muted = True
+
+    def unmute(self):
+        self.muted = False
+
+    def is_muted(self):
+        return self.muted
+
+
+class FifoSource(RawAudioSource):
+    """Audio written to a named pipe, e.g. by arecord or a USB bridge.
+
+    Args:
+        path (str): the named pipe, created if missing
+    """
+
+    def __init__(self, path, **kwargs):
+        super(FifoSource, self).__init__(**kwargs)
+        self.path = path
+        self.fd = None
+
+    def receive(self, num_bytes, timeout):
+        if self.fd is None:
+            if not os.path.exists(self.path):
+                os.mkfifo(self.path)
+            self.fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return ''
+        try:
+            data = os.read(self.fd, num_bytes)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return ''
+            raise
+        if not data:
+            # No writer, wait for the next one
+            self.close()
+            self.retry_at = time.time() + min(self.RETRY_SEC, timeout)
+        return data
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class NetworkSource(RawAudioSource):
+    """Audio streamed by a TCP server, e.g. a networked mic array.
+
+    Args:
+        host (str): address of the server
+        port (int): port of the server
+    """
+
+    def __init__(self, host, port, **kwargs):
+        super(NetworkSource, self).__init__(**kwargs)
+        self.address = (host, port)
+        self.sock = None
+
+    def receive(self, num_bytes, timeout):
+        if self.sock is None:
+            self.sock = socket.create_connection(self.address, timeout)
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(num_bytes)
+        except socket.timeout:
+            return ''
+        if not data:
+            raise IOError('Connection closed by ' + str(self.address))
+        return data
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class AudioSourceFactory(object):
+    @staticmethod
+    def create(config, sample_rate=16000, mute=False):
+        """Create a capture source.
+
+        Args:
+            config (dict): source configuration, "type" selects the class
+            sample_rate (int): samples per second of the listener
+            mute (bool): start muted
+        """
+        source_type = config.get("type", "microphone")
+        if source_type == "microphone":
+            return MutableMicrophone(config.get("device_index"), sample_rate,
+                                     mute=mute)
+        elif source_type == "fifo":
+            return FifoSource(config["path"], sample_rate=sample_rate,
+                              mute=mute)
+        elif source_type == "tcp":
+            return NetworkSource(config["host"], config["port"],
+                                 sample_rate=sample_rate, mute=mute)
+        raise ValueError("Unknown capture source type " + str(source_type))
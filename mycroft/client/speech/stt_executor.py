@@ -0,0 +1,177 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from Queue import Queue
+from collections import deque
+from threading import Condition, Thread
+from time import time
+
+from mycroft.util.log import LOG
+
+
+class STTRequest(object):
+    """ A transcription submitted to the STTExecutor. """
+
+    def __init__(self, execute, deadline, context=None, key=None):
+        self.execute = execute
+        self.deadline = deadline
+        self.context = context
+        self.key = key
+        self.submitted = time()
+        self.text = None
+        self.done = False
+        self.cancelled = False
+
+
+class STTExecutor(object):
+    """Runs transcriptions on a pool of worker threads.
+
+    Results are handed to on_result in the order the requests were
+    submitted.  A request still running after its deadline is cancelled so
+    the ones submitted after it are not held back.  With supersede, a new
+    request cancels all older ones with the same key which have no result
+    yet.
+
+    Python threads can't be interrupted, a cancelled request keeps its
+    worker busy until the engine returns but its result is discarded.
+
+    Args:
+        on_result (callable): called with the text and context of each
+                              request, from the dispatcher thread
+        workers (int): number of worker threads
+        deadline_sec (float): seconds a request may take
+        supersede (bool): True to cancel older requests on submit
+        metrics (MetricsAggregator): optional metrics for queue depth,
+                                     latency and cancellations
+    """
+
+    def __init__(self, on_result, workers=2, deadline_sec=15.0,
+                 supersede=True, metrics=None):
+        self.on_result = on_result
+        self.deadline_sec = deadline_sec
+        self.supersede = supersede
+        self.metrics = metrics
+        self.requests = Queue()
+        self.pending = deque()
+        self.lock = Condition()
+        self.running = True
+
+        self.threads = [Thread(target=self._dispatch)]
+        for _ in range(max(1, workers)):
+            self.threads.append(Thread(target=self._work))
+        for t in self.threads:
+            t.daemon = True
+            t.start()
+
+    def submit(self, execute, deadline_sec=None, context=None, key=None):
+        """Queue a transcription.
+
+        Args:
+            execute (callable): returns the text, None if there is none
+            deadline_sec (float): overrides the default deadline
+            context (dict): handed to on_result with the text
+            key: requests only supersede older ones with the same key, e.g.
+                 the capture source
+
+        Returns:
+            STTRequest: the queued request
+        """
+        deadline = time() + (deadline_sec or self.deadline_sec)
+        request = STTRequest(execute, deadline, context, key)
+        with self.lock:
+            if self.supersede:
+                for old in self.pending:
+                    if (old.key == key and not old.done and
+                            not old.cancelled):
+                        self._cancel(old, 'superseded')
+            self.pending.append(request)
+            self._report_depth()
+            self.lock.notify_all()
+        self.requests.put(request)
+        return request
+
+    def queue_depth(self):
+        """ Number of requests waiting for their result to be emitted. """
+        with self.lock:
+            return len(self.pending)
+
+    def shutdown(self):
+        with self.lock:
+            self.running = False
+            for request in self.pending:
+                request.cancelled = True
+            self.lock.notify_all()
+        for _ in self.threads:
+            self.requests.put(None)
+
+    def _report_depth(self):
+        if self.metrics:
+            self.metrics.level('stt.queue_depth', len(self.pending))
+
+    def _cancel(self, request, reason):
+        LOG.warning('STT request ' + reason + ' after %.2f seconds' %
+                    (time() - request.submitted))
+        request.cancelled = True
+        if self.metrics:
+            self.metrics.increment('stt.' + reason)
+
+    def _work(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            if request.cancelled:
+                continue
+            try:
+                text = request.execute()
+            except Exception:
+                LOG.exception('STT request failed')
+                text = None
+            with self.lock:
+                request.text = text
+                request.done = True
+                self.lock.notify_all()
+
+    def _dispatch(self):
+        while True:
+            results = []
+            with self.lock:
+                if not self.running:
+                    return
+                now = time()
+                for request in self.pending:
+                    if (not request.done and not request.cancelled and
+                            request.deadline <= now):
+                        self._cancel(request, 'expired')
+                while self.pending and (self.pending[0].done or
+                                        self.pending[0].cancelled):
+                    request = self.pending.popleft()
+                    if not request.cancelled:
+                        results.append(request)
+                if results:
+                    self._report_depth()
+                elif self.pending:
+                    deadline = min(r.deadline for r in self.pending
+                                   if not r.done and not r.cancelled)
+                    self.lock.wait(max(deadline - now, 0.01))
+                else:
+                    self.lock.wait()
+
+            # Emitting from this thread only keeps the results in order
+            for request in results:
+                if self.metrics:
+                    self.metrics.timer('stt.latency',
+                                       time() - request.submitted)
+                if request.text:
+                    self.on_result(request.text, request.context)
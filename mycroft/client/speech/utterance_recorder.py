@@ -0,0 +1,206 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Recording of the utterances heard, to collect datasets on devices
+
+The listener hands each utterance over as soon as it is recorded and goes
+on with the transcription, a worker thread encodes it and writes it out.
+The recordings are listed in an index, one JSON object per line:
+
+    {"file": "kitchen.1500000000000.flac", "time": 1500000000.0,
+     "duration_sec": 2.1, "source": "kitchen", "trace_id": "...",
+     "transcript": "what time is it"}
+
+The transcript is added once the STT engine returned it.
+"""
+import json
+from Queue import Queue, Empty, Full
+from threading import Thread, Event
+from time import time
+
+import os
+from os.path import expanduser, join
+
+from mycroft.util.log import LOG
+
+
+class UtteranceRecorder(Thread):
+    """Saves the utterances as FLAC files in a directory.
+
+    Utterances are handed over through a bounded in-memory queue so the
+    listener never waits for the encoder or the disk.  The directory is
+    kept under a size and age limit by dropping the oldest recordings.
+
+    Args:
+        config (dict): utterance_recording configuration
+    """
+
+    # Utterances waiting to be written before new ones get dropped
+    MAX_QUEUED_UTTERANCES = 8
+    INDEX_FILE = 'index.jsonl'
+
+    def __init__(self, config):
+        super(UtteranceRecorder, self).__init__()
+        self.daemon = True
+        self.directory = expanduser(config.get('directory',
+                                               '~/.mycroft/utterances'))
+        self.max_bytes = config.get('max_mb', 100) * 1024 * 1024
+        self.max_age = config.get('max_age_days', 7) * 24 * 3600
+        self.transcripts = config.get('transcripts', True)
+        self.index = None
+        self.queue = Queue(self.MAX_QUEUED_UTTERANCES)
+        self._stop_event = Event()
+
+    def put(self, audio, source=None):
+        """Queue an utterance, never blocks.
+
+        The worker thread is started by the first utterance.
+
+        Args:
+            audio (AudioData): the utterance, with its trace if any
+            source (str): name of the capture source, None for the default
+
+        Returns:
+            bool: False if the queue was full and the utterance dropped
+        """
+        if not self.is_alive() and not self._stop_event.is_set():
+            try:
+                self.start()
+            except RuntimeError:
+                pass  # Started by another source
+        try:
+            self.queue.put_nowait(('audio', audio, source))
+            return True
+        except Full:
+            LOG.warning('Utterance recorder queue full, dropping utterance')
+            return False
+
+    def add_transcript(self, context, text):
+        """Attach the transcript to the recording of an utterance.
+
+        Args:
+            context (dict): message context of the utterance, carrying
+                            its trace
+            text (str): the transcript
+        """
+        trace_id = (context or {}).get('trace', {}).get('id')
+        if not self.transcripts or not trace_id or not self.is_alive():
+            return
+        try:
+            self.queue.put_nowait(('transcript', trace_id, text))
+        except Full:
+            LOG.warning('Utterance recorder queue full, dropping transcript')
+
+    def stop(self):
+        """ Stop once the queued utterances are written. """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                os.remove(join(self.directory, name))
+        while not self._stop_event.is_set():
+            self.process(timeout=1.0)
+        while not self.queue.empty():
+            self.process()
+
+    def process(self, timeout=0):
+        """Run one iteration of the worker.
+
+        Args:
+            timeout (float): seconds to wait for an utterance
+        """
+        try:
+            item = self.queue.get(timeout=timeout)
+        except Empty:
+            return
+        try:
+            if self.index is None:
+                self.index = self._load_index()
+            if item[0] == 'audio':
+                self._write_utterance(item[1], item[2])
+                self._enforce_limits()
+            else:
+                self._set_transcript(item[1], item[2])
+            self._save_index()
+        except (IOError, OSError):
+            LOG.exception('Could not record utterance')
+
+    def _load_index(self):
+        entries = []
+        path = join(self.directory, self.INDEX_FILE)
+        if os.path.isfile(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Cut short by a crash
+                    if os.path.isfile(join(self.directory, entry['file'])):
+                        entries.append(entry)
+        return entries
+
+    def _save_index(self):
+        path = join(self.directory, self.INDEX_FILE)
+        with open(path + '.tmp', 'w') as f:
+            for entry in self.index:
+                f.write(json.dumps(entry) + '\n')
+        os.rename(path + '.tmp', path)
+
+    def _write_utterance(self, audio, source):
+        now = time()
+        name = (source or 'utterance') + '.' + str(int(1000 * now)) + '.flac'
+        data = audio.get_flac_data()
+        tmp = join(self.directory, name + '.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.rename(tmp, join(self.directory, name))
+
+        trace = (getattr(audio, 'trace', None) or {}).get('trace', {})
+        entry = {
+            'file': name,
+            'time': now,
+            'duration_sec': float(len(audio.frame_data)) / (
+                audio.sample_rate * audio.sample_width),
+            'size': len(data),
+            'source': source,
+            'trace_id': trace.get('id')
+        }
+        self.index.append(entry)
+
+    def _set_transcript(self, trace_id, text):
+        # Recent utterances are the likeliest to be transcribed
+        for entry in reversed(self.index):
+            if entry.get('trace_id') == trace_id:
+                entry['transcript'] = text
+                return
+
+    def _enforce_limits(self):
+        now = time()
+        kept = []
+        total = sum(entry['size'] for entry in self.index)
+        for entry in self.index:
+            if now - entry['time'] > self.max_age or total > self.max_bytes:
+                LOG.debug('Dropping recorded utterance ' + entry['file'])
+                total -= entry['size']
+                path = join(self.directory, entry['file'])
+                if os.path.isfile(path):
+                    os.remove(path)
+            else:
+                kept.append(entry)
+        self.index = kept
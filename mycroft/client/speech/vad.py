@@ -0,0 +1,125 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from mycroft.configuration import ConfigurationManager
+from mycroft.util.log import LOG
+
+
+class VoiceActivityGate(object):
+    """Decides whether the wake word decoder needs to look at the audio.
+
+    This base gate is always open, every chunk goes to the decoder.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or {}
+        # Seconds of audio fed to a streaming decoder when the gate opens
+        self.pre_roll_sec = self.config.get("pre_roll_sec", 0.5)
+
+    def is_open(self, chunk, energy, threshold, sec_per_buffer):
+        """Check if the audio may contain speech.
+
+        Args:
+            chunk (str): the chunk just captured
+            energy (int): energy of the chunk
+            threshold (float): energy above which audio is considered loud
+            sec_per_buffer (float): Fractional number of seconds in each chunk
+
+        Returns:
+            bool: True if the decoder should run
+        """
+        return True
+
+
+class EnergyGate(VoiceActivityGate):
+    """Energy gate with hysteresis.
+
+    Opens as soon as a chunk is louder than the threshold and closes only
+    once the audio has stayed below a lower level for hangover_sec.
+    """
+
+    def __init__(self, config=None):
+        super(EnergyGate, self).__init__(config)
+        self.open_ratio = self.config.get("open_ratio", 1.0)
+        self.close_ratio = self.config.get("close_ratio", 0.8)
+        self.hangover_sec = self.config.get("hangover_sec", 1.0)
+        self.opened = False
+        self.quiet_sec = 0.0
+
+    def is_speech(self, chunk, energy, threshold):
+        return energy > threshold * self.open_ratio
+
+    def is_open(self, chunk, energy, threshold, sec_per_buffer):
+        if self.is_speech(chunk, energy, threshold):
+            self.opened = True
+            self.quiet_sec = 0.0
+        elif self.opened:
+            if energy < threshold * self.close_ratio:
+                self.quiet_sec += sec_per_buffer
+                if self.quiet_sec >= self.hangover_sec:
+                    self.opened = False
+            else:
+                self.quiet_sec = 0.0
+        return self.opened
+
+
+class SpectralFlatnessGate(EnergyGate):
+    """Energy gate which also requires a speech-like spectrum.
+
+    Steady noise such as fans has a flat spectrum while voiced speech is
+    dominated by a few harmonics.  Loud chunks only open the gate when
+    their spectral flatness is below max_flatness.
+    """
+
+    def __init__(self, config=None):
+        super(SpectralFlatnessGate, self).__init__(config)
+        # Spectral gate module imports
+        import numpy
+        self.numpy = numpy
+        self.max_flatness = self.config.get("max_flatness", 0.5)
+
+    def flatness(self, chunk):
+        np = self.numpy
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        spectrum = np.abs(np.fft.rfft(samples)) + 1e-10
+        return np.exp(np.mean(np.log(spectrum))) / np.mean(spectrum)
+
+    def is_speech(self, chunk, energy, threshold):
+        return (super(SpectralFlatnessGate, self).is_speech(
+            chunk, energy, threshold) and
+            self.flatness(chunk) < self.max_flatness)
+
+
+class VADFactory(object):
+    CLASSES = {
+        "none": VoiceActivityGate,
+        "energy": EnergyGate,
+        "spectral": SpectralFlatnessGate
+    }
+
+    @staticmethod
+    def create(config=None):
+        if config is None:
+            config = ConfigurationManager.get().get("listener", {})
+            config = config.get("vad", {})
+        module = config.get("module", "none")
+        clazz = VADFactory.CLASSES.get(module)
+        if not clazz:
+            LOG.warning("Unknown voice activity gate " + str(module))
+            clazz = VoiceActivityGate
+        try:
+            return clazz(config)
+        except ImportError:
+            LOG.exception("Could not load voice activity gate " + module)
+            return VoiceActivityGate(config)
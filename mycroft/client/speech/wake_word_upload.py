@@ -0,0 +1,278 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import tarfile
+from Queue import Queue, Empty, Full
+from abc import ABCMeta, abstractmethod
+from threading import Thread, Event
+from time import time
+
+import os
+from os.path import expanduser, isfile, join
+
+from mycroft.util import resolve_resource_file
+from mycroft.util.log import LOG
+
+
+class WakeWordUploader(object):
+    """Sends archives of wake word samples to where they are collected."""
+    __metaclass__ = ABCMeta
+
+    def __init__(self, config):
+        self.config = config
+
+    @abstractmethod
+    def upload(self, filename):
+        """Send one archive.
+
+        Args:
+            filename (str): path of the archive
+
+        Returns:
+            bool: True if the archive was delivered and can be deleted
+        """
+        pass
+
+
+class ScpUploader(WakeWordUploader):
+    def upload(self, filename):
+        server = self.config['server']
+        keyfile = resolve_resource_file('wakeword_rsa')
+        userfile = expanduser('~/.mycroft/wakeword_rsa')
+
+        if not isfile(userfile):
+            shutil.copy2(keyfile, userfile)
+            os.chmod(userfile, 0o600)
+        keyfile = userfile
+
+        address = self.config['user'] + '@' + \
+            server + ':' + self.config['folder']
+        os.chmod(filename, 0o666)
+        cmd = 'scp -o StrictHostKeyChecking=no -P ' + \
+              str(self.config['port']) + ' -i ' + \
+              keyfile + ' ' + filename + ' ' + address
+        return os.system(cmd) == 0
+
+
+class LocalDirUploader(WakeWordUploader):
+    """Copies the archives to a local directory, e.g. a mounted share."""
+
+    def upload(self, filename):
+        directory = expanduser(self.config['directory'])
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        shutil.copy(filename, directory)
+        return True
+
+
+class UploaderFactory(object):
+    CLASSES = {
+        "scp": ScpUploader,
+        "local": LocalDirUploader
+    }
+
+    @staticmethod
+    def create(config):
+        module = config.get("module", "scp")
+        clazz = UploaderFactory.CLASSES.get(module)
+        if not clazz:
+            LOG.warning("Unknown wake word uploader " + str(module))
+            clazz = ScpUploader
+        return clazz(config)
+
+
+class WakeWordUploadQueue(Thread):
+    """Saves wake word samples to a spool directory and uploads them.
+
+    Samples are handed over through a bounded in-memory queue so the wake
+    word loop never waits for the disk or the network.  A single worker
+    writes them out, packs them in batches into compressed archives and
+    uploads the archives, backing off exponentially while uploads fail.
+    The spool is kept under a size and age limit by dropping the oldest
+    files.  Without an uploader the samples are only saved.
+
+    The spool is only scanned after a sample was written, when a failed
+    upload is due again, or every scan_sec while idle.
+
+    Args:
+        directory (str): spool directory
+        config (dict): wake_word_upload configuration
+        uploader (WakeWordUploader): where archives go, None to keep the
+                                     samples locally
+    """
+
+    # Samples waiting to be written before new ones get dropped
+    MAX_QUEUED_SAMPLES = 16
+
+    def __init__(self, directory, config, uploader=None):
+        super(WakeWordUploadQueue, self).__init__()
+        self.daemon = True
+        self.directory = directory
+        self.uploader = uploader
+        self.batch_size = config.get('batch_size', 20)
+        self.batch_sec = config.get('batch_sec', 300)
+        self.max_bytes = config.get('max_spool_mb', 50) * 1024 * 1024
+        self.max_age = config.get('max_age_days', 7) * 24 * 3600
+        self.min_retry_sec = config.get('retry_sec', 30)
+        self.max_retry_sec = config.get('max_retry_sec', 3600)
+        self.retry_sec = self.min_retry_sec
+        self.next_upload = 0
+        self.upload_failed = False
+        self.scan_sec = config.get('scan_sec', 300)
+        self.next_scan = 0
+        self.samples = Queue(self.MAX_QUEUED_SAMPLES)
+        self._stop_event = Event()
+
+    def put(self, name, audio):
+        """Queue a sample, never blocks.
+
+        The worker thread is started by the first sample.
+
+        Args:
+            name (str): file name of the sample, without extension
+            audio (AudioData): the sample
+
+        Returns:
+            bool: False if the queue was full and the sample dropped
+        """
+        if not self.is_alive() and not self._stop_event.is_set():
+            try:
+                self.start()
+            except RuntimeError:
+                pass  # Started by another detection
+        try:
+            self.samples.put_nowait((name, audio))
+            return True
+        except Full:
+            LOG.warning("Wake word upload queue full, dropping " + name)
+            return False
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        for name in self._list('.tmp'):
+            os.remove(join(self.directory, name))
+        while not self._stop_event.is_set():
+            self.process(timeout=1.0)
+        # Keep what was already detected for the next run
+        while not self.samples.empty():
+            self.process()
+
+    def process(self, timeout=0):
+        """Run one iteration of the worker.
+
+        Args:
+            timeout (float): seconds to wait for a new sample
+        """
+        written = False
+        try:
+            name, audio = self.samples.get(timeout=timeout)
+            self._write_sample(name, audio)
+            written = True
+        except Empty:
+            pass
+        except (IOError, OSError):
+            LOG.exception("Could not save wake word sample")
+
+        # Listing the spool wakes the disk up, only do it when needed
+        now = time()
+        retry = self.upload_failed and now >= self.next_upload
+        if not written and not retry and now < self.next_scan:
+            return
+        self.next_scan = now + self.scan_sec
+
+        try:
+            self._enforce_limits()
+            if self.uploader:
+                self._archive()
+                self._upload()
+        except (IOError, OSError, tarfile.TarError):
+            LOG.exception("Wake word spool error")
+
+    def _list(self, extension):
+        return sorted(f for f in os.listdir(self.directory)
+                      if f.endswith(extension))
+
+    def _write_sample(self, name, audio):
+        tmp = join(self.directory, name + '.wav.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(audio.get_wav_data())
+        os.rename(tmp, join(self.directory, name + '.wav'))
+
+    def _enforce_limits(self):
+        now = time()
+        files = []
+        for name in self._list('.wav') + self._list('.tar.gz'):
+            path = join(self.directory, name)
+            st = os.stat(path)
+            if now - st.st_mtime > self.max_age:
+                LOG.debug('Dropping expired wake word file ' + name)
+                os.remove(path)
+            else:
+                files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            LOG.debug('Wake word spool full, dropping ' + path)
+            os.remove(path)
+            total -= size
+
+    def _archive(self):
+        samples = self._list('.wav')
+        if not samples:
+            return
+        oldest = min(os.stat(join(self.directory, f)).st_mtime
+                     for f in samples)
+        if (len(samples) < self.batch_size and
+                time() - oldest < self.batch_sec):
+            return
+
+        samples = samples[:self.batch_size]
+        name = 'wake-words.' + str(int(1000 * time())) + '.tar.gz'
+        tmp = join(self.directory, name + '.tmp')
+        with tarfile.open(tmp, 'w:gz') as archive:
+            for sample in samples:
+                archive.add(join(self.directory, sample), arcname=sample)
+        os.rename(tmp, join(self.directory, name))
+        for sample in samples:
+            os.remove(join(self.directory, sample))
+
+    def _upload(self):
+        if time() < self.next_upload:
+            return
+        for name in self._list('.tar.gz'):
+            path = join(self.directory, name)
+            LOG.debug('Uploading ' + path + '...')
+            try:
+                success = self.uploader.upload(path)
+            except Exception:
+                LOG.exception('Wake word upload failed')
+                success = False
+
+            if not success:
+                LOG.debug('Could not upload ' + path + ', retrying in ' +
+                          str(self.retry_sec) + ' seconds')
+                self.next_upload = time() + self.retry_sec
+                self.retry_sec = min(2 * self.retry_sec, self.max_retry_sec)
+                self.upload_failed = True
+                return
+            os.remove(path)
+            self.retry_sec = self.min_retry_sec
+            self.upload_failed = False
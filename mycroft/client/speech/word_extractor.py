@@ -21,6 +21,8 @@ class WordExtractor:
 
     def __init__(self, audio, recognizer, metrics):
         self.audio = audio
+        # Number of decodes run to find the range
+        self.decodes = 0
         self.recognizer = recognizer
         self.audio_size = len(self.audio.frame_data)
         self.delta = int(self.audio_size / 2)
@@ -46,6 +48,7 @@ class WordExtractor:
             self.__add(is_begin, dt * sign)
             segment = self.audio.frame_data[self.begin:self.end]
             found = self.recognizer.is_recognized(segment, self.metrics)
+            self.decodes += 1
             if not found:
                 self.__add(is_begin, dt * -sign)
             dt = int(dt / 2)
@@ -68,3 +71,26 @@ class WordExtractor:
                                                               self.audio_size]
         return AudioData(byte_data, self.audio.sample_rate,
                          self.audio.sample_width)
+
+
+class SegmentWordExtractor(WordExtractor):
+    """Cuts out the wake word using the timestamps of a single decode.
+
+    The recognizer reports where the wake word starts and ends, instead of
+    narrowing the range down with a decode per step.  As with the binary
+    search, the range is the whole audio if the wake word isn't found.
+    """
+
+    def calculate_range(self):
+        segment = self.recognizer.find_wake_word_segment(
+            self.audio.frame_data)
+        self.decodes += 1
+        if not segment:
+            return
+        start, end = segment
+        bytes_per_sec = self.audio.sample_rate * self.audio.sample_width
+        width = self.audio.sample_width
+        # Align on whole samples
+        self.begin = max(int(start * bytes_per_sec) // width * width, 0)
+        self.end = min(int(end * bytes_per_sec) // width * width,
+                       self.audio_size)
@@ -33,7 +33,10 @@ import json                                                 # nopep8
 from threading import Thread, Lock                          # nopep8
 from mycroft.messagebus.client.ws import WebsocketClient    # nopep8
 from mycroft.messagebus.message import Message              # nopep8
-from mycroft.util import get_ipc_directory                  # nopep8
+from mycroft.client.speech.mic_level import (              # nopep8
+    MicLevelReader,
+    get_mic_level_file
+)
 from mycroft.util.log import LOG                      # nopep8
 
 ws = None
@@ -198,38 +201,41 @@ class MicMonitorThread(Thread):
     def __init__(self, filename):
         Thread.__init__(self)
         self.filename = filename
-        self.st_results = os.stat(filename)
+        # Mapped by run(), the voice process may recreate the file any time
+        self.reader = None
+        self.count = 0
+
+    def open(self):
+        # The voice process recreated the file, map the new one
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+        self.reader = MicLevelReader(self.filename)
+        self.count = 0
 
     def run(self):
+        global meter_cur
+        global meter_thresh
+
         while True:
             try:
-                st_results = os.stat(self.filename)
-
-                if (not st_results.st_ctime == self.st_results.st_ctime or
-                        not st_results.st_mtime == self.st_results.st_mtime):
-                    self.read_file_from(0)
-                    self.st_results = st_results
-                    draw_screen()
+                if not self.reader or self.reader.is_stale():
+                    self.open()
+                # Samples live in shared memory, polling reads no file
+                count = self.reader.count()
+                if count != self.count:
+                    self.count = count
+                    # None after the voice process restarted
+                    sample = self.reader.latest()
+                    if sample:
+                        _, meter_cur, meter_thresh = sample
+                        draw_screen()
+            except (IOError, OSError, ValueError):
+                # The voice process is starting, try again later
+                pass
             finally:
                 time.sleep(0.1)
 
-    def read_file_from(self, bytefrom):
-        global meter_cur
-        global meter_thresh
-
-        with open(self.filename, 'rb') as fh:
-            fh.seek(bytefrom)
-            while True:
-                line = fh.readline()
-                if line == "":
-                    break
-
-                # Just adjust meter settings
-                # Ex:Energy:  cur=4 thresh=1.5
-                parts = line.split("=")
-                meter_thresh = float(parts[len(parts) - 1])
-                meter_cur = float(parts[len(parts) - 2].split(" ")[0])
-
 
 def start_mic_monitor(filename):
     if os.path.isfile(filename):
@@ -895,7 +901,7 @@ start_log_monitor("/var/log/mycroft-skills.log")
 start_log_monitor("/var/log/mycroft-speech-client.log")
 
 # Monitor IPC file containing microphone level info
-start_mic_monitor(os.path.join(get_ipc_directory(), "mic_level"))
+start_mic_monitor(get_mic_level_file())
 
 
 def main():
@@ -13,6 +13,8 @@
 # limitations under the License.
 #
 import json
+from copy import deepcopy
+from threading import RLock
 
 import inflection
 import re
@@ -216,10 +218,18 @@ class ConfigurationManager(object):
     Static management utility for accessing the cached configuration.
     This configuration is periodically updated from the remote server
     to keep in sync.
+
+    Every change of the cached configuration increases its version and
+    notifies the listeners interested in the changed top level sections.
     """
 
     __config = None
     __listener = None
+    __version = 0
+    # Copy of each top level section as of the current version
+    __sections = {}
+    __callbacks = []
+    __lock = RLock()
 
     @staticmethod
     def instance():
@@ -236,6 +246,77 @@ class ConfigurationManager(object):
         # Start listening for configuration update events on the messagebus
         ConfigurationManager.__listener = _ConfigurationListener(ws)
 
+    @staticmethod
+    def version():
+        """
+        Version of the cached configuration, increased on every change.
+
+        Returns:
+            int: the version, 0 before the configuration is loaded
+        """
+        return ConfigurationManager.__version
+
+    @staticmethod
+    def add_listener(callback, sections=None):
+        """
+        Register a callback for changes of the cached configuration.
+
+        Callbacks run in the thread making the change and should return
+        quickly.
+
+        Args:
+            callback (callable): called with the set of changed top level
+                                 sections and the new version
+            sections (list): sections the callback is interested in, None
+                             for all of them
+        """
+        with ConfigurationManager.__lock:
+            ConfigurationManager.__callbacks.append(
+                (callback, set(sections) if sections is not None else None))
+
+    @staticmethod
+    def remove_listener(callback):
+        with ConfigurationManager.__lock:
+            ConfigurationManager.__callbacks = [
+                c for c in ConfigurationManager.__callbacks
+                if c[0] != callback]
+
+    @staticmethod
+    def __changed():
+        """
+        Compare the cached configuration with the last version and notify
+        the listeners of the sections which changed.
+
+        Returns:
+            set: names of the changed sections
+        """
+        with ConfigurationManager.__lock:
+            config = ConfigurationManager.__config or {}
+            old = ConfigurationManager.__sections
+            changed = set(k for k in set(config) | set(old)
+                          if config.get(k) != old.get(k))
+            if not changed:
+                return changed
+            for k in changed:
+                if k in config:
+                    old[k] = deepcopy(config[k])
+                else:
+                    del old[k]
+            ConfigurationManager.__version += 1
+            version = ConfigurationManager.__version
+            callbacks = list(ConfigurationManager.__callbacks)
+
+        LOG.debug("Configuration version %d changed %s" %
+                  (version, ', '.join(sorted(changed))))
+        for callback, sections in callbacks:
+            relevant = changed if sections is None else changed & sections
+            if relevant:
+                try:
+                    callback(relevant, version)
+                except Exception:
+                    LOG.exception("Configuration listener failed")
+        return changed
+
     @staticmethod
     def load_defaults():
         for location in load_order:
@@ -245,12 +326,15 @@ class ConfigurationManager(object):
             else:
                 ConfigurationManager.__config = ConfigurationLoader.load(
                     ConfigurationManager.__config, [location])
+        ConfigurationManager.__changed()
         return ConfigurationManager.__config
 
     @staticmethod
     def load_local(locations=None, keep_user_config=True):
-        return ConfigurationLoader.load(ConfigurationManager.get(), locations,
-                                        keep_user_config)
+        config = ConfigurationLoader.load(ConfigurationManager.get(),
+                                          locations, keep_user_config)
+        ConfigurationManager.__changed()
+        return config
 
     @staticmethod
     def load_internal(config):
@@ -261,7 +345,9 @@ class ConfigurationManager(object):
     def load_remote():
         if not ConfigurationManager.__config:
             ConfigurationManager.__config = ConfigurationLoader.load()
-        return RemoteConfiguration.load(ConfigurationManager.__config)
+        config = RemoteConfiguration.load(ConfigurationManager.__config)
+        ConfigurationManager.__changed()
+        return config
 
     @staticmethod
     def get(locations=None):
@@ -289,6 +375,7 @@ class ConfigurationManager(object):
 
         if config:
             ConfigurationManager.__config.update(config)
+            ConfigurationManager.__changed()
 
     @staticmethod
     def save(config, is_system=False):
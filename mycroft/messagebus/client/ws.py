@@ -17,31 +17,67 @@ import time
 from multiprocessing.pool import ThreadPool
 
 from pyee import EventEmitter
-from websocket import WebSocketApp
+from websocket import ABNF, WebSocketApp
 
 from mycroft.configuration import ConfigurationManager
+from mycroft.messagebus.codec import MessageCodecFactory
 from mycroft.messagebus.message import Message
+from mycroft.messagebus.subscription import SUBSCRIBE, UNSUBSCRIBE
 from mycroft.util import validate_param
 from mycroft.util.log import LOG
 
 
 class WebsocketClient(object):
-    def __init__(self, host=None, port=None, route=None, ssl=None):
+    """Connection to the messagebus.
+
+    Unless subscribe is off, the client subscribes to the message types it
+    has handlers for, the service only sends it these.  Handlers of
+    'message' then only see the messages subscribed to.  Messages are sent
+    in the first of the codecs the service speaks too, handlers of
+    'message' get them as JSON whatever the codec.
+
+    Args:
+        host (str): messagebus host, from the configuration if None
+        port (int): messagebus port, from the configuration if None
+        route (str): messagebus route, from the configuration if None
+        ssl (bool): connect with wss, from the configuration if None
+        subscribe (bool): receive only the message types handled, from
+                          the configuration if None
+        codecs (list): names of the codecs offered, by preference, from
+                       the configuration if None
+    """
+
+    # Events of the connection itself, not message types
+    LOCAL_EVENTS = {'open', 'close', 'error', 'message'}
+
+    def __init__(self, host=None, port=None, route=None, ssl=None,
+                 subscribe=None, codecs=None):
 
         config = ConfigurationManager.get().get("websocket")
         host = host or config.get("host")
         port = port or config.get("port")
         route = route or config.get("route")
         ssl = ssl or config.get("ssl")
+        if subscribe is None:
+            subscribe = config.get("subscribe", True)
+        if codecs is None:
+            codecs = config.get("codecs", [])
         validate_param(host, "websocket.host")
         validate_param(port, "websocket.port")
         validate_param(route, "websocket.route")
 
         self.url = WebsocketClient.build_url(host, port, route, ssl)
+        # Only those installed are offered
+        codecs = [name for name in codecs if MessageCodecFactory.create(name)]
+        if codecs:
+            self.url += '?codecs=' + ','.join(codecs)
+        self.codec = None
         self.emitter = EventEmitter()
         self.client = self.create_client()
         self.pool = ThreadPool(10)
         self.retry = 5
+        self.subscribe = subscribe
+        self.subscribed_types = set()
 
     @staticmethod
     def build_url(host, port, route, ssl):
@@ -49,12 +85,18 @@ class WebsocketClient(object):
         return scheme + "://" + host + ":" + str(port) + route
 
     def create_client(self):
+        # JSON until the service tells which codec it picked
+        self.codec = MessageCodecFactory.create('json')
         return WebSocketApp(self.url,
                             on_open=self.on_open, on_close=self.on_close,
                             on_error=self.on_error, on_message=self.on_message)
 
     def on_open(self, ws):
         LOG.info("Connected")
+        if self.subscribe:
+            # Sent even without handlers, the service then routes nothing
+            self.emit(Message(SUBSCRIBE,
+                              {'types': sorted(self.subscribed_types)}))
         self.emitter.emit("open")
         # Restore reconnect timer to 5 seconds on sucessful connect
         self.retry = 5
@@ -75,8 +117,20 @@ class WebsocketClient(object):
         self.run_forever()
 
     def on_message(self, ws, message):
-        self.emitter.emit('message', message)
-        parsed_message = Message.deserialize(message)
+        codec = MessageCodecFactory.detect(message)
+        try:
+            parsed_message = codec.decode(message)
+        except ValueError as e:
+            LOG.warning('Dropped a message that can\'t be decoded: ' +
+                        repr(e))
+            return
+        if parsed_message.type == 'connected':
+            self.codec = MessageCodecFactory.negotiate(
+                [(parsed_message.data or {}).get('codec')])
+        if self.emitter.listeners('message'):
+            if codec.name != 'json':
+                message = parsed_message.serialize()
+            self.emitter.emit('message', message)
         self.pool.apply_async(
             self.emitter.emit, (parsed_message.type, parsed_message))
 
@@ -85,18 +139,39 @@ class WebsocketClient(object):
                 not self.client.sock.connected):
             return
         if hasattr(message, 'serialize'):
-            self.client.send(message.serialize())
+            codec = self.codec
+            self.client.send(codec.encode(message),
+                             ABNF.OPCODE_BINARY if codec.binary
+                             else ABNF.OPCODE_TEXT)
         else:
             self.client.send(json.dumps(message.__dict__))
 
+    def _add_subscription(self, event_name):
+        if (not self.subscribe or event_name in self.LOCAL_EVENTS or
+                event_name in self.subscribed_types):
+            return
+        self.subscribed_types.add(event_name)
+        # Without a connection, all types are subscribed to once open
+        self.emit(Message(SUBSCRIBE, {'types': [event_name]}))
+
+    def _remove_subscription(self, event_name):
+        if (event_name not in self.subscribed_types or
+                self.emitter.listeners(event_name)):
+            return
+        self.subscribed_types.discard(event_name)
+        self.emit(Message(UNSUBSCRIBE, {'types': [event_name]}))
+
     def on(self, event_name, func):
         self.emitter.on(event_name, func)
+        self._add_subscription(event_name)
 
     def once(self, event_name, func):
         self.emitter.once(event_name, func)
+        self._add_subscription(event_name)
 
     def remove(self, event_name, func):
         self.emitter.remove_listener(event_name, func)
+        self._remove_subscription(event_name)
 
     def remove_all_listeners(self, event_name):
         '''
@@ -108,6 +183,7 @@ class WebsocketClient(object):
         if event_name is None:
             raise ValueError
         self.emitter.remove_all_listeners(event_name)
+        self._remove_subscription(event_name)
 
     def run_forever(self):
         self.client.run_forever()
@@ -117,7 +193,8 @@ class WebsocketClient(object):
 
 
 def echo():
-    ws = WebsocketClient()
+    # Every message is echoed, not only those with handlers
+    ws = WebsocketClient(subscribe=False)
 
     def echo(message):
         LOG.info(message)
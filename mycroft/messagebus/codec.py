@@ -0,0 +1,298 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Wire formats of the messagebus messages
+
+Every peer understands JSON, Message.serialize().  A client offers the
+codecs it speaks, by preference, in the query of the messagebus URL:
+
+    ws://0.0.0.0:8181/core?codecs=msgpack.1,compact-json.1
+
+The service picks the first one it speaks too and tells it in the data of
+the 'connected' message, itself always sent as JSON.  The client sends
+JSON until then.  Frames are decoded whatever their format, a frame's first
+byte tells it apart, the service translates them for each client.
+
+The compact formats send [type, data] or [type, data, context], with the
+most common types replaced by their index in KNOWN_TYPES.  JSON frames
+encoded here start with the type.  The type of these frames is read
+without decoding the rest, see MessageCodec.peek_type().
+"""
+import json
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+
+from mycroft.messagebus.message import Message
+from mycroft.util.log import LOG
+
+# Interned message types of the compact codecs.  Changing the list changes
+# the IDs: bump the version in the codec names so only peers with the same
+# list use them.
+KNOWN_TYPES = [
+    'connected',
+    'speak',
+    'recognizer_loop:wakeword',
+    'recognizer_loop:record_begin',
+    'recognizer_loop:record_end',
+    'recognizer_loop:utterance',
+    'recognizer_loop:partial_utterance',
+    'recognizer_loop:mic_level',
+    'recognizer_loop:audio_output_start',
+    'recognizer_loop:audio_output_end',
+    'mycroft.skill.handler.start',
+    'mycroft.skill.handler.complete',
+    'mycroft.audio.speech.stop',
+    'mycroft.stop',
+    'mycroft.bus.subscribe',
+    'mycroft.bus.unsubscribe',
+    'enclosure.mouth.viseme',
+    'enclosure.mouth.reset',
+    'enclosure.mouth.talk',
+    'enclosure.mouth.think',
+    'enclosure.mouth.display',
+    'enclosure.eyes.blink',
+    'register_vocab',
+    'register_intent',
+    'detach_intent',
+    'skill.converse.request',
+    'skill.converse.response',
+    'intent_failure',
+    'configuration.updated',
+    'mycroft.trace.stats'
+]
+TYPE_IDS = dict((t, i) for i, t in enumerate(KNOWN_TYPES))
+
+# Reused, json.dumps() builds an encoder for every call with separators
+_compact_encoder = json.JSONEncoder(separators=(',', ':'))
+_encoder = json.JSONEncoder()
+
+JSON_TYPE_PREFIX = '{"type": "'
+
+
+def _known_type(type_id):
+    """The message type of an ID of the compact codecs.
+
+    Raises:
+        ValueError: if the ID is not in KNOWN_TYPES, the peer has another
+                    list
+    """
+    if not 0 <= type_id < len(KNOWN_TYPES):
+        raise ValueError('Unknown message type ID ' + str(type_id))
+    return KNOWN_TYPES[type_id]
+
+
+def _peek_string(frame, start):
+    """ The JSON string at start, None if it must be decoded. """
+    end = frame.find('"', start)
+    if end < 0 or '\\' in frame[start:end]:
+        return None
+    return frame[start:end]
+
+
+class MessageCodec(object):
+    """Encodes messages into websocket frames and back.
+
+    Attributes:
+        name (str): name negotiated with the peer
+        binary (bool): frames are sent as binary websocket frames
+    """
+    __metaclass__ = ABCMeta
+
+    name = None
+    binary = False
+
+    @abstractmethod
+    def encode(self, message):
+        """Encode a message.
+
+        Args:
+            message (Message): the message
+
+        Returns:
+            str: the frame
+        """
+        pass
+
+    @abstractmethod
+    def decode(self, frame):
+        """Decode a frame.
+
+        Args:
+            frame (str): the frame
+
+        Returns:
+            Message: the message
+
+        Raises:
+            ValueError: if the frame is not a message
+        """
+        pass
+
+    def peek_type(self, frame):
+        """Read the type of the message in a frame.
+
+        Args:
+            frame (str): the frame
+
+        Returns:
+            str: the message type
+        """
+        return self.decode(frame).type
+
+
+class JsonCodec(MessageCodec):
+    """ The {type, data, context} JSON object every peer speaks. """
+    name = 'json'
+
+    def encode(self, message):
+        # As Message.serialize(), with the type first so it can be peeked
+        return '{"type": %s, "data": %s, "context": %s}' % (
+            _encoder.encode(message.type), _encoder.encode(message.data),
+            _encoder.encode(message.context))
+
+    def decode(self, frame):
+        return Message.deserialize(frame)
+
+    def peek_type(self, frame):
+        if frame.startswith(JSON_TYPE_PREFIX) and frame.endswith('}'):
+            message_type = _peek_string(frame, len(JSON_TYPE_PREFIX))
+            if message_type is not None:
+                return message_type
+        # Other peers may put the type anywhere
+        return self.decode(frame).type
+
+
+class CompactJsonCodec(MessageCodec):
+    """ A JSON array, with interned types and without whitespace. """
+    name = 'compact-json.1'
+
+    @staticmethod
+    def envelope(message):
+        envelope = [TYPE_IDS.get(message.type, message.type), message.data]
+        if message.context is not None:
+            envelope.append(message.context)
+        return envelope
+
+    @staticmethod
+    def message(envelope):
+        message_type = envelope[0]
+        if isinstance(message_type, int):
+            message_type = _known_type(message_type)
+        context = envelope[2] if len(envelope) > 2 else None
+        return Message(message_type, envelope[1], context)
+
+    def encode(self, message):
+        return _compact_encoder.encode(self.envelope(message))
+
+    def decode(self, frame):
+        return self.message(json.loads(frame))
+
+    def peek_type(self, frame):
+        if frame.endswith(']'):
+            if frame[1:2] == '"':
+                message_type = _peek_string(frame, 2)
+                if message_type is not None:
+                    return message_type
+            else:
+                end = frame.find(',')
+                if 1 < end < 6 and frame[1:end].isdigit():
+                    return _known_type(int(frame[1:end]))
+        return self.decode(frame).type
+
+
+class MsgpackCodec(CompactJsonCodec):
+    """ The compact envelope packed with msgpack, if it is installed. """
+    name = 'msgpack.1'
+    binary = True
+
+    def __init__(self):
+        # Optional dependency, the codec is not offered without it
+        import msgpack
+        self.msgpack = msgpack
+
+    def encode(self, message):
+        return self.msgpack.packb(self.envelope(message), use_bin_type=True)
+
+    def decode(self, frame):
+        return self.message(self.msgpack.unpackb(frame, raw=False))
+
+    def peek_type(self, frame):
+        # Unpacking is about as fast as any peeking done in Python
+        return self.decode(frame).type
+
+
+class MessageCodecFactory(object):
+    CLASSES = OrderedDict([
+        (JsonCodec.name, JsonCodec),
+        (CompactJsonCodec.name, CompactJsonCodec),
+        (MsgpackCodec.name, MsgpackCodec)
+    ])
+    # Codecs by name, created once they're used
+    codecs = {}
+
+    @staticmethod
+    def create(name):
+        """Get a codec by name.
+
+        Args:
+            name (str): name of the codec
+
+        Returns:
+            MessageCodec: the codec, None if unknown or not installed
+        """
+        codec = MessageCodecFactory.codecs.get(name)
+        clazz = MessageCodecFactory.CLASSES.get(name)
+        if not codec and clazz:
+            try:
+                codec = clazz()
+            except ImportError as e:
+                LOG.debug('Codec ' + name + ' unavailable: ' + repr(e))
+                return None
+            MessageCodecFactory.codecs[name] = codec
+        return codec
+
+    @staticmethod
+    def negotiate(offered):
+        """Pick the codec to talk to a peer.
+
+        Args:
+            offered (list): names of the codecs of the peer, by preference
+
+        Returns:
+            MessageCodec: the first one available, JSON if none is
+        """
+        for name in offered:
+            codec = MessageCodecFactory.create(name)
+            if codec:
+                return codec
+        return MessageCodecFactory.create(JsonCodec.name)
+
+    @staticmethod
+    def detect(frame):
+        """Find the codec of a frame.
+
+        Args:
+            frame (str): frame received
+
+        Returns:
+            MessageCodec: codec to decode it with
+        """
+        first = frame[:1]
+        if first == '[':
+            return MessageCodecFactory.create(CompactJsonCodec.name)
+        elif first != '{':
+            codec = MessageCodecFactory.create(MsgpackCodec.name)
+            if codec:
+                return codec
+        return MessageCodecFactory.create(JsonCodec.name)
@@ -45,6 +45,7 @@ def main():
     validate_param(port, "websocket.port")
     validate_param(route, "websocket.route")
 
+    WebsocketEventHandler.log_every = config.get("log_every", 1)
     routes = [
         (route, WebsocketEventHandler)
     ]
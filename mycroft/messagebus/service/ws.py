@@ -13,13 +13,24 @@
 # limitations under the License.
 #
 import json
+import logging
+import struct
 import sys
 import traceback
 
 import tornado.websocket
 from pyee import EventEmitter
+from tornado import ioloop
+from tornado.escape import utf8
+from tornado.iostream import StreamClosedError
 
+from mycroft.messagebus.codec import MessageCodecFactory
 from mycroft.messagebus.message import Message
+from mycroft.messagebus.subscription import (
+    SUBSCRIBE,
+    UNSUBSCRIBE,
+    Subscription
+)
 from mycroft.util.log import LOG
 
 
@@ -28,45 +39,149 @@ EventBusEmitter = EventEmitter()
 client_connections = []
 
 
+def websocket_frame(data, binary=False):
+    """Frame a message as a server, unmasked and uncompressed.
+
+    Args:
+        data (str): the message
+        binary (bool): a binary message, text otherwise
+
+    Returns:
+        str: the frame, RFC 6455
+    """
+    data = utf8(data)
+    header = chr(0x82 if binary else 0x81)
+    length = len(data)
+    if length < 126:
+        header += chr(length)
+    elif length <= 0xFFFF:
+        header += struct.pack("!BH", 126, length)
+    else:
+        header += struct.pack("!BQ", 127, length)
+    return header + data
+
+
 class WebsocketEventHandler(tornado.websocket.WebSocketHandler):
+    """Connection of a client to the messagebus.
+
+    Frames are forwarded as they came to the clients speaking the codec of
+    the sender, only their type is read unless a handler of the service
+    or a client with another codec needs the message.  The frames sent to
+    a client during an iteration of the IOLoop go out in one write.
+    """
+
+    # Frames received, one in log_every is logged, 0 to log none
+    log_every = 1
+    frames_received = 0
+
     def __init__(self, application, request, **kwargs):
         tornado.websocket.WebSocketHandler.__init__(
             self, application, request, **kwargs)
         self.emitter = EventBusEmitter
+        # Message types routed to this client
+        self.subscription = Subscription()
+        # Format of the frames sent to this client, see codec
+        self.codec = MessageCodecFactory.create('json')
+        # Websocket frames waiting for the end of the IOLoop iteration
+        self.pending = []
 
     def on(self, event_name, handler):
         self.emitter.on(event_name, handler)
 
+    def _log_frame(self, message):
+        cls = WebsocketEventHandler
+        cls.frames_received += 1
+        # Checked first, logging a frame costs more than routing it
+        if (cls.log_every and cls.frames_received % cls.log_every == 0 and
+                LOG.level <= logging.DEBUG):
+            LOG(__name__).debug(message)
+
     def on_message(self, message):
-        LOG.debug(message)
+        self._log_frame(message)
         try:
-            deserialized_message = Message.deserialize(message)
+            codec = MessageCodecFactory.detect(message)
+            message_type = codec.peek_type(message)
         except:
             return
 
-        try:
-            self.emitter.emit(deserialized_message.type, deserialized_message)
-        except Exception, e:
-            LOG.exception(e)
-            traceback.print_exc(file=sys.stdout)
-            pass
+        deserialized_message = None
+        if message_type in (SUBSCRIBE, UNSUBSCRIBE):
+            deserialized_message = codec.decode(message)
+            self.subscription.update(deserialized_message.type,
+                                     deserialized_message.data or {})
+            return
+
+        if self.emitter.listeners(message_type):
+            deserialized_message = codec.decode(message)
+            try:
+                self.emitter.emit(message_type, deserialized_message)
+            except Exception, e:
+                LOG.exception(e)
+                traceback.print_exc(file=sys.stdout)
+                pass
 
+        # Framed once per format, clients speaking the sender's get the
+        # frame as it came
+        frames = {}
         for client in client_connections:
-            client.write_message(message)
+            if not client.subscription.matches(message_type):
+                continue
+            client_codec = client.codec
+            frame = frames.get(client_codec.name)
+            if frame is None:
+                if client_codec is codec:
+                    data = message
+                else:
+                    if deserialized_message is None:
+                        deserialized_message = codec.decode(message)
+                    data = client_codec.encode(deserialized_message)
+                frame = websocket_frame(data, client_codec.binary)
+                frames[client_codec.name] = frame
+            client.send_frame(frame)
+
+    def send_frame(self, frame):
+        """Queue a websocket frame, sent at the end of the IOLoop iteration.
+
+        Args:
+            frame (str): the frame, see websocket_frame()
+        """
+        if not self.pending:
+            ioloop.IOLoop.current().add_callback(self.flush)
+        self.pending.append(frame)
+
+    def flush(self):
+        """ Send the queued frames in one write. """
+        frames, self.pending = self.pending, []
+        if not frames or not self.ws_connection or self.stream.closed():
+            return
+        try:
+            self.stream.write(''.join(frames))
+        except StreamClosedError:
+            pass  # on_close() follows
 
     def open(self):
-        self.write_message(Message("connected").serialize())
+        offered = self.get_query_argument('codecs', '')
+        self.codec = MessageCodecFactory.negotiate(
+            [name for name in offered.split(',') if name])
+        # JSON, the client doesn't know the codec until it reads this
+        self.write_message(Message("connected",
+                                   {'codec': self.codec.name}).serialize())
         client_connections.append(self)
 
     def on_close(self):
         client_connections.remove(self)
 
+    def get_compression_options(self):
+        # Frames are written without compression by send_frame()
+        return None
+
     def emit(self, channel_message):
         if (hasattr(channel_message, 'serialize') and
                 callable(getattr(channel_message, 'serialize'))):
-            self.write_message(channel_message.serialize())
+            self.send_frame(websocket_frame(
+                self.codec.encode(channel_message), self.codec.binary))
         else:
-            self.write_message(json.dumps(channel_message))
+            self.send_frame(websocket_frame(json.dumps(channel_message)))
 
     def check_origin(self, origin):
         return True
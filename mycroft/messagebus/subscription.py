@@ -0,0 +1,69 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Routing of the messagebus messages to the clients handling them
+
+A client receives every message until it subscribes.  It then only
+receives the messages whose type it subscribed to, exactly or by prefix:
+
+    mycroft.bus.subscribe    {"types": ["speak"], "prefixes": ["enclosure."]}
+    mycroft.bus.unsubscribe  {"types": ["speak"]}
+
+Subscriptions add up, unsubscribing from everything leaves the client
+subscribed to nothing.  The service handles these messages itself, they
+are not forwarded.
+"""
+
+SUBSCRIBE = 'mycroft.bus.subscribe'
+UNSUBSCRIBE = 'mycroft.bus.unsubscribe'
+
+
+class Subscription(object):
+    """Message types a client wants, everything until it subscribes."""
+
+    def __init__(self):
+        self.active = False
+        self.types = set()
+        self.prefixes = set()
+
+    def update(self, message_type, data):
+        """Apply a subscription message.
+
+        Args:
+            message_type (str): SUBSCRIBE or UNSUBSCRIBE
+            data (dict): types and prefixes subscribed to or dropped
+        """
+        types = set(data.get('types') or [])
+        prefixes = set(data.get('prefixes') or [])
+        if message_type == SUBSCRIBE:
+            self.types |= types
+            self.prefixes |= prefixes
+        else:
+            self.types -= types
+            self.prefixes -= prefixes
+        self.active = True
+
+    def matches(self, message_type):
+        """Check if a message must be sent to the client.
+
+        Args:
+            message_type (str): type of the message
+
+        Returns:
+            bool: True if the client handles it
+        """
+        if not self.active or message_type in self.types:
+            return True
+        return bool(message_type) and any(message_type.startswith(prefix)
+                                          for prefix in self.prefixes)
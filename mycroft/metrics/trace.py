@@ -0,0 +1,254 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Latency tracing of utterances across processes
+
+A trace is started when the wake word is heard and travels in the context
+of the messages handling the utterance.  Each process stamps the time it
+reached a step, using the monotonic clock shared by all processes of the
+device:
+
+    wakeword, record_end          voice, ResponsiveRecognizer
+    utterance                     voice, transcription emitted
+    intent                        skills, intent matched
+    handler_start, handler_complete
+                                  skills, intent handler
+    speak                         skills, sentence sent for speech
+    tts_synthesized               audio, sentence synthesized
+    audio_output_start            audio, playback started
+
+The TraceCollector combines the stamps of each trace into the latency of
+the stages listed in STAGES.
+"""
+import ctypes
+import ctypes.util
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from uuid import uuid4
+
+import os
+from os.path import dirname, isdir
+
+from mycroft.messagebus.message import Message
+from mycroft.util.log import LOG
+
+# Stage name, first and last step
+STAGES = [
+    ('capture', 'wakeword', 'record_end'),
+    ('stt', 'record_end', 'utterance'),
+    ('intent', 'utterance', 'intent'),
+    ('handler', 'handler_start', 'handler_complete'),
+    ('tts', 'speak', 'tts_synthesized'),
+    ('first_audio', 'record_end', 'audio_output_start')
+]
+
+# Messages the collector takes the stamps from
+TRACED_MESSAGES = [
+    'recognizer_loop:utterance',
+    'mycroft.skill.handler.start',
+    'mycroft.skill.handler.complete',
+    'speak',
+    'recognizer_loop:audio_output_start'
+]
+
+CLOCK_MONOTONIC = 1
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+def _create_monotonic():
+    """ clock_gettime(CLOCK_MONOTONIC), the same in every process. """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno=True)
+        clock_gettime = libc.clock_gettime
+        clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+    except (OSError, AttributeError):
+        LOG.warning('No monotonic clock, traces use the wall clock')
+        return time.time
+
+    def monotonic():
+        t = _Timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(t)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return t.tv_sec + t.tv_nsec * 1e-9
+    return monotonic
+
+
+monotonic = _create_monotonic()
+
+
+def start_trace(step='wakeword'):
+    """Create the context of a new trace.
+
+    Args:
+        step (str): first step of the trace, stamped now
+
+    Returns:
+        dict: message context carrying the trace
+    """
+    return {'trace': {'id': uuid4().hex, 'stamps': {step: monotonic()}}}
+
+
+def stamp(context, step):
+    """Stamp the time a step was reached.
+
+    The context is copied, the message it came from is left unchanged.  A
+    step keeps the time it was first reached.
+
+    Args:
+        context (dict): message context, may be None
+        step (str): name of the step
+
+    Returns:
+        dict: copy of the context, with the stamp if it carries a trace
+    """
+    context = dict(context or {})
+    trace = context.get('trace')
+    if trace:
+        stamps = dict(trace.get('stamps', {}))
+        stamps.setdefault(step, monotonic())
+        context['trace'] = dict(trace, stamps=stamps)
+    return context
+
+
+class LatencyHistogram(object):
+    """ Distribution of the latency of a stage. """
+
+    BUCKETS_SEC = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+    def __init__(self):
+        # The last bucket holds everything longer than the last bound
+        self.counts = [0] * (len(self.BUCKETS_SEC) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = 0
+        while (index < len(self.BUCKETS_SEC) and
+               seconds > self.BUCKETS_SEC[index]):
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent):
+        """ Upper bound of the bucket holding the percentile. """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for bound, count in zip(self.BUCKETS_SEC, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_sec': self.total / self.count if self.count else None,
+            'max_sec': self.max,
+            'p50_sec': self.percentile(50),
+            'p90_sec': self.percentile(90),
+            'p99_sec': self.percentile(99),
+            'buckets_sec': self.BUCKETS_SEC,
+            'counts': self.counts
+        }
+
+
+class TraceCollector(object):
+    """Aggregates the traces seen on the message bus.
+
+    The statistics are sent as 'mycroft.trace.stats' when requested with
+    'mycroft.trace.get' and written to the dump file whenever they change.
+
+    Args:
+        emitter: message bus connection
+        dump_file (str): path of the JSON dump, None to not write one
+        max_traces (int): traces followed at once, the oldest are dropped
+    """
+
+    def __init__(self, emitter, dump_file=None, max_traces=100):
+        self.emitter = emitter
+        self.dump_file = dump_file
+        self.max_traces = max_traces
+        self.traces = OrderedDict()
+        self.histograms = OrderedDict((stage, LatencyHistogram())
+                                      for stage, _, _ in STAGES)
+        self.lock = Lock()
+        for message_type in TRACED_MESSAGES:
+            emitter.on(message_type, self.handle_message)
+        emitter.on('mycroft.trace.get', self.handle_get)
+
+    def handle_message(self, message):
+        trace = (message.context or {}).get('trace')
+        if not trace or 'id' not in trace:
+            return
+        with self.lock:
+            changed = self.add(trace['id'], trace.get('stamps', {}))
+        if changed and self.dump_file:
+            self.dump()
+
+    def add(self, trace_id, stamps):
+        """Merge the stamps of a trace and record the completed stages.
+
+        Returns:
+            bool: True if a stage was recorded
+        """
+        if trace_id not in self.traces:
+            self.traces[trace_id] = ({}, set())
+            while len(self.traces) > self.max_traces:
+                self.traces.popitem(last=False)
+        known, recorded = self.traces[trace_id]
+        for step, t in stamps.items():
+            known.setdefault(step, t)
+
+        changed = False
+        for stage, first, last in STAGES:
+            if stage not in recorded and first in known and last in known:
+                self.histograms[stage].add(max(known[last] - known[first],
+                                               0.0))
+                recorded.add(stage)
+                changed = True
+        return changed
+
+    def stats(self):
+        with self.lock:
+            return OrderedDict((stage, histogram.as_dict())
+                               for stage, histogram in
+                               self.histograms.items())
+
+    def handle_get(self, message):
+        self.emitter.emit(Message('mycroft.trace.stats',
+                                  {'stages': self.stats()}))
+
+    def dump(self):
+        try:
+            directory = dirname(self.dump_file)
+            if directory and not isdir(directory):
+                os.makedirs(directory)
+            tmp = self.dump_file + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'stages': self.stats()}, f, indent=2)
+            os.rename(tmp, self.dump_file)
+        except (IOError, OSError):
+            LOG.exception('Could not write trace statistics')
@@ -55,33 +55,42 @@ class Session(object):
 
 class SessionManager(object):
     """
-    Keeps track of the current active session
+    Keeps track of the current active session, and of the session of each
+    capture source when listening to several of them
     """
     __current_session = None
+    __source_sessions = {}
     __lock = Lock()
 
     @staticmethod
-    def get():
+    def get(source=None):
         """
         get the active session.
 
+        :param source: name of the capture source, None for the default
         :return: An active session
         """
         with SessionManager.__lock:
-            if (not SessionManager.__current_session or
-                    SessionManager.__current_session.expired()):
-                SessionManager.__current_session = Session(
-                    str(uuid4()), expiration_seconds=config.get('ttl', 180))
-                LOG.info(
-                    "New Session Start: " +
-                    SessionManager.__current_session.session_id)
-            return SessionManager.__current_session
+            if source is None:
+                session = SessionManager.__current_session
+            else:
+                session = SessionManager.__source_sessions.get(source)
+            if not session or session.expired():
+                session = Session(str(uuid4()),
+                                  expiration_seconds=config.get('ttl', 180))
+                LOG.info("New Session Start: " + session.session_id)
+                if source is None:
+                    SessionManager.__current_session = session
+                else:
+                    SessionManager.__source_sessions[source] = session
+            return session
 
     @staticmethod
-    def touch():
+    def touch(source=None):
         """
         Update the last_touch timestamp on the current session
 
+        :param source: name of the capture source, None for the default
         :return: None
         """
-        SessionManager.get().touch()
+        SessionManager.get(source).touch()
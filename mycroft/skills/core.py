@@ -24,12 +24,14 @@ import re
 from adapt.intent import Intent, IntentBuilder
 from os import listdir
 from os.path import join, abspath, dirname, splitext, basename, exists
+from threading import local
 
 from mycroft.client.enclosure.api import EnclosureAPI
 from mycroft.configuration import ConfigurationManager
 from mycroft.dialog import DialogLoader
 from mycroft.filesystem import FileSystemAccess
 from mycroft.messagebus.message import Message
+from mycroft.metrics.trace import stamp
 from mycroft.skills.settings import SkillSettings
 from mycroft.util.log import LOG
 
@@ -220,6 +222,17 @@ class MycroftSkill(object):
         self.reload_skill = True
         self.events = []
         self.skill_id = 0
+        # Handlers run concurrently on the threads of the emitter
+        self.handler_local = local()
+
+    @property
+    def handler_context(self):
+        """ Context of the message handled by this thread, if any. """
+        return getattr(self.handler_local, 'context', None)
+
+    @handler_context.setter
+    def handler_context(self, context):
+        self.handler_local.context = context
 
     @property
     def location(self):
@@ -333,11 +346,15 @@ class MycroftSkill(object):
         """
 
         def wrapper(message):
+            # Context of the messages sent while handling, it carries the
+            # latency trace of the utterance
+            self.handler_context = stamp(message.context, 'handler_start')
             try:
                 # Indicate that the skill handler is starting
                 name = get_handler_name(handler)
                 self.emitter.emit(Message("mycroft.skill.handler.start",
-                                          data={'handler': name}))
+                                          data={'handler': name},
+                                          context=self.handler_context))
                 if need_self:
                     # When registring from decorator self is required
                     if len(getargspec(handler).args) == 2:
@@ -372,10 +389,15 @@ class MycroftSkill(object):
                 # indicate completion with exception
                 self.emitter.emit(Message('mycroft.skill.handler.complete',
                                           data={'handler': name,
-                                                'exception': e.message}))
+                                                'exception': e.message},
+                                          context=stamp(self.handler_context,
+                                                        'handler_complete')))
             # Indicate that the skill handler has completed
             self.emitter.emit(Message('mycroft.skill.handler.complete',
-                                      data={'handler': name}))
+                                      data={'handler': name},
+                                      context=stamp(self.handler_context,
+                                                    'handler_complete')))
+            self.handler_context = None
 
         if handler:
             self.emitter.on(name, wrapper)
@@ -535,7 +557,8 @@ class MycroftSkill(object):
         self.enclosure.register(self.name)
         data = {'utterance': utterance,
                 'expect_response': expect_response}
-        self.emitter.emit(Message("speak", data))
+        self.emitter.emit(Message("speak", data,
+                                  stamp(self.handler_context, 'speak')))
 
     def speak_dialog(self, key, data=None, expect_response=False):
         """
@@ -19,6 +19,7 @@ from adapt.engine import IntentDeterminationEngine
 
 from mycroft.configuration import ConfigurationManager
 from mycroft.messagebus.message import Message
+from mycroft.metrics.trace import stamp
 from mycroft.skills.core import open_intent_envelope
 from mycroft.util.log import LOG
 from mycroft.util.parse import normalize
@@ -238,7 +239,8 @@ class IntentService(object):
         if best_intent and best_intent.get('confidence', 0.0) > 0.0:
             self.update_context(best_intent)
             reply = message.reply(
-                best_intent.get('intent_type'), best_intent)
+                best_intent.get('intent_type'), best_intent,
+                stamp(message.context, 'intent'))
             self.emitter.emit(reply)
             # update active skills
             skill_id = int(best_intent['intent_type'].split(":")[0])
@@ -28,12 +28,13 @@ from mycroft.api import is_paired
 from mycroft.configuration import ConfigurationManager
 from mycroft.messagebus.client.ws import WebsocketClient
 from mycroft.messagebus.message import Message
+from mycroft.metrics.trace import TraceCollector
 from mycroft.skills.core import load_skill, create_skill_descriptor, \
     MainModule, FallbackSkill
 from mycroft.skills.event_scheduler import EventScheduler
 from mycroft.skills.intent_service import IntentService
 from mycroft.skills.padatious_service import PadatiousService
-from mycroft.util import connected
+from mycroft.util import connected, get_ipc_directory
 from mycroft.util.log import LOG
 
 
@@ -76,6 +77,12 @@ def _starting_up():
     IntentService(ws)
     event_scheduler = EventScheduler(ws)
 
+    # Collect the latency of each stage of the utterances
+    trace_config = ConfigurationManager.get().get('trace', {})
+    if trace_config.get('enabled', True):
+        TraceCollector(ws, trace_config.get('dump_file') or
+                       join(get_ipc_directory(), 'trace.json'))
+
     # Create a thread that monitors the loaded skills, looking for updates
     skill_manager = SkillManager(ws)
     skill_manager.daemon = True
@@ -13,23 +13,35 @@
 # limitations under the License.
 #
 import re
+import tempfile
+from Queue import Queue, Empty
 from abc import ABCMeta, abstractmethod
+from collections import deque
+from threading import Thread, Lock
+from time import time
+
+import os
+from os.path import exists, join
+
 from requests import post
-from speech_recognition import Recognizer
+from speech_recognition import AudioData, Recognizer
 
 from mycroft.api import STTApi
 from mycroft.configuration import ConfigurationManager
+from mycroft.stt.grammar import command_grammar
 from mycroft.util.log import LOG
 
 
 class STT(object):
     __metaclass__ = ABCMeta
 
-    def __init__(self):
+    def __init__(self, module=None):
         config_core = ConfigurationManager.get()
         self.lang = str(self.init_language(config_core))
         config_stt = config_core.get("stt", {})
-        self.config = config_stt.get(config_stt.get("module"), {})
+        # Engines used by HedgedSTT are configured under their own name
+        module = module or config_stt.get("module")
+        self.config = config_stt.get(module, {})
         self.credential = self.config.get("credential", {})
         self.recognizer = Recognizer()
 
@@ -45,27 +57,91 @@ class STT(object):
     def execute(self, audio, language=None):
         pass
 
+    # Engines able to work on an utterance while it is still being
+    # recorded set this, others get the complete audio through execute()
+    streaming = False
+
+    def start_stream(self, sample_rate, sample_width, language=None):
+        """Start transcribing an utterance as it is being recorded.
+
+        The default implementation buffers the audio and runs execute()
+        once the utterance is complete.
+
+        Args:
+            sample_rate (int): samples per second of the audio
+            sample_width (int): bytes per sample of the audio
+            language (str): language of the utterance, None for the default
+
+        Returns:
+            STTStream: the utterance, several can be transcribed at once
+        """
+        return STTStream(self, sample_rate, sample_width, language)
+
+
+class STTStream(object):
+    """An utterance transcribed while it is being recorded.
+
+    Created by STT.start_stream(), the state of the transcription is kept
+    here so an engine can transcribe several utterances at once.
+
+    Args:
+        stt (STT): the engine transcribing the utterance
+        sample_rate (int): samples per second of the audio
+        sample_width (int): bytes per sample of the audio
+        language (str): language of the utterance, None for the default
+    """
+
+    def __init__(self, stt, sample_rate, sample_width, language=None):
+        self.stt = stt
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.language = language
+        self.chunks = []
+
+    def feed(self, chunk):
+        """Add audio to the utterance.
+
+        Args:
+            chunk (str): raw audio
+
+        Returns:
+            str: partial transcription, None if the engine has none
+        """
+        self.chunks.append(chunk)
+        return None
+
+    def finish(self):
+        """Transcribe the utterance.
+
+        Returns:
+            str: the transcription
+        """
+        audio = AudioData(''.join(self.chunks), self.sample_rate,
+                          self.sample_width)
+        self.chunks = []
+        return self.stt.execute(audio, self.language)
+
 
 class TokenSTT(STT):
     __metaclass__ = ABCMeta
 
-    def __init__(self):
-        super(TokenSTT, self).__init__()
+    def __init__(self, module=None):
+        super(TokenSTT, self).__init__(module)
         self.token = str(self.credential.get("token"))
 
 
 class BasicSTT(STT):
     __metaclass__ = ABCMeta
 
-    def __init__(self):
-        super(BasicSTT, self).__init__()
+    def __init__(self, module=None):
+        super(BasicSTT, self).__init__(module)
         self.username = str(self.credential.get("username"))
         self.password = str(self.credential.get("password"))
 
 
 class GoogleSTT(TokenSTT):
-    def __init__(self):
-        super(GoogleSTT, self).__init__()
+    def __init__(self, module=None):
+        super(GoogleSTT, self).__init__(module)
 
     def execute(self, audio, language=None):
         self.lang = language or self.lang
@@ -73,8 +149,8 @@ class GoogleSTT(TokenSTT):
 
 
 class WITSTT(TokenSTT):
-    def __init__(self):
-        super(WITSTT, self).__init__()
+    def __init__(self, module=None):
+        super(WITSTT, self).__init__(module)
 
     def execute(self, audio, language=None):
         LOG.warning("WITSTT language should be configured at wit.ai settings.")
@@ -82,8 +158,8 @@ class WITSTT(TokenSTT):
 
 
 class IBMSTT(BasicSTT):
-    def __init__(self):
-        super(IBMSTT, self).__init__()
+    def __init__(self, module=None):
+        super(IBMSTT, self).__init__(module)
 
     def execute(self, audio, language=None):
         self.lang = language or self.lang
@@ -92,8 +168,8 @@ class IBMSTT(BasicSTT):
 
 
 class MycroftSTT(STT):
-    def __init__(self):
-        super(MycroftSTT, self).__init__()
+    def __init__(self, module=None):
+        super(MycroftSTT, self).__init__(module)
         self.api = STTApi()
 
     def execute(self, audio, language=None):
@@ -106,14 +182,19 @@ class MycroftSTT(STT):
 
 
 class KaldiSTT(STT):
-    def __init__(self):
-        super(KaldiSTT, self).__init__()
+    def __init__(self, module=None):
+        super(KaldiSTT, self).__init__(module)
+        # The server must accept raw audio sent with chunked encoding
+        self.streaming = self.config.get("stream", False)
 
     def execute(self, audio, language=None):
         language = language or self.lang
         response = post(self.config.get("uri"), data=audio.get_wav_data())
         return self.get_response(response)
 
+    def start_stream(self, sample_rate, sample_width, language=None):
+        return KaldiStream(self, sample_rate, sample_width, language)
+
     def get_response(self, response):
         try:
             hypotheses = response.json()["hypotheses"]
@@ -122,18 +203,349 @@ class KaldiSTT(STT):
             return None
 
 
+class KaldiStream(STTStream):
+    """Uploads the audio while it is recorded.
+
+    The server decodes the audio as it arrives and answers as soon as the
+    last chunk is in.
+    """
+
+    def __init__(self, stt, sample_rate, sample_width, language=None):
+        super(KaldiStream, self).__init__(stt, sample_rate, sample_width,
+                                          language)
+        self.chunks = Queue()
+        self.result = {}
+        content_type = ("audio/x-raw, layout=(string)interleaved, "
+                        "rate=(int)%d, format=(string)S%dLE, "
+                        "channels=(int)1" % (sample_rate, 8 * sample_width))
+
+        def upload():
+            try:
+                self.result['response'] = post(
+                    stt.config.get("uri"),
+                    data=iter(self.chunks.get, None),
+                    headers={'Content-Type': content_type})
+            except Exception as e:
+                self.result['error'] = e
+
+        self.upload = Thread(target=upload)
+        self.upload.daemon = True
+        self.upload.start()
+
+    def feed(self, chunk):
+        self.chunks.put(chunk)
+        return None
+
+    def finish(self):
+        self.chunks.put(None)
+        self.upload.join()
+        if 'error' in self.result:
+            raise self.result['error']
+        return self.stt.get_response(self.result['response'])
+
+
+class PocketsphinxSTT(STT):
+    """Decodes short commands on the device, escalating the rest.
+
+    The pocketsphinx acoustic model shipped for the hotwords is constrained
+    with a grammar of the vocabulary and intent sentences registered by the
+    skills.  Short utterances recognized with enough confidence never leave
+    the device, longer or unrecognized ones go to the fallback engine.
+
+    The grammar alone maps any speech onto the closest command, and the
+    posterior of the hypothesis is only among the commands.  The audio is
+    decoded a second time with a free loop of the phones of the model.  A
+    command scores about as well as the loop, speech outside of the grammar
+    far worse: it is escalated when the loop scores more than max_score_gap
+    per frame better than the match.
+    """
+
+    # Sample rate of the acoustic model
+    SAMPLE_RATE = 16000
+
+    # Context independent phones of the acoustic model, each one is a word
+    # of the phone loop
+    PHONES = ['AA', 'AE', 'AH', 'AO', 'AW', 'AY', 'B', 'CH', 'D', 'DH', 'EH',
+              'ER', 'EY', 'F', 'G', 'HH', 'IH', 'IY', 'JH', 'K', 'L', 'M',
+              'N', 'NG', 'OW', 'OY', 'P', 'R', 'S', 'SH', 'T', 'TH', 'UH',
+              'UW', 'V', 'W', 'Y', 'Z', 'ZH']
+
+    def __init__(self, module=None):
+        super(PocketsphinxSTT, self).__init__(module)
+        self.fallback = STTFactory.create(self.config.get("fallback",
+                                                          "mycroft"))
+        self.min_confidence = self.config.get("min_confidence", 0.5)
+        self.max_sec = self.config.get("max_sec", 3.0)
+        self.max_score_gap = self.config.get("max_score_gap", 8)
+        self.grammar = command_grammar
+        self.decoder = None
+        self.decoder_version = None
+        self.phone_decoder = None
+        self.dictionary = None
+        self.lock = Lock()
+        config_core = ConfigurationManager.get()
+        skills_dirs = self.config.get(
+            "skills_dirs", ["/opt/mycroft/skills",
+                            config_core.get("skills", {}).get("directory")])
+        for directory in skills_dirs:
+            if directory:
+                self.grammar.load_skills(os.path.expanduser(directory),
+                                         self.lang.lower())
+
+    def load_dictionary(self):
+        """Read the pronunciation dictionary.
+
+        Returns:
+            dict: pronunciations of each word
+        """
+        filename = self.config.get("dict")
+        if not filename:
+            from pocketsphinx import get_model_path
+            filename = join(get_model_path(), "cmudict-en-us.dict")
+        dictionary = {}
+        with open(filename) as f:
+            for line in f:
+                parts = line.split(None, 1)
+                if len(parts) == 2:
+                    # Alternative pronunciations are listed as word(2)
+                    word = parts[0].split('(')[0].lower()
+                    dictionary.setdefault(word, []).append(parts[1].strip())
+        return dictionary
+
+    def load_decoder(self, pronunciations, jsgf):
+        """Build a decoder of the acoustic model.
+
+        Args:
+            pronunciations (list): (word, phonemes) of the dictionary
+            jsgf (str): grammar of the decoder
+
+        Returns:
+            Decoder: the decoder
+        """
+        from pocketsphinx import Decoder
+        from mycroft.client.speech.hotword_factory import RECOGNIZER_DIR
+
+        (fd, dict_name) = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            for word, phonemes in pronunciations:
+                f.write(word + ' ' + phonemes + '\n')
+        (fd, jsgf_name) = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            f.write(jsgf)
+
+        model_file = join(RECOGNIZER_DIR, 'model', self.lang.lower(), 'hmm')
+        if not exists(model_file):
+            LOG.error('PocketSphinx model not found at ' + str(model_file))
+        config = Decoder.default_config()
+        config.set_string('-hmm', model_file)
+        config.set_string('-dict', dict_name)
+        config.set_string('-jsgf', jsgf_name)
+        config.set_float('-samprate', self.SAMPLE_RATE)
+        # Scores are relative to the best senone of each frame, with all of
+        # them computed the grammar and the phone loop compare
+        config.set_boolean('-compallsen', True)
+        config.set_string('-logfn', '/dev/null')
+        try:
+            return Decoder(config)
+        finally:
+            os.remove(dict_name)
+            os.remove(jsgf_name)
+
+    def create_decoder(self):
+        """Build a decoder for the current grammar.
+
+        Returns:
+            Decoder: None if the grammar is empty
+        """
+        if self.dictionary is None:
+            self.dictionary = self.load_dictionary()
+        jsgf = self.grammar.to_jsgf(set(self.dictionary))
+        if not jsgf:
+            return None
+        # Only the words of the grammar, loading is much faster
+        pronunciations = []
+        for word in sorted(self.grammar.words()):
+            for i, phonemes in enumerate(self.dictionary.get(word, [])):
+                suffix = '(%d)' % (i + 1) if i else ''
+                pronunciations.append((word + suffix, phonemes))
+        return self.load_decoder(pronunciations, jsgf)
+
+    def create_phone_decoder(self):
+        """Build the decoder of any sequence of phones.
+
+        Returns:
+            Decoder: the decoder
+        """
+        words = [p.lower() for p in self.PHONES]
+        jsgf = ('#JSGF V1.0;\n\ngrammar phones;\n\n'
+                '<phone> = ' + ' | '.join(words) + ';\n'
+                'public <phones> = <phone>+;\n')
+        return self.load_decoder(zip(words, self.PHONES), jsgf)
+
+    @staticmethod
+    def decode(decoder, data):
+        decoder.start_utt()
+        decoder.process_raw(data, False, True)
+        decoder.end_utt()
+        return decoder.hyp()
+
+    def transcribe(self, audio):
+        """Decode the audio with the command grammar.
+
+        Returns:
+            tuple: (text, confidence), text is None if nothing matched or
+                   the phone loop scored too much better than the match
+        """
+        data = audio.get_raw_data(convert_rate=self.SAMPLE_RATE,
+                                  convert_width=2)
+        with self.lock:
+            version = self.grammar.version
+            if version != self.decoder_version:
+                LOG.debug("Compiling command grammar")
+                # Not retried before the grammar changes if this fails
+                self.decoder_version = version
+                self.decoder = None
+                self.decoder = self.create_decoder()
+            if not self.decoder:
+                return None, 0.0
+            hyp = self.decode(self.decoder, data)
+            if not hyp or not hyp.hypstr:
+                return None, 0.0
+            if not self.phone_decoder:
+                self.phone_decoder = self.create_phone_decoder()
+            phones = self.decode(self.phone_decoder, data)
+            if phones:
+                gap = (phones.best_score - hyp.best_score) / float(
+                    max(1, self.decoder.n_frames()))
+                if gap > self.max_score_gap:
+                    LOG.debug("Local STT: out of grammar, the phones score "
+                              "%.1f better per frame" % gap)
+                    return None, 0.0
+            confidence = self.decoder.get_logmath().exp(hyp.prob)
+            return hyp.hypstr, confidence
+
+    def execute(self, audio, language=None):
+        duration = float(len(audio.frame_data)) / (audio.sample_rate *
+                                                   audio.sample_width)
+        # The grammar is built from the vocabulary of the configured
+        # language only
+        if language in (None, self.lang) and duration <= self.max_sec:
+            try:
+                start = time()
+                text, confidence = self.transcribe(audio)
+                LOG.debug("Local STT: %s (%.2f) in %.3f seconds" %
+                          (text, confidence, time() - start))
+                if text and confidence >= self.min_confidence:
+                    return text
+            except Exception:
+                LOG.exception("Local STT failed")
+        return self.fallback.execute(audio, language)
+
+
+class LatencyStats(object):
+    """ Latencies of the recent successful requests to an engine. """
+
+    def __init__(self, window=100):
+        self.latencies = deque(maxlen=window)
+        self.failures = 0
+
+    def add(self, seconds):
+        self.latencies.append(seconds)
+
+    def percentile(self, percent):
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        index = int(len(latencies) * percent / 100.0)
+        return latencies[min(index, len(latencies) - 1)]
+
+
+class HedgedSTT(STT):
+    """Sends the audio to a primary engine and hedges with a secondary one.
+
+    If the primary has not answered once the configured percentile of its
+    recent latencies has passed, or if it failed, the audio also goes to
+    the secondary engine and the first transcription received is used.
+    Only the slowest requests are sent twice.
+    """
+
+    def __init__(self, module=None):
+        super(HedgedSTT, self).__init__(module)
+        self.primary = STTFactory.create(self.config.get("primary",
+                                                         "mycroft"))
+        self.secondary = STTFactory.create(self.config.get("secondary",
+                                                           "kaldi"))
+        window = self.config.get("window", 100)
+        self.primary_stats = LatencyStats(window)
+        self.secondary_stats = LatencyStats(window)
+        self.percentile = self.config.get("percentile", 95)
+        self.min_delay = self.config.get("min_delay_sec", 0.5)
+        self.max_delay = self.config.get("max_delay_sec", 3.0)
+
+    def hedge_delay(self):
+        """ Seconds to wait for the primary before asking the secondary. """
+        latency = self.primary_stats.percentile(self.percentile)
+        if latency is None:
+            return self.max_delay
+        return min(max(latency, self.min_delay), self.max_delay)
+
+    def execute(self, audio, language=None):
+        results = Queue()
+
+        def run(engine, stats):
+            start = time()
+            try:
+                text = engine.execute(audio, language)
+                stats.add(time() - start)
+                results.put((text, None))
+            except Exception as e:
+                stats.failures += 1
+                results.put((None, e))
+
+        def start(engine, stats):
+            t = Thread(target=run, args=(engine, stats))
+            t.daemon = True
+            t.start()
+
+        start(self.primary, self.primary_stats)
+        pending = 1
+        error = None
+        try:
+            text, error = results.get(timeout=self.hedge_delay())
+            if text:
+                return text
+            pending -= 1
+        except Empty:
+            pass
+
+        LOG.debug("Primary STT too slow or failed, hedging")
+        start(self.secondary, self.secondary_stats)
+        pending += 1
+        while pending:
+            text, e = results.get()
+            pending -= 1
+            if text:
+                return text
+            error = error or e
+        if error:
+            raise error
+        return None
+
+
 class STTFactory(object):
     CLASSES = {
         "mycroft": MycroftSTT,
         "google": GoogleSTT,
         "wit": WITSTT,
         "ibm": IBMSTT,
-        "kaldi": KaldiSTT
+        "kaldi": KaldiSTT,
+        "hedged": HedgedSTT,
+        "pocketsphinx": PocketsphinxSTT
     }
 
     @staticmethod
-    def create():
+    def create(module=None):
         config = ConfigurationManager.get().get("stt", {})
-        module = config.get("module", "mycroft")
+        module = module or config.get("module", "mycroft")
         clazz = STTFactory.CLASSES.get(module)
-        return clazz()
+        return clazz(module)
@@ -0,0 +1,213 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Grammar of the commands known to the skills
+
+Skills register their vocabulary (.voc entities) and example sentences
+(padatious .intent files) on the message bus.  CommandGrammar collects them
+into a JSGF grammar a local decoder can be constrained with.
+
+Sentences with entity slots, e.g. "set a timer for {duration}", accept
+free speech and are left out.  Vocabulary entities can be combined, so
+"volume up" is accepted when both words are registered.
+"""
+import re
+from threading import Lock
+
+import os
+from os.path import isdir, join
+
+# Vocabulary entities which can be combined in one command
+MAX_PHRASES = 4
+
+
+def _words(text):
+    """ Lowercase words of text, punctuation removed. """
+    return re.sub(r"[^a-z']+", ' ', text.lower()).split()
+
+
+class _IntentLineParser(object):
+    """Converts a padatious sentence to a JSGF expression.
+
+    "(turn|switch) off (the|) lights" becomes
+    "( turn | switch ) off [ the ] lights".
+    """
+
+    def __init__(self, line):
+        self.tokens = re.findall(r"[()|]|[^()|\s]+", line)
+        self.pos = 0
+        self.words = set()
+
+    def parse(self):
+        """
+        Returns:
+            str: the JSGF expression, None if the line can't be expressed
+        """
+        if any(t.startswith('{') or t.endswith('}') for t in self.tokens):
+            return None
+        try:
+            alternatives = self._alternatives()
+        except ValueError:
+            return None
+        if self.pos != len(self.tokens):
+            return None  # Unbalanced parenthesis
+        return self._render(alternatives, top=True)
+
+    def _alternatives(self):
+        alternatives = [[]]
+        while self.pos < len(self.tokens):
+            token = self.tokens[self.pos]
+            if token == ')':
+                break
+            self.pos += 1
+            if token == '(':
+                group = self._alternatives()
+                if self.pos >= len(self.tokens):
+                    raise ValueError('Unbalanced parenthesis')
+                self.pos += 1
+                expression = self._render(group)
+                if expression:
+                    alternatives[-1].append(expression)
+            elif token == '|':
+                alternatives.append([])
+            else:
+                words = _words(token)
+                self.words.update(words)
+                alternatives[-1].extend(words)
+        return alternatives
+
+    @staticmethod
+    def _render(alternatives, top=False):
+        options = [' '.join(a) for a in alternatives if a]
+        if not options:
+            return None
+        if top:
+            if len(options) < len(alternatives):
+                return None  # The whole sentence is optional
+            return ' | '.join(options)
+        if len(options) < len(alternatives):
+            return '[ ' + ' | '.join(options) + ' ]'
+        return '( ' + ' | '.join(options) + ' )'
+
+
+class CommandGrammar(object):
+    """ Vocabulary and sentences of the registered skills. """
+
+    def __init__(self):
+        self.phrases = set()
+        self.sentences = {}
+        # Increased on every change so decoders know when to rebuild
+        self.version = 0
+        self.lock = Lock()
+
+    def add_vocabulary(self, phrase):
+        """Add a vocabulary entity or alias.
+
+        Args:
+            phrase (str): e.g. "stop" or "turn up"
+        """
+        phrase = ' '.join(_words(phrase))
+        with self.lock:
+            if phrase and phrase not in self.phrases:
+                self.phrases.add(phrase)
+                self.version += 1
+
+    def add_intent_line(self, line):
+        """Add an example sentence in padatious syntax.
+
+        Args:
+            line (str): e.g. "(pause|stop) the music"
+        """
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return
+        parser = _IntentLineParser(line)
+        expression = parser.parse()
+        with self.lock:
+            if expression and expression not in self.sentences:
+                self.sentences[expression] = frozenset(parser.words)
+                self.version += 1
+
+    def add_vocab_file(self, filename):
+        with open(filename) as f:
+            for line in f:
+                for phrase in line.strip().split('|'):
+                    self.add_vocabulary(phrase)
+
+    def add_intent_file(self, filename):
+        with open(filename) as f:
+            for line in f:
+                self.add_intent_line(line)
+
+    def load_skills(self, directory, lang):
+        """Add the .voc and .intent files of the skills in a directory.
+
+        Args:
+            directory (str): directory holding one folder per skill
+            lang (str): language of the vocabulary to load
+        """
+        if not isdir(directory):
+            return
+        for skill in os.listdir(directory):
+            vocab_dir = join(directory, skill, 'vocab', lang)
+            if not isdir(vocab_dir):
+                continue
+            for name in os.listdir(vocab_dir):
+                if name.endswith('.voc'):
+                    self.add_vocab_file(join(vocab_dir, name))
+                elif name.endswith('.intent'):
+                    self.add_intent_file(join(vocab_dir, name))
+
+    def words(self):
+        """ All words used by the grammar. """
+        with self.lock:
+            words = set()
+            for phrase in self.phrases:
+                words.update(phrase.split())
+            for sentence_words in self.sentences.values():
+                words.update(sentence_words)
+            return words
+
+    def to_jsgf(self, known_words=None):
+        """Build the JSGF grammar.
+
+        Args:
+            known_words (set): words the decoder can pronounce, phrases and
+                               sentences using other words are left out
+
+        Returns:
+            str: the grammar, None if there is nothing to recognize
+        """
+        def known(words):
+            return known_words is None or all(w in known_words
+                                              for w in words)
+
+        with self.lock:
+            phrases = sorted(p for p in self.phrases if known(p.split()))
+            sentences = sorted(s for s, w in self.sentences.items()
+                               if known(w))
+        rules = []
+        commands = list(sentences)
+        if phrases:
+            rules.append('<phrase> = ' + ' | '.join(phrases) + ';')
+            commands.append('<phrase>' + ' [ <phrase> ]' * (MAX_PHRASES - 1))
+        if not commands:
+            return None
+        rules.append('public <command> = ' +
+                     ' | '.join('( ' + c + ' )' for c in commands) + ';')
+        return '#JSGF V1.0;\n\ngrammar commands;\n\n' + '\n'.join(rules) + '\n'
+
+
+# Filled from the message bus by the voice client
+command_grammar = CommandGrammar()
@@ -0,0 +1,111 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import audioop
+
+from speech_recognition import AudioData
+
+
+class UtteranceTrimmer(object):
+    """Prepares an utterance for upload while it is being recorded.
+
+    Chunks are resampled to the rate expected by the STT backend and
+    leading and trailing silence beyond margin_sec is dropped.  Only
+    audioop and string operations run on the capture thread, the audio is
+    encoded later by the STT engine.  Silence after the last loud chunk is
+    held back until more speech arrives or the recording ends.
+
+    Args:
+        sample_rate (int): sample rate of the recorded audio
+        sample_width (int): bytes per sample of the recorded audio
+        target_rate (int): sample rate of the trimmed audio
+        margin_sec (float): silence kept around the speech
+    """
+
+    def __init__(self, sample_rate, sample_width, target_rate=16000,
+                 margin_sec=0.3):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.target_rate = target_rate
+        self.margin_bytes = int(margin_sec * target_rate) * 2
+        self.ratecv_state = None
+        self.speech_started = False
+        self.chunks = []
+        self.quiet = ''
+
+    def _convert(self, chunk):
+        if self.sample_width != 2:
+            chunk = audioop.lin2lin(chunk, self.sample_width, 2)
+        if self.sample_rate != self.target_rate:
+            chunk, self.ratecv_state = audioop.ratecv(
+                chunk, 2, 1, self.sample_rate, self.target_rate,
+                self.ratecv_state)
+        return chunk
+
+    def add(self, chunk, is_loud):
+        """Add a recorded chunk.
+
+        Args:
+            chunk (str): raw audio in the recorded format
+            is_loud (bool): True if the chunk contains speech
+        """
+        chunk = self._convert(chunk)
+        if not is_loud:
+            self.quiet += chunk
+            if not self.speech_started:
+                # Only the margin before the speech is kept
+                self.quiet = self.quiet[-self.margin_bytes:]
+            return
+        self.speech_started = True
+        if self.quiet:
+            self.chunks.append(self.quiet)
+            self.quiet = ''
+        self.chunks.append(chunk)
+
+    def finish(self):
+        """Add the trailing margin.
+
+        Returns:
+            str: 16 bit audio at target_rate, trimmed of silence
+        """
+        if self.quiet:
+            self.chunks.append(self.quiet[:self.margin_bytes])
+            self.quiet = ''
+        return ''.join(self.chunks)
+
+
+class TrimmedAudioData(AudioData):
+    """AudioData carrying a version trimmed of silence while recording.
+
+    The trimmed audio is used by get_flac_data() when its sample rate is
+    requested, other formats are encoded from frame_data.  The encoding
+    is done on first use, by the thread sending the audio.
+    """
+
+    def __init__(self, frame_data, sample_rate, sample_width, trimmed_data,
+                 trimmed_rate):
+        super(TrimmedAudioData, self).__init__(frame_data, sample_rate,
+                                               sample_width)
+        self.trimmed = AudioData(trimmed_data, trimmed_rate, 2)
+        self.flac_data = None
+
+    def get_flac_data(self, convert_rate=None, convert_width=None):
+        if (convert_width not in (None, 2) or
+                (convert_rate or self.sample_rate) !=
+                self.trimmed.sample_rate):
+            return super(TrimmedAudioData, self).get_flac_data(
+                convert_rate, convert_width)
+        if self.flac_data is None:
+            self.flac_data = self.trimmed.get_flac_data()
+        return self.flac_data
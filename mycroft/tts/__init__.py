@@ -14,6 +14,7 @@
 #
 import hashlib
 import random
+import wave
 from Queue import Queue, Empty
 from threading import Thread
 from time import time, sleep
@@ -25,8 +26,13 @@ from os.path import dirname, exists, isdir
 
 import mycroft.util
 from mycroft.client.enclosure.api import EnclosureAPI
+from mycroft.client.speech.reference import (
+    ReferenceWriter,
+    get_reference_file
+)
 from mycroft.configuration import ConfigurationManager
 from mycroft.messagebus.message import Message
+from mycroft.metrics.trace import stamp
 from mycroft.util import play_wav, play_mp3, check_for_signal, create_signal
 from mycroft.util.log import LOG
 
@@ -43,9 +49,24 @@ class PlaybackThread(Thread):
         self._terminated = False
         self._processing_queue = False
         self._clear_visimes = False
+        self.reference = None
 
     def init(self, tts):
         self.tts = tts
+        listener = ConfigurationManager.get().get('listener', {})
+        if listener.get('barge_in', {}).get('enabled'):
+            # The voice process cancels the echo of what is played
+            self.reference = ReferenceWriter(
+                get_reference_file(), listener.get('sample_rate', 16000))
+
+    def publish_reference(self, wav_file):
+        """
+            Publish the audio being played as echo reference.
+        """
+        try:
+            self.reference.write_wav(wav_file)
+        except (IOError, EOFError, wave.Error) as e:
+            LOG.warning('Could not publish echo reference: ' + repr(e))
 
     def clear_queue(self):
         """
@@ -53,6 +74,8 @@ class PlaybackThread(Thread):
         """
         while not self.queue.empty():
             self.queue.get()
+        if self.reference:
+            self.reference.stop()
         try:
             self.p.terminate()
         except:
@@ -65,14 +88,18 @@ class PlaybackThread(Thread):
         """
         while not self._terminated:
             try:
-                snd_type, data, visimes = self.queue.get(timeout=2)
+                snd_type, data, visimes, context = self.queue.get(timeout=2)
                 self.blink(0.5)
                 if not self._processing_queue:
                     self._processing_queue = True
-                    self.tts.begin_audio()
+                    self.tts.begin_audio(context)
 
                 if snd_type == 'wav':
                     self.p = play_wav(data)
+                    if self.reference:
+                        # Placed when the player started, the voice process
+                        # estimates the rest of the delay
+                        self.publish_reference(data)
                 elif snd_type == 'mp3':
                     self.p = play_mp3(data)
 
@@ -147,15 +174,21 @@ class TTS(object):
         self.filename = '/tmp/tts.wav'
         self.validator = validator
         self.enclosure = None
+        # Context of the speak message being handled, set by the caller
+        # of execute()
+        self.context = None
         random.seed()
         self.queue = Queue()
         self.playback = PlaybackThread(self.queue)
         self.playback.start()
         self.clear_cache()
 
-    def begin_audio(self):
+    def begin_audio(self, context=None):
         """Helper function for child classes to call in execute()"""
-        self.ws.emit(Message("recognizer_loop:audio_output_start"))
+        if context is None:
+            context = self.context
+        self.ws.emit(Message("recognizer_loop:audio_output_start",
+                             context=stamp(context, 'audio_output_start')))
         create_signal("isSpeaking")
 
     def end_audio(self):
@@ -206,7 +239,8 @@ class TTS(object):
             if phonemes:
                 self.save_phonemes(key, phonemes)
 
-        self.queue.put((self.type, wav_file, self.visime(phonemes)))
+        self.queue.put((self.type, wav_file, self.visime(phonemes),
+                        stamp(self.context, 'tts_synthesized')))
 
     def visime(self, phonemes):
         """
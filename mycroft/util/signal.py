@@ -12,7 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import ctypes
+import ctypes.util
+import struct
 import tempfile
+import threading
 import time
 
 import os
@@ -84,6 +88,114 @@ def create_file(filename):
         f.write('')
 
 
+class _SignalWatcher(object):
+    """In-process view of the signal files, kept current with inotify.
+
+    The signal directory is watched once and a background thread tracks
+    which signal files exist, so checking for an absent signal is a set
+    lookup instead of a configuration lookup and several syscalls.  Only
+    signals that might exist are checked on disk.  Where inotify is not
+    available every check goes to disk, as before.
+    """
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.directory = None
+        self.signals = set()
+        self.fd = None
+        self.wd = None
+        try:
+            self.libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                    use_errno=True)
+            self.libc.inotify_init
+        except (OSError, AttributeError):
+            self.libc = None
+
+    def get_directory(self):
+        """ The signal directory, only looked up while not watching it. """
+        if self.wd is None:
+            self.directory = ensure_directory_exists(get_ipc_directory(),
+                                                     "signal")
+            self._watch()
+        return self.directory
+
+    def _watch(self):
+        if not self.libc or not os.path.isdir(self.directory):
+            return
+        with self.lock:
+            if self.fd is None:
+                self.fd = self.libc.inotify_init()
+                if self.fd < 0:
+                    self.libc = None
+                    self.fd = None
+                    return
+                t = threading.Thread(target=self._read_events)
+                t.daemon = True
+                t.start()
+            mask = (self.IN_CREATE | self.IN_DELETE | self.IN_MOVED_FROM |
+                    self.IN_MOVED_TO | self.IN_DELETE_SELF |
+                    self.IN_MOVE_SELF)
+            wd = self.libc.inotify_add_watch(self.fd, self.directory, mask)
+            if wd < 0:
+                return
+            # List the directory after the watch is set to not miss any file
+            self.signals = set(os.listdir(self.directory))
+            self.wd = wd
+
+    def _read_events(self):
+        header_size = self.EVENT_HEADER.size
+        while True:
+            data = os.read(self.fd, 4096)
+            pos = 0
+            while pos + header_size <= len(data):
+                wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, pos)
+                pos += header_size
+                name = data[pos:pos + length].rstrip('\0')
+                pos += length
+                with self.lock:
+                    self._handle_event(wd, mask, name)
+
+    def _handle_event(self, wd, mask, name):
+        if mask & self.IN_Q_OVERFLOW:
+            # Events were lost, go back to disk until watched again
+            self.wd = None
+        elif wd != self.wd:
+            return
+        elif mask & (self.IN_CREATE | self.IN_MOVED_TO):
+            self.signals.add(name)
+        elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+            self.signals.discard(name)
+        elif mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF |
+                     self.IN_IGNORED):
+            # The directory is gone, it is watched again once recreated
+            self.wd = None
+
+    def may_exist(self, signal_name):
+        """Check if the signal file can exist without touching the disk.
+
+        Returns:
+            bool: False if the signal certainly does not exist
+        """
+        return self.wd is None or signal_name in self.signals
+
+    def created(self, signal_name):
+        """ Record a signal created by this process right away. """
+        self.signals.add(signal_name)
+
+
+_watcher = _SignalWatcher()
+
+
 def create_signal(signal_name):
     """Create a named signal
 
@@ -92,8 +204,9 @@ def create_signal(signal_name):
             valid in filenames.
     """
     try:
-        path = os.path.join(get_ipc_directory(), "signal", signal_name)
+        path = os.path.join(_watcher.get_directory(), signal_name)
         create_file(path)
+        _watcher.created(signal_name)
         return os.path.isfile(path)
     except IOError:
         return False
@@ -112,7 +225,11 @@ def check_for_signal(signal_name, sec_lifetime=0):
     Returns:
         bool: True if the signal is defined, False otherwise
     """
-    path = os.path.join(get_ipc_directory(), "signal", signal_name)
+    directory = _watcher.get_directory()
+    if not _watcher.may_exist(signal_name):
+        return False
+
+    path = os.path.join(directory, signal_name)
     if os.path.isfile(path):
         if sec_lifetime == 0:
             # consume this single-use signal
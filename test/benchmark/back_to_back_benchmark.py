@@ -0,0 +1,148 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Back-to-back command latency replayed through the listener
+
+Sessions of commands spoken one after the other are replayed through
+ListenerReplay.  Each command is a loud burst standing for the wake word
+followed by the command, the next one starts after a pause.  The report
+gives, for each pause, how many wake words were heard and how late
+relative to the end of the wake word.
+
+The listener is compared with one calibrating on the ambient noise for a
+second before each wake word search, as it did before the noise floor was
+tracked continuously.  The loudness engine only reports a wake word late
+when its start was missed, a real engine would not recognize it at all.
+
+Usage:
+    python -m test.benchmark.back_to_back_benchmark
+"""
+import audioop
+import json
+import random
+import shutil
+import struct
+import tempfile
+import wave
+
+from os.path import join, splitext
+
+from mycroft.client.speech.mic import ResponsiveRecognizer
+from mycroft.client.speech.replay import ListenerReplay, percentile
+
+SAMPLE_RATE = 16000
+
+# Seconds of each part of a command
+WAKE_WORD_SEC = 0.6
+COMMAND_SEC = 1.0
+
+COMMANDS = 10
+PAUSES_SEC = [0.5, 0.75, 1.0, 1.5, 2.0]
+
+
+class LoudnessEngine(object):
+    """ Streaming engine detecting any loud chunk as the wake word. """
+    num_phonemes = 10
+    streaming = True
+
+    def update(self, chunk):
+        return audioop.rms(chunk[-2048:], 2) > 1000
+
+    def reset(self):
+        pass
+
+
+class CalibratingRecognizer(ResponsiveRecognizer):
+    """ Listener calibrating before each wake word search. """
+
+    def listen(self, source, emitter, stream=None):
+        self.adjust_for_ambient_noise(source, 1.0)
+        return super(CalibratingRecognizer, self).listen(source, emitter,
+                                                         stream)
+
+
+def write_session(filename, pause_sec):
+    """ Write back-to-back commands and their wake word labels. """
+    random.seed(0)
+    command_sec = WAKE_WORD_SEC + COMMAND_SEC
+    duration = COMMANDS * (command_sec + pause_sec) + 2.0
+    samples = [random.randint(-20, 20) for _ in
+               range(int(duration * SAMPLE_RATE))]
+    labels = []
+    for i in range(COMMANDS):
+        start = 1.0 + i * (command_sec + pause_sec)
+        labels.append((start, start + WAKE_WORD_SEC))
+        for j in range(int(start * SAMPLE_RATE),
+                       int((start + command_sec) * SAMPLE_RATE)):
+            samples[j] = 2000 if j % 16 < 8 else -2000
+    wav = wave.open(filename, 'wb')
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(SAMPLE_RATE)
+    wav.writeframes(struct.pack('<%dh' % len(samples), *samples))
+    wav.close()
+    with open(splitext(filename)[0] + '.json', 'w') as f:
+        json.dump({'wake_words': [{'start': start, 'end': end}
+                                  for start, end in labels]}, f)
+
+
+def measure(recognizer, filenames):
+    """Replay each session.
+
+    Returns:
+        list: (hits, wake words, median latency, max latency) per session
+    """
+    replay = ListenerReplay(recognizer)
+    results = []
+    for filename in filenames:
+        report = replay.run([filename])
+        summary = report['summary']
+        results.append((summary['hits'], summary['wake_words'],
+                        percentile(report['files'][0]['latencies_sec'], 50),
+                        summary['latency_max_sec']))
+    return results
+
+
+def format_sec(value):
+    return '   n/a' if value is None else '%+.2f s' % value
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        sessions = []
+        for pause in PAUSES_SEC:
+            filename = join(directory, 'pause_%.2f.wav' % pause)
+            write_session(filename, pause)
+            sessions.append(filename)
+
+        listeners = [
+            ('calibrating', CalibratingRecognizer(LoudnessEngine())),
+            ('noise floor', ResponsiveRecognizer(LoudnessEngine()))
+        ]
+        print("%-12s %6s %8s %9s %9s" % ('listener', 'pause', 'heard',
+                                         'median', 'max'))
+        for name, recognizer in listeners:
+            for pause, result in zip(PAUSES_SEC,
+                                     measure(recognizer, sessions)):
+                hits, wake_words, median, worst = result
+                print("%-12s %4.2f s %4d/%-3d %9s %9s" % (
+                    name, pause, hits, wake_words, format_sec(median),
+                    format_sec(worst)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
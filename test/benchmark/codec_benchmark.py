@@ -0,0 +1,110 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Benchmark of the messagebus codecs
+
+Encodes and decodes a trace of the messages seen on the bus while skills
+register and the user asks a question, and reports the throughput and the
+bytes per message of each codec installed.
+
+Usage:
+    python -m test.benchmark.codec_benchmark
+"""
+import timeit
+
+from mycroft.messagebus.codec import MessageCodecFactory
+from mycroft.messagebus.message import Message
+from mycroft.metrics.trace import start_trace, stamp
+
+REPEAT = 5
+
+
+def registration():
+    """ Vocabulary and intents of a few skills loading. """
+    messages = []
+    for skill_id in range(20):
+        for word in range(10):
+            messages.append(Message('register_vocab', {
+                'start': 'word %d' % word,
+                'end': 'Skill%dKeyword' % skill_id
+            }))
+        messages.append(Message('register_intent', {
+            'name': '%d:Skill%dIntent' % (skill_id, skill_id),
+            'requires': [['Skill%dKeyword' % skill_id,
+                          'Skill%dKeyword' % skill_id]],
+            'at_least_one': [],
+            'optional': [['Location', 'Location']]
+        }))
+    return messages
+
+
+def interaction():
+    """ From the wake word to the end of the answer. """
+    context = start_trace()
+    messages = [Message('recognizer_loop:wakeword',
+                        {'utterance': 'hey mycroft', 'session': 'a1b2c3'}),
+                Message('recognizer_loop:record_begin')]
+    messages += [Message('recognizer_loop:mic_level',
+                         {'energy': 1200 + i, 'threshold': 800.5})
+                 for i in range(30)]
+    context = stamp(context, 'record_end')
+    messages += [
+        Message('recognizer_loop:record_end'),
+        Message('recognizer_loop:utterance',
+                {'utterances': ['what is the weather like today'],
+                 'lang': 'en-us', 'session': 'a1b2c3'},
+                stamp(context, 'utterance')),
+        Message('mycroft.skill.handler.start',
+                {'handler': 'WeatherSkill.handle_current_intent'}, context),
+        Message('speak', {'utterance': 'It is 21 degrees and sunny.',
+                          'expect_response': False}, context),
+        Message('recognizer_loop:audio_output_start', {}, context)
+    ]
+    messages += [Message('enclosure.mouth.viseme', {'code': i % 7})
+                 for i in range(60)]
+    messages += [Message('recognizer_loop:audio_output_end'),
+                 Message('mycroft.skill.handler.complete',
+                         {'handler': 'WeatherSkill.handle_current_intent'},
+                         context)]
+    return messages
+
+
+def benchmark(codec, messages):
+    frames = [codec.encode(m) for m in messages]
+    size = float(sum(len(f) for f in frames)) / len(frames)
+    encode = min(timeit.repeat(lambda: [codec.encode(m) for m in messages],
+                               number=10, repeat=REPEAT)) / 10
+    decode = min(timeit.repeat(lambda: [codec.decode(f) for f in frames],
+                               number=10, repeat=REPEAT)) / 10
+    return size, len(messages) / encode, len(messages) / decode
+
+
+def main():
+    traces = [('registration', registration()),
+              ('interaction', interaction())]
+    print('%-16s %-14s %10s %14s %14s' % ('trace', 'codec', 'bytes/msg',
+                                          'encode msg/s', 'decode msg/s'))
+    for trace_name, messages in traces:
+        for name in MessageCodecFactory.CLASSES:
+            codec = MessageCodecFactory.create(name)
+            if not codec:
+                print('%-16s %-14s not installed' % (trace_name, name))
+                continue
+            size, encoded, decoded = benchmark(codec, messages)
+            print('%-16s %-14s %10.1f %14.0f %14.0f' %
+                  (trace_name, name, size, encoded, decoded))
+
+
+if __name__ == "__main__":
+    main()
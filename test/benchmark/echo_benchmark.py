@@ -0,0 +1,221 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Offline benchmark of the barge-in echo cancellation
+
+Mixes a recording of the user with the echo of a TTS output file, as a
+microphone would hear them while Mycroft speaks, and runs the mix through
+the EchoSuppressor the listener uses.  The room is simulated by a delay
+and two reflections, after an output and input latency the listener is
+not told about.  The suppressor runs with the delay estimated and with
+the configured delay only.  Reports the delay found, the echo removed
+while only the TTS plays, how much of the user's speech is kept and the
+time spent per chunk.  With --hotword the wake word engine is run on the
+mix and on the cleaned audio.
+
+--record plays the TTS on the default devices and saves what the
+microphone hears, --recorded uses such a recording as the echo instead of
+the simulated room.
+
+Usage:
+    python -m test.benchmark.echo_benchmark [--hotword] [--latency SEC]
+        [--record ECHO.wav | --recorded ECHO.wav] [speech.wav tts.wav]
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import wave
+
+import numpy as np
+from os.path import dirname, join
+
+from mycroft.client.speech.echo import EchoSuppressor
+from mycroft.client.speech.reference import ReferenceWriter
+
+DATA_DIR = join(dirname(dirname(__file__)), 'unittests', 'client', 'data')
+SAMPLE_RATE = 16000
+CHUNK = 1024
+
+# Simulated room: seconds from the speaker to the microphone and echo gain
+ECHO_DELAY_SEC = 0.06
+ECHO_GAIN = 0.6
+# Default seconds of output and input latency on top of the room
+LATENCY_SEC = 0.15
+# Seconds of TTS before the user speaks
+SPEECH_START_SEC = 2.0
+
+
+def read_wav(filename):
+    wav = wave.open(filename, 'rb')
+    try:
+        if (wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or
+                wav.getsampwidth() != 2):
+            raise ValueError(filename + ' is not 16 kHz 16 bit mono')
+        data = wav.readframes(wav.getnframes())
+    finally:
+        wav.close()
+    return np.frombuffer(data, dtype=np.int16).astype(np.float64)
+
+
+def write_wav(filename, samples):
+    wav = wave.open(filename, 'wb')
+    try:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.astype(np.int16).tostring())
+    finally:
+        wav.close()
+
+
+def room_echo(played, latency_sec):
+    delay = int((latency_sec + ECHO_DELAY_SEC) * SAMPLE_RATE)
+    path = np.zeros(delay + 200)
+    path[delay] = ECHO_GAIN
+    path[delay + 90] = -ECHO_GAIN / 3
+    path[delay + 190] = ECHO_GAIN / 5
+    return np.convolve(played, path)[:len(played)]
+
+
+def record_echo(played, filename):
+    """Play audio and record the microphone from the same instant.
+
+    Both directions go through one full duplex stream, the recording
+    starts when playback starts and holds the real latency of the devices.
+    """
+    import pyaudio
+    audio = pyaudio.PyAudio()
+    stream = audio.open(format=pyaudio.paInt16, channels=1,
+                        rate=SAMPLE_RATE, input=True, output=True,
+                        frames_per_buffer=CHUNK)
+    data = played.astype(np.int16).tostring()
+    heard = []
+    try:
+        for i in range(0, len(data), CHUNK * 2):
+            stream.write(data[i:i + CHUNK * 2])
+            heard.append(stream.read(CHUNK, exception_on_overflow=False))
+    finally:
+        stream.close()
+        audio.terminate()
+    heard = np.frombuffer(''.join(heard), dtype=np.int16)
+    write_wav(filename, heard)
+
+
+def cancel(heard, played, config):
+    """Run the captured audio through an EchoSuppressor.
+
+    Returns:
+        tuple: (cleaned audio, final delay of the suppressor, seconds spent)
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        filename = join(directory, 'reference.mmap')
+        writer = ReferenceWriter(filename, SAMPLE_RATE)
+        writer.write(played.astype(np.int16).tostring(), SAMPLE_RATE,
+                     start_time=100.0)
+        suppressor = EchoSuppressor(config, SAMPLE_RATE, filename)
+        mic = heard.astype(np.int16).tostring()
+        cleaned = []
+        began = time.time()
+        for i in range(0, len(heard), CHUNK):
+            captured_at = 100.0 + float(i + CHUNK) / SAMPLE_RATE
+            cleaned.append(suppressor.process(mic[i * 2:(i + CHUNK) * 2],
+                                              captured_at))
+        elapsed = time.time() - began
+        suppressor.close()
+        writer.close()
+    finally:
+        shutil.rmtree(directory)
+    cleaned = np.frombuffer(''.join(cleaned), dtype=np.int16)
+    return cleaned.astype(np.float64), suppressor.delay_sec, elapsed
+
+
+def energy_db(reference, residual):
+    return 10 * np.log10(np.sum(reference ** 2) /
+                         (np.sum(residual ** 2) + 1e-10))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('speech', nargs='?',
+                        default=join(DATA_DIR, 'hey_mycroft.wav'))
+    parser.add_argument('tts', nargs='?',
+                        default=join(DATA_DIR, 'weather_mycroft.wav'))
+    parser.add_argument('--hotword', action='store_true')
+    parser.add_argument('--latency', type=float, default=LATENCY_SEC,
+                        help='simulated output and input latency')
+    echo = parser.add_mutually_exclusive_group()
+    echo.add_argument('--record', metavar='ECHO.wav',
+                      help='play the TTS and save the microphone audio')
+    echo.add_argument('--recorded', metavar='ECHO.wav',
+                      help='echo recorded with --record')
+    args = parser.parse_args()
+    tts = read_wav(args.tts)
+    speech = read_wav(args.speech)
+
+    start = int(SPEECH_START_SEC * SAMPLE_RATE)
+    length = max(len(tts), start + len(speech))
+    length -= length % CHUNK
+    played = np.zeros(length)
+    played[:min(len(tts), length)] = tts[:length]
+    if args.record:
+        record_echo(played, args.record)
+        print("recorded the echo in " + args.record)
+        return
+    if args.recorded:
+        echo = np.zeros(length)
+        recorded = read_wav(args.recorded)[:length]
+        echo[:len(recorded)] = recorded
+        true_delay = None
+    else:
+        echo = room_echo(played, args.latency)
+        true_delay = args.latency + ECHO_DELAY_SEC
+    user = np.zeros(length)
+    user[start:start + len(speech)] = speech[:length - start]
+    heard = np.clip(user + echo, -32768, 32767)
+
+    # Echo only, once the filter had a second to converge
+    echo_only = slice(SAMPLE_RATE, start)
+    talk = slice(start, start + len(speech))
+    if true_delay is not None:
+        print("echo delay:       %5.3f s" % true_delay)
+    runs = [('estimated', {}), ('configured', {'max_delay_sec': 0})]
+    results = []
+    for name, config in runs:
+        cleaned, delay, elapsed = cancel(heard, played, config)
+        results.append((name, cleaned))
+        print(name + " delay:")
+        print("  delay used:       %5.3f s" %
+              (delay + EchoSuppressor.DELAY_MARGIN_SEC
+               if name == 'estimated' else delay))
+        print("  echo removed:     %5.1f dB" %
+              energy_db(heard[echo_only], cleaned[echo_only]))
+        print("  speech to echo:   %5.1f dB before, %5.1f dB after" %
+              (energy_db(user[talk], heard[talk] - user[talk]),
+               energy_db(user[talk], cleaned[talk] - user[talk])))
+        print("  processing:       %5.2f ms per %d sample chunk" %
+              (elapsed * 1000 / (length / CHUNK), CHUNK))
+
+    if args.hotword:
+        from mycroft.client.speech.hotword_factory import HotWordFactory
+        engine = HotWordFactory.create_hotword()
+        for name, audio in [('mix', heard)] + results:
+            clip = audio[talk].astype(np.int16).tostring()
+            print("wake word in %-11s %s" %
+                  (name + ':', engine.found_wake_word(clip)))
+
+
+if __name__ == "__main__":
+    main()
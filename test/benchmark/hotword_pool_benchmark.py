@@ -0,0 +1,131 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Wake word decoding of several capture sources at once
+
+Every source replays the same recording chunk by chunk from its own
+thread, as the producers do, into its own wake word engine.  The engines
+either decode in the voice process or in a HotwordPool.  The report gives
+the seconds of audio decoded per second for each number of sources, and
+the worst time a source waited for one chunk to be decoded.
+
+Usage:
+    python -m test.benchmark.hotword_pool_benchmark [--sources 1 2 4 8]
+        [--workers N] [--wake-word "hey mycroft"] [WAV]
+"""
+import argparse
+import time
+import wave
+from threading import Thread
+
+from os.path import dirname, join
+
+from mycroft.client.speech.hotword_factory import HotWordFactory
+from mycroft.client.speech.hotword_pool import HotwordPool, WindowedEngine
+from mycroft.configuration import ConfigurationManager
+
+DATA_DIR = join(dirname(dirname(__file__)), 'unittests', 'client', 'data')
+
+CHUNK = 1024
+
+
+def read_chunks(filename):
+    wav = wave.open(filename, 'rb')
+    data = wav.readframes(wav.getnframes())
+    rate = wav.getframerate()
+    wav.close()
+    size = CHUNK * 2
+    return [data[i:i + size] for i in range(0, len(data), size)], rate
+
+
+def create_local(wake_word, lang, listener_config):
+    engine = HotWordFactory.create_hotword(wake_word, lang=lang,
+                                           shared=False)
+    if not engine.streaming:
+        engine = WindowedEngine(engine,
+                                listener_config.get('sample_rate', 16000),
+                                listener_config.get('phoneme_duration', 120))
+    return engine
+
+
+def replay(engines, chunks, repeat):
+    """Feed the chunks to every engine from its own thread.
+
+    Returns:
+        tuple: (wall seconds, worst seconds for one chunk)
+    """
+    waits = [0.0] * len(engines)
+
+    def feed(index, engine):
+        for _ in range(repeat):
+            engine.reset()
+            for chunk in chunks:
+                start = time.time()
+                engine.update(chunk)
+                waits[index] = max(waits[index], time.time() - start)
+
+    threads = [Thread(target=feed, args=(i, engine))
+               for i, engine in enumerate(engines)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.time() - start, max(waits)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('wav', nargs='?',
+                        default=join(DATA_DIR, 'weather_mycroft.wav'))
+    parser.add_argument('--sources', type=int, nargs='+',
+                        default=[1, 2, 4, 8])
+    parser.add_argument('--workers', type=int, default=None,
+                        help='pool processes, default one per core')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--wake-word', default=None)
+    args = parser.parse_args()
+
+    config = ConfigurationManager.get()
+    listener_config = config.get('listener')
+    lang = config.get('lang')
+    wake_word = args.wake_word or listener_config.get('wake_word')
+    chunks, rate = read_chunks(args.wav)
+    audio_sec = len(chunks) * CHUNK * args.repeat / float(rate)
+
+    # Forked before any thread runs
+    pool = HotwordPool(args.workers)
+    try:
+        print("%-8s %7s %12s %12s" % ('engines', 'sources', 'audio sec/s',
+                                      'worst chunk'))
+        for sources in args.sources:
+            setups = [
+                ('local', [create_local(wake_word, lang, listener_config)
+                           for _ in range(sources)]),
+                ('pool', [pool.create_hotword(wake_word, lang=lang)
+                          for _ in range(sources)])
+            ]
+            for name, engines in setups:
+                wall, worst = replay(engines, chunks, args.repeat)
+                print("%-8s %7d %12.1f %9.1f ms" % (
+                    name, sources, sources * audio_sec / wall,
+                    worst * 1000))
+                for engine in engines:
+                    engine.close()
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Benchmark of the routing done by the messagebus service
+
+Feeds the interaction trace of codec_benchmark to the service's handler,
+connected to a few clients, without sockets, and reports the messages
+routed per second of the IOLoop.  Compares the clients all speaking the
+sender's codec, where frames are forwarded without being decoded, with
+half of them speaking JSON, where the service translates.
+
+Usage:
+    python -m test.benchmark.messagebus_benchmark
+"""
+import timeit
+
+import mock
+from pyee import EventEmitter
+
+from mycroft.messagebus.codec import MessageCodecFactory
+from mycroft.messagebus.service import ws as service
+from mycroft.messagebus.subscription import Subscription
+from test.benchmark.codec_benchmark import interaction
+
+CLIENTS = 6
+REPEAT = 5
+
+
+def create_handler(codec_name):
+    handler = service.WebsocketEventHandler.__new__(
+        service.WebsocketEventHandler)
+    handler.emitter = EventEmitter()
+    handler.subscription = Subscription()
+    handler.codec = MessageCodecFactory.create(codec_name)
+    handler.pending = []
+    handler.ws_connection = mock.Mock()
+    handler.stream = mock.Mock()
+    handler.stream.closed.return_value = False
+    return handler
+
+
+def benchmark(sender_codec, client_codecs):
+    clients = [create_handler(name) for name in client_codecs]
+    service.client_connections[:] = clients
+    codec = MessageCodecFactory.create(sender_codec)
+    frames = [codec.encode(m) for m in interaction()]
+
+    def route():
+        for frame in frames:
+            clients[0].on_message(frame)
+        for client in clients:
+            client.flush()
+
+    elapsed = min(timeit.repeat(route, number=10, repeat=REPEAT)) / 10
+    service.client_connections[:] = []
+    return len(frames) / elapsed
+
+
+def main():
+    service.WebsocketEventHandler.log_every = 0
+    compact = 'compact-json.1'
+    cases = [
+        ('json to json', 'json', ['json'] * CLIENTS),
+        ('compact to compact', compact, [compact] * CLIENTS),
+        ('compact to mixed', compact,
+         [compact, 'json'] * (CLIENTS / 2))
+    ]
+    for name, sender, clients in cases:
+        print('%-20s %8.0f msg/s' % (name, benchmark(sender, clients)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Micro-benchmark of the audio buffering used by ResponsiveRecognizer
+
+Compares the string slicing previously done in _wait_until_wake_word and
+_record_phrase with the preallocated RingBuffer.
+
+Usage:
+    python -m test.benchmark.ringbuffer_benchmark
+"""
+import os
+import timeit
+
+from mycroft.client.speech.ringbuffer import RingBuffer
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHUNK_BYTES = 1024 * SAMPLE_WIDTH
+SAVED_WW_SEC = 10
+TEST_WW_SEC = 1
+SEC_PER_CHUNK = float(CHUNK_BYTES) / (SAMPLE_RATE * SAMPLE_WIDTH)
+CHECK_EVERY = 3  # chunks between wake word checks, ~0.2 s
+
+CHUNKS = [os.urandom(CHUNK_BYTES) for _ in range(16)]
+
+
+def wake_word_str(num_chunks):
+    max_size = SAVED_WW_SEC * SAMPLE_RATE * SAMPLE_WIDTH
+    test_size = TEST_WW_SEC * SAMPLE_RATE * SAMPLE_WIDTH
+    byte_data = ''
+    for i in range(num_chunks):
+        chunk = CHUNKS[i % len(CHUNKS)]
+        if len(byte_data) < max_size:
+            byte_data += chunk
+        else:
+            byte_data = byte_data[len(chunk):] + chunk
+        if i % CHECK_EVERY == 0:
+            byte_data[-test_size:]
+
+
+def wake_word_ring(num_chunks):
+    byte_data = RingBuffer(SAVED_WW_SEC * SAMPLE_RATE * SAMPLE_WIDTH)
+    test_size = TEST_WW_SEC * SAMPLE_RATE * SAMPLE_WIDTH
+    for i in range(num_chunks):
+        byte_data.append(CHUNKS[i % len(CHUNKS)])
+        if i % CHECK_EVERY == 0:
+            byte_data.get_last(test_size).tobytes()
+
+
+def phrase_str(num_chunks):
+    byte_data = '\0' * SAMPLE_WIDTH
+    for i in range(num_chunks):
+        byte_data += CHUNKS[i % len(CHUNKS)]
+    return byte_data
+
+
+def phrase_ring(num_chunks):
+    byte_data = RingBuffer(SAMPLE_WIDTH + num_chunks * CHUNK_BYTES)
+    byte_data.append('\0' * SAMPLE_WIDTH)
+    for i in range(num_chunks):
+        byte_data.append(CHUNKS[i % len(CHUNKS)])
+    return byte_data.get().tobytes()
+
+
+def run(name, func, num_chunks, repeat=5):
+    best = min(timeit.repeat(lambda: func(num_chunks), number=1,
+                             repeat=repeat))
+    audio_sec = num_chunks * SEC_PER_CHUNK
+    print("%-16s %8.2f ms per %.0f s of audio" %
+          (name, best * 1000, audio_sec))
+
+
+def main():
+    wake_chunks = int(60 / SEC_PER_CHUNK)
+    phrase_chunks = int(10 / SEC_PER_CHUNK)
+    run("wake word str", wake_word_str, wake_chunks)
+    run("wake word ring", wake_word_ring, wake_chunks)
+    run("phrase str", phrase_str, phrase_chunks)
+    run("phrase ring", phrase_ring, phrase_chunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Wake word benchmark replaying WAV corpora through the listener
+
+Reports detection latency relative to the labeled wake words (see
+mycroft.client.speech.replay for the label format), false accepts per hour,
+CPU seconds per hour of audio and peak RSS.  The JSON report written with
+--output can be compared across commits.
+
+Usage:
+    python -m test.benchmark.wake_word_benchmark [--output report.json]
+        [--wake-word "hey mycroft"] DIR_OR_WAV [DIR_OR_WAV ...]
+"""
+import argparse
+import json
+import subprocess
+import time
+from glob import glob
+
+from os.path import dirname, isdir, join
+
+from mycroft.client.speech.hotword_factory import HotWordFactory
+from mycroft.client.speech.mic import ResponsiveRecognizer
+from mycroft.client.speech.replay import ListenerReplay
+from mycroft.configuration import ConfigurationManager
+from mycroft.version import CORE_VERSION_STR
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=dirname(__file__)).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def find_wavs(paths):
+    filenames = []
+    for path in paths:
+        if isdir(path):
+            filenames.extend(sorted(glob(join(path, '*.wav'))))
+        else:
+            filenames.append(path)
+    return filenames
+
+
+def format_sec(value):
+    return 'n/a' if value is None else '%.3f s' % value
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+',
+                        help='WAV files or directories of WAV files')
+    parser.add_argument('--wake-word', default=None)
+    parser.add_argument('--output', help='file to write the JSON report to')
+    args = parser.parse_args()
+
+    config = ConfigurationManager.get()
+    listener_config = config.get('listener')
+    wake_word = args.wake_word or listener_config.get('wake_word')
+    engine = HotWordFactory.create_hotword(wake_word,
+                                           lang=config.get('lang'))
+    replay = ListenerReplay(ResponsiveRecognizer(engine))
+
+    def on_file(result):
+        print("%-40s %2d/%-2d detected, %d false" % (
+            result['file'], result['hits'], result['wake_words'],
+            result['false_accepts']))
+
+    report = replay.run(find_wavs(args.paths), on_file)
+    report['revision'] = git_revision()
+    report['version'] = CORE_VERSION_STR
+    report['timestamp'] = time.time()
+    report['wake_word'] = wake_word
+    report['config'] = {
+        'hotword': config.get('hotwords', {}).get(wake_word),
+        'vad': listener_config.get('vad')
+    }
+
+    summary = report['summary']
+    print
+    print("Audio:              %.1f s in %.1f s (%.0fx realtime)" % (
+        summary['audio_sec'], summary['wall_sec'],
+        summary['realtime_factor'] or 0))
+    print("Detected:           %d/%d" % (summary['hits'],
+                                         summary['wake_words']))
+    print("False accepts/hour: %s" % summary['false_accepts_per_hour'])
+    print("Latency median:     " + format_sec(summary['latency_median_sec']))
+    print("Latency p90:        " + format_sec(summary['latency_p90_sec']))
+    print("CPU s/audio hour:   %s" % summary['cpu_sec_per_audio_hour'])
+    print("Peak RSS:           %.1f MB" % summary['peak_rss_mb'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Benchmark of the wake word extraction
+
+Compares the binary search of WordExtractor with the single decode of
+SegmentWordExtractor.  The decoder is simulated: it recognizes the wake
+word in any clip containing all of it and its cost is taken as the
+seconds of audio decoded, which is what a pocketsphinx decode scales with.
+
+Usage:
+    python -m test.benchmark.word_extractor_benchmark
+"""
+import timeit
+
+from speech_recognition import AudioData
+
+from mycroft.client.speech.word_extractor import (
+    SegmentWordExtractor,
+    WordExtractor
+)
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+BYTES_PER_SEC = SAMPLE_RATE * SAMPLE_WIDTH
+
+
+class SimulatedRecognizer(object):
+    """ Knows where the wake word is, counts the audio it decodes. """
+
+    def __init__(self, audio, start, end):
+        self.audio = audio
+        self.start = start
+        self.end = end
+        # The wake word is the only non silent audio
+        self.loud_bytes = int((end - start) * BYTES_PER_SEC)
+        self.decoded_sec = 0.0
+
+    def is_recognized(self, frame_data, metrics=None):
+        self.decoded_sec += float(len(frame_data)) / BYTES_PER_SEC
+        return len(frame_data) - frame_data.count('\0') == self.loud_bytes
+
+    def find_wake_word_segment(self, frame_data):
+        self.decoded_sec += float(len(frame_data)) / BYTES_PER_SEC
+        return self.start, self.end
+
+
+def create_audio(duration, start, end):
+    data = ('\0' * int(start * BYTES_PER_SEC) +
+            '\1' * int((end - start) * BYTES_PER_SEC))
+    data += '\0' * (int(duration * BYTES_PER_SEC) - len(data))
+    return AudioData(data, SAMPLE_RATE, SAMPLE_WIDTH)
+
+
+def run(name, extractor_class, duration, start=1.0, end=1.8):
+    audio = create_audio(duration, start, end)
+    recognizer = SimulatedRecognizer(audio, start, end)
+    extractor = extractor_class(audio, recognizer, None)
+    extractor.calculate_range()
+    error = max(abs(extractor.begin - start * BYTES_PER_SEC),
+                abs(extractor.end - end * BYTES_PER_SEC)) / BYTES_PER_SEC
+    decoded_sec = recognizer.decoded_sec
+
+    def extract():
+        extractor_class(audio, recognizer, None).calculate_range()
+    best = min(timeit.repeat(extract, number=1, repeat=5))
+    print("%-10s %4.0f s clip: %3d decodes, %6.1f s decoded, "
+          "boundary error %.3f s, %.2f ms overhead" %
+          (name, duration, extractor.decodes, decoded_sec,
+           error, best * 1000))
+
+
+def main():
+    for duration in (3, 10):
+        run("binary", WordExtractor, duration)
+        run("segment", SegmentWordExtractor, duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+import unittest
+import wave
+
+import mock
+
+from mycroft.client.speech.earcon import EarconPlayer
+from mycroft.util import resolve_resource_file
+
+
+@mock.patch('mycroft.client.speech.earcon.pyaudio')
+class EarconPlayerTest(unittest.TestCase):
+    def test_play(self, pyaudio):
+        player = EarconPlayer({'start_listening':
+                               'snd/start_listening.wav'}, 16000)
+        wav = wave.open(resolve_resource_file('snd/start_listening.wav'))
+        duration = float(wav.getnframes()) / wav.getframerate()
+        wav.close()
+        self.assertAlmostEqual(player.play('start_listening'), duration,
+                               places=2)
+        player.close()
+
+        # One stream opened for the first sound
+        self.assertEqual(pyaudio.PyAudio.return_value.open.call_count, 1)
+        stream = pyaudio.PyAudio.return_value.open.return_value
+        frame_data = stream.write.call_args[0][0]
+        self.assertAlmostEqual(len(frame_data) / 32000.0, duration,
+                               places=2)
+        self.assertTrue(stream.close.called)
+
+    def test_idle(self, pyaudio):
+        player = EarconPlayer({'start_listening':
+                               'snd/start_listening.wav'}, 16000,
+                              idle_sec=0.05)
+        audio = pyaudio.PyAudio.return_value
+        stream = audio.open.return_value
+        # Nothing is opened before a sound is played
+        time.sleep(0.1)
+        self.assertFalse(pyaudio.PyAudio.called)
+
+        player.play('start_listening')
+        for _ in range(100):
+            if audio.terminate.called:
+                break
+            time.sleep(0.01)
+        self.assertTrue(stream.close.called)
+        self.assertTrue(audio.terminate.called)
+        # Opened again for the next sound
+        player.play('start_listening')
+        player.close()
+        self.assertEqual(audio.open.call_count, 2)
+
+    def test_unknown_sound(self, pyaudio):
+        player = EarconPlayer({'missing': 'snd/missing.wav'})
+        self.assertEqual(player.play('missing'), 0.0)
+        self.assertEqual(player.play('start_listening'), 0.0)
+        player.close()
+        stream = pyaudio.PyAudio.return_value.open.return_value
+        self.assertFalse(stream.write.called)
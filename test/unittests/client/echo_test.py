@@ -0,0 +1,197 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import os
+
+from mycroft.client.speech.echo import EchoCanceller, EchoSuppressor
+from mycroft.client.speech.reference import ReferenceReader, ReferenceWriter
+
+RATE = 16000
+BLOCK = 1024
+
+
+def energy(samples):
+    return np.sum(samples.astype(np.float64) ** 2)
+
+
+def simulate_echo(played, gain=0.5, delay=120):
+    """ Audio heard by the microphone when played goes through a room. """
+    path = np.zeros(delay + 80)
+    path[delay] = gain
+    path[delay + 60] = -gain / 3
+    return np.convolve(played, path)[:len(played)].astype(np.int16)
+
+
+class ReferenceChannelTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'reference.mmap')
+        self.writer = ReferenceWriter(self.file, RATE, capacity_sec=1.0)
+        self.reader = ReferenceReader(self.file)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        shutil.rmtree(self.dir)
+
+    def test_read(self):
+        self.writer.write('\1\0' * 100, RATE, start_time=2.0)
+        start = self.reader.index(2.0)
+        # Silence around the clip
+        data = self.reader.read(start - 10, 120)
+        self.assertEqual(data, '\0\0' * 10 + '\1\0' * 100 + '\0\0' * 10)
+        self.assertTrue(self.reader.is_active(start + 50, start + 60))
+        self.assertFalse(self.reader.is_active(start + 100, start + 200))
+
+    def test_wrap_around(self):
+        # 0.9 seconds in, the clip wraps around the one second ring
+        self.writer.write('\2\0' * 3200, RATE, start_time=10.9)
+        start = self.reader.index(10.9)
+        self.assertEqual(self.reader.read(start, 3200), '\2\0' * 3200)
+
+    def test_resampled(self):
+        self.writer.write('\1\0\1\0' * 100, RATE * 2, channels=2,
+                          start_time=1.0)
+        # 100 stereo samples at twice the rate
+        start, end = self.reader.range()
+        self.assertEqual(end - start, 50)
+
+    def test_stop(self):
+        self.writer.write('\1\0' * 1600, RATE, start_time=3.0)
+        self.writer.stop(3.05)
+        start, end = self.reader.range()
+        self.assertEqual(end - start, 800)
+
+
+class EchoCancellerTest(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(1)
+        self.played = (np.random.randn(BLOCK * 40) * 3000).astype(np.int16)
+        self.canceller = EchoCanceller(BLOCK)
+
+    def cancel(self, heard, offset=0):
+        blocks = []
+        for i in range(0, len(heard), BLOCK):
+            played = self.played[offset + i:offset + i + BLOCK]
+            out = self.canceller.process(heard[i:i + BLOCK].tostring(),
+                                         played.tostring())
+            blocks.append(np.frombuffer(out, dtype=np.int16))
+        return np.concatenate(blocks)
+
+    def test_echo_cancelled(self):
+        heard = simulate_echo(self.played)
+        cleaned = self.cancel(heard)
+        tail = slice(BLOCK * 30, None)
+        # At least 20 dB less echo once converged
+        self.assertLess(energy(cleaned[tail]), energy(heard[tail]) / 100)
+
+    def test_double_talk(self):
+        heard = simulate_echo(self.played)
+        self.cancel(heard[:BLOCK * 30])
+        # The user speaks louder than the echo
+        voice = (np.sin(np.arange(BLOCK * 10) * 0.05) * 12000)
+        mixed = (heard[BLOCK * 30:] + voice).astype(np.int16)
+        cleaned = self.cancel(mixed, BLOCK * 30)
+        residual = cleaned - voice
+        self.assertLess(energy(residual), energy(voice) / 100)
+
+    def test_long_echo_path(self):
+        # Reflections longer than a block need more partitions
+        heard = simulate_echo(self.played, delay=BLOCK + 300)
+        tail = slice(BLOCK * 30, None)
+        cleaned = self.cancel(heard)
+        self.assertGreater(energy(cleaned[tail]), energy(heard[tail]) / 4)
+        self.canceller = EchoCanceller(BLOCK, blocks=2)
+        cleaned = self.cancel(heard)
+        self.assertLess(energy(cleaned[tail]), energy(heard[tail]) / 100)
+
+
+class EchoSuppressorTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'reference.mmap')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_no_reference(self):
+        suppressor = EchoSuppressor({}, RATE, self.file)
+        chunk = '\1\0' * BLOCK
+        self.assertEqual(suppressor.process(chunk, 5.0), chunk)
+
+    def test_silent_reference(self):
+        writer = ReferenceWriter(self.file, RATE)
+        writer.write('\1\0' * RATE, RATE, start_time=1.0)
+        suppressor = EchoSuppressor({'delay_sec': 0}, RATE, self.file)
+        chunk = '\1\0' * BLOCK
+        # Nothing was played then
+        self.assertEqual(suppressor.process(chunk, 5.0), chunk)
+        self.assertIsNone(suppressor.canceller)
+        suppressor.process(chunk, 1.5)
+        self.assertEqual(suppressor.canceller.block_size, BLOCK)
+        writer.close()
+        suppressor.close()
+
+    def play(self, seconds, delay, config, jitter=0.0):
+        """Play noise and capture its echo, heard delay seconds later.
+
+        The capture times are off by up to jitter seconds.
+
+        Returns:
+            tuple: (suppressor, echo heard, echo left)
+        """
+        np.random.seed(2)
+        played = (np.random.randn(int(seconds * RATE)) * 3000)
+        played = played.astype(np.int16)
+        writer = ReferenceWriter(self.file, RATE)
+        writer.write(played.tostring(), RATE, start_time=10.0)
+        writer.close()
+        heard = simulate_echo(played, delay=int(delay * RATE))
+        suppressor = EchoSuppressor(config, RATE, self.file)
+        cleaned = []
+        for i in range(0, len(heard) - BLOCK + 1, BLOCK):
+            captured_at = (10.0 + float(i + BLOCK) / RATE +
+                           np.random.uniform(-jitter, jitter))
+            cleaned.append(suppressor.process(heard[i:i + BLOCK].tostring(),
+                                              captured_at))
+        suppressor.close()
+        cleaned = np.frombuffer(''.join(cleaned), dtype=np.int16)
+        return suppressor, heard[:len(cleaned)], cleaned
+
+    def test_delay_estimated(self):
+        suppressor, heard, cleaned = self.play(4.0, 0.45, {'delay_sec': 0.05})
+        self.assertAlmostEqual(suppressor.delay_sec,
+                               0.45 - EchoSuppressor.DELAY_MARGIN_SEC,
+                               delta=0.002)
+        tail = slice(3 * RATE, None)
+        self.assertLess(energy(cleaned[tail]), energy(heard[tail]) / 100)
+
+    def test_delay_fixed(self):
+        config = {'delay_sec': 0.05, 'max_delay_sec': 0}
+        suppressor, heard, cleaned = self.play(4.0, 0.45, config)
+        self.assertEqual(suppressor.delay_sec, 0.05)
+        # The echo comes after the filter
+        tail = slice(3 * RATE, None)
+        self.assertGreater(energy(cleaned[tail]), energy(heard[tail]) / 4)
+
+    def test_jittery_capture_times(self):
+        config = {'delay_sec': 0.05, 'max_delay_sec': 0}
+        suppressor, heard, cleaned = self.play(4.0, 0.06, config, 0.002)
+        tail = slice(3 * RATE, None)
+        self.assertLess(energy(cleaned[tail]), energy(heard[tail]) / 100)
@@ -0,0 +1,174 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+import mock
+
+from mycroft.client.speech.hotword_factory import (
+    HotWordFactory, KeyphraseSpotter
+)
+
+CONFIG = {
+    'hey mycroft': {
+        'module': 'pocketsphinx',
+        'phonemes': 'HH EY . M AY K R AO F T',
+        'threshold': 1e-90
+    },
+    'wake up': {
+        'module': 'pocketsphinx',
+        'phonemes': 'W EY K . AH P',
+        'threshold': 1e-20
+    }
+}
+
+
+class HotWordFactoryTest(unittest.TestCase):
+    def setUp(self):
+        HotWordFactory.engines = {}
+        KeyphraseSpotter._instances = {}
+        self.pocketsphinx = mock.MagicMock()
+        self.decoder = self.pocketsphinx.Decoder.return_value
+        self.kws = []
+
+        def read_config(config):
+            # The config is shared by the mocked decoders, the last
+            # keyphrase list is the one of this decoder
+            kws = [args for args, _ in config.set_string.call_args_list
+                   if args[0] == '-kws'][-1]
+            with open(kws[1]) as f:
+                self.kws = sorted(f.read().splitlines())
+            # The first decoder loaded is self.decoder, then new ones
+            if self.pocketsphinx.Decoder.call_count == 1:
+                return self.decoder
+            return mock.MagicMock()
+
+        self.pocketsphinx.Decoder.side_effect = read_config
+        patcher = mock.patch.dict('sys.modules',
+                                  {'pocketsphinx': self.pocketsphinx})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_shared_instances(self):
+        first = HotWordFactory.create_hotword('hey mycroft', CONFIG)
+        second = HotWordFactory.create_hotword('hey mycroft', CONFIG)
+        self.assertIs(first, second)
+        # Engines of capture sources are not shared, the decoder is
+        source = HotWordFactory.create_hotword('hey mycroft', CONFIG,
+                                               shared=False)
+        self.assertIsNot(source, first)
+        self.assertIs(source.spotter, first.spotter)
+
+    def test_single_decoder(self):
+        wake_word = HotWordFactory.create_hotword('hey mycroft', CONFIG)
+        wake_up = HotWordFactory.create_hotword('wake up', CONFIG)
+        self.assertIs(wake_word.spotter, wake_up.spotter)
+
+        self.decoder.seg.return_value = [mock.Mock(word='WAKE UP ')]
+        self.assertFalse(wake_word.found_wake_word('audio'))
+        self.assertTrue(wake_up.found_wake_word('audio'))
+        self.assertEqual(wake_up.spotter.find_keyphrases('audio'),
+                         ['wake up'])
+
+        # Both phrases are spotted by one decoder with their own thresholds
+        self.assertEqual(self.pocketsphinx.Decoder.call_count, 1)
+        self.assertEqual(self.kws, ['hey mycroft /1e-90/',
+                                    'wake up /1e-20/'])
+
+    def test_streaming(self):
+        wake_word = HotWordFactory.create_hotword('hey mycroft', CONFIG)
+        self.decoder.seg.return_value = []
+        self.decoder.get_in_speech.return_value = True
+        self.assertFalse(wake_word.update('chunk'))
+        self.assertFalse(wake_word.update('chunk'))
+        self.assertEqual(self.decoder.start_utt.call_count, 1)
+
+        self.decoder.seg.return_value = [mock.Mock(word='hey mycroft ')]
+        self.assertTrue(wake_word.update('chunk'))
+        self.assertEqual(self.decoder.end_utt.call_count, 1)
+
+    def test_streaming_not_ended_by_clips(self):
+        wake_word = HotWordFactory.create_hotword('hey mycroft', CONFIG)
+        wake_up = HotWordFactory.create_hotword('wake up', CONFIG)
+        self.decoder.seg.return_value = []
+        self.decoder.get_in_speech.return_value = True
+        self.assertFalse(wake_word.update('chunk'))
+
+        # The stand up word is decoded from another thread
+        wake_up.found_wake_word('audio')
+        wake_up.reset()
+        self.assertEqual(self.pocketsphinx.Decoder.call_count, 2)
+        self.assertFalse(self.decoder.end_utt.called)
+
+        # The wake word utterance goes on
+        self.assertFalse(wake_word.update('chunk'))
+        self.assertEqual(self.decoder.start_utt.call_count, 1)
+        self.assertEqual(self.decoder.process_raw.call_count, 2)
+
+    def test_find_wake_word_segment(self):
+        wake_word = HotWordFactory.create_hotword('hey mycroft', CONFIG)
+        self.decoder.get_config.return_value.get_int.return_value = 100
+        self.decoder.seg.return_value = [
+            mock.Mock(word='<sil>', start_frame=0, end_frame=49),
+            mock.Mock(word='HEY MYCROFT', start_frame=50, end_frame=119)
+        ]
+        self.assertEqual(wake_word.find_wake_word_segment('audio'),
+                         (0.5, 1.2))
+        self.decoder.seg.return_value = []
+        self.assertIsNone(wake_word.find_wake_word_segment('audio'))
+
+    def test_whole_keyphrases(self):
+        config = dict(CONFIG, mycroft={'module': 'pocketsphinx',
+                                       'phonemes': 'M AY K R AO F T',
+                                       'threshold': 1e-20})
+        wake_word = HotWordFactory.create_hotword('hey mycroft', config)
+        short = HotWordFactory.create_hotword('mycroft', config)
+        self.decoder.seg.return_value = [mock.Mock(word='hey mycroft ')]
+        self.assertTrue(wake_word.found_wake_word('audio'))
+        self.assertFalse(short.found_wake_word('audio'))
+
+    def test_close_removes_keyphrase(self):
+        wake_word = HotWordFactory.create_hotword('hey mycroft', CONFIG)
+        source = HotWordFactory.create_hotword('hey mycroft', CONFIG,
+                                               shared=False)
+        wake_up = HotWordFactory.create_hotword('wake up', CONFIG)
+        wake_up.close()
+        self.assertFalse(wake_up.found_wake_word('audio'))
+        wake_word.found_wake_word('audio')
+        self.assertEqual(self.kws, ['hey mycroft /1e-90/'])
+
+        # Still used by the engine of the source
+        wake_word.close()
+        source.found_wake_word('audio')
+        self.assertEqual(self.kws, ['hey mycroft /1e-90/'])
+        source.close()
+        self.assertEqual(source.spotter.keyphrases, {})
+
+        # Closed engines are not shared any more
+        self.assertIsNot(HotWordFactory.create_hotword('wake up', CONFIG),
+                         wake_up)
+
+    def test_closed_stream_detects_nothing(self):
+        wake_word = HotWordFactory.create_hotword('hey mycroft', CONFIG)
+        self.decoder.seg.return_value = []
+        self.decoder.get_in_speech.return_value = True
+        wake_word.update('chunk')
+        wake_word.close()
+        self.assertEqual(self.decoder.end_utt.call_count, 1)
+        self.assertFalse(wake_word.update('chunk'))
+        self.assertEqual(self.decoder.process_raw.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
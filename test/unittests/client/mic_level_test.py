@@ -0,0 +1,95 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import tempfile
+import unittest
+
+import os
+from os.path import join
+
+from mycroft.client.speech.mic_level import MicLevelReader, MicLevelWriter
+
+
+class MicLevelTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = join(self.dir, 'mic_level.mmap')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_latest(self):
+        writer = MicLevelWriter(self.filename, capacity=4)
+        reader = MicLevelReader(self.filename)
+        self.assertIsNone(reader.latest())
+
+        writer.write(1.0, 10, 1.5)
+        writer.write(2.0, 20, 2.5)
+        self.assertEqual(reader.count(), 2)
+        self.assertEqual(reader.latest(), (2.0, 20, 2.5))
+
+    def test_read_since(self):
+        writer = MicLevelWriter(self.filename, capacity=4)
+        reader = MicLevelReader(self.filename)
+        for i in range(3):
+            writer.write(i, i, 1.0)
+        samples, count = reader.read_since(0)
+        self.assertEqual([s[0] for s in samples], [0, 1, 2])
+
+        # Only the last capacity samples survive in the ring
+        for i in range(3, 10):
+            writer.write(i, i, 1.0)
+        samples, count = reader.read_since(count)
+        self.assertEqual([s[0] for s in samples], [6, 7, 8, 9])
+        self.assertEqual(reader.read_since(count), ([], 10))
+
+    def test_writer_restart(self):
+        writer = MicLevelWriter(self.filename, capacity=4)
+        reader = MicLevelReader(self.filename)
+        for i in range(3):
+            writer.write(i, i, 1.0)
+        _, count = reader.read_since(0)
+
+        writer.close()
+        writer = MicLevelWriter(self.filename, capacity=4)
+        writer.write(5.0, 5, 1.0)
+        samples, count = reader.read_since(count)
+        self.assertEqual(samples, [(5.0, 5, 1.0)])
+        self.assertEqual(count, 1)
+
+    def test_file_recreated(self):
+        writer = MicLevelWriter(self.filename, capacity=4)
+        reader = MicLevelReader(self.filename)
+        self.assertFalse(reader.is_stale())
+
+        writer.close()
+        os.remove(self.filename)
+        self.assertTrue(reader.is_stale())
+        writer = MicLevelWriter(self.filename, capacity=4)
+        self.assertTrue(reader.is_stale())
+
+        reader = MicLevelReader(self.filename)
+        self.assertIsNone(reader.latest())
+        writer.write(1.0, 10, 1.5)
+        self.assertEqual(reader.latest(), (1.0, 10, 1.5))
+
+    def test_invalid_file(self):
+        with open(self.filename, 'w') as f:
+            f.write('Energy:  cur=4 thresh=1.5')
+        self.assertRaises(ValueError, MicLevelReader, self.filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
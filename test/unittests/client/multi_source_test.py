@@ -0,0 +1,313 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import signal
+import time
+import unittest
+from Queue import Queue
+
+import mock
+from speech_recognition import AudioData
+
+from mycroft.client.speech.hotword_factory import HotWordEngine, \
+    HotWordFactory
+from mycroft.client.speech.hotword_pool import (
+    HotwordPool,
+    PooledHotWord,
+    _handle
+)
+from mycroft.client.speech.listener import (
+    AudioConsumer,
+    DuplicateFilter,
+    RecognizerLoop,
+    RecognizerLoopState
+)
+from mycroft.client.speech.mic import UtteranceStream
+from mycroft.configuration import ConfigurationManager
+from mycroft.metrics.trace import start_trace
+from mycroft.stt import STTStream
+
+
+def create_audio(source, detected_at):
+    audio = AudioData('\0' * 32000, 16000, 2)
+    audio.source = source
+    audio.trace = start_trace()
+    audio.trace['trace']['stamps']['wakeword'] = detected_at
+    return audio
+
+
+class DuplicateFilterTest(unittest.TestCase):
+    def test_window(self):
+        duplicates = DuplicateFilter(window_sec=1.0)
+        self.assertTrue(duplicates.accept('kitchen', 10.0))
+        self.assertFalse(duplicates.accept('hall', 10.4))
+        # The dropped utterance doesn't extend the window
+        self.assertTrue(duplicates.accept('hall', 11.2))
+        # A source never duplicates itself
+        self.assertTrue(duplicates.accept('hall', 11.5))
+
+
+class MultiSourceConsumerTest(unittest.TestCase):
+    def setUp(self):
+        self.emitter = mock.Mock()
+        stt = mock.Mock(lang='en-us')
+        self.consumer = AudioConsumer(RecognizerLoopState(), Queue(),
+                                      self.emitter, stt, mock.Mock(),
+                                      mock.Mock(key_phrase='hey mycroft'),
+                                      DuplicateFilter(1.0))
+        self.consumer.executor.shutdown()
+        self.consumer.executor = mock.Mock()
+
+    def emitted(self, message_type):
+        return [args[1] for args, _ in self.emitter.emit.call_args_list
+                if args[0] == message_type]
+
+    def test_duplicate_dropped(self):
+        self.consumer.process(create_audio('kitchen', 10.0))
+        self.consumer.process(create_audio('hall', 10.3))
+        self.assertEqual(self.consumer.executor.submit.call_count, 1)
+        wakewords = self.emitted('recognizer_loop:wakeword')
+        self.assertEqual([w['source'] for w in wakewords], ['kitchen'])
+
+    def test_sessions_by_source(self):
+        self.consumer.process(create_audio('kitchen', 10.0))
+        self.consumer.process(create_audio('hall', 20.0))
+        self.assertEqual(self.consumer.executor.submit.call_count, 2)
+        for _, kwargs in self.consumer.executor.submit.call_args_list:
+            self.assertEqual(kwargs['context']['source'], kwargs['key'])
+            self.consumer._emit_utterance('hello', kwargs['context'])
+
+        wakewords = self.emitted('recognizer_loop:wakeword')
+        utterances = self.emitted('recognizer_loop:utterance')
+        self.assertNotEqual(wakewords[0]['session'], wakewords[1]['session'])
+        self.assertEqual([u['session'] for u in utterances],
+                         [w['session'] for w in wakewords])
+        self.assertEqual(utterances[1]['context']['source'], 'hall')
+
+
+@mock.patch('mycroft.client.speech.listener.STTFactory')
+@mock.patch('mycroft.client.speech.listener.HotwordPool')
+@mock.patch('mycroft.client.speech.listener.ResponsiveRecognizer')
+@mock.patch('mycroft.client.speech.listener.AudioSourceFactory')
+class MultiSourceLoopTest(unittest.TestCase):
+    def setUp(self):
+        self.listener = ConfigurationManager.get()['listener']
+        listener = dict(self.listener,
+                        sources={'kitchen': {'type': 'microphone'},
+                                 'hall': {'type': 'fifo', 'path': '/tmp/x'}},
+                        hotword_workers=3)
+        ConfigurationManager.update({'listener': listener})
+
+    def tearDown(self):
+        ConfigurationManager.remove_listener(self.loop._on_config_changed)
+        # Loading merges, the sources must be removed first
+        ConfigurationManager.update({'listener': self.listener})
+        ConfigurationManager.load_defaults()
+
+    def test_captures(self, sources, recognizer, pool, stt):
+        self.loop = RecognizerLoop()
+        pool.assert_called_once_with(3)
+        self.assertEqual([name for name, _, _ in self.loop.captures],
+                         ['hall', 'kitchen'])
+        self.assertEqual(self.loop.wakeword_recognizer,
+                         pool.return_value.create_hotword.return_value)
+        # Each source has its own engine
+        calls = pool.return_value.create_hotword.call_args_list
+        self.assertEqual(len([c for c in calls
+                              if not c[1].get('shared', True)]), 2)
+        # The wake word upload queue is shared
+        queue = recognizer.return_value.wake_word_queue
+        recognizer.assert_called_with(self.loop.wakeword_recognizer,
+                                      'kitchen', queue)
+
+    def test_pool_created_once(self, sources, recognizer, pool, stt):
+        self.loop = RecognizerLoop()
+        self.loop._stop = mock.Mock()
+        self.loop.start_async = mock.Mock()
+        self.loop.reload()
+        pool.assert_called_once_with(3)
+        self.assertEqual(self.loop.hotword_pool, pool.return_value)
+        self.assertFalse(pool.return_value.close.called)
+
+    def test_pool_closed_on_stop(self, sources, recognizer, pool, stt):
+        self.loop = RecognizerLoop()
+        self.loop._stop = mock.Mock()
+        self.loop.stop()
+        pool.return_value.close.assert_called_once_with()
+        self.assertIsNone(self.loop.hotword_pool)
+
+    @mock.patch('mycroft.client.speech.listener.HotWordFactory')
+    @mock.patch('mycroft.client.speech.listener.MutableMicrophone')
+    def test_sources_enabled_later(self, mic, hotwords, sources, recognizer,
+                                   pool, stt):
+        listener = ConfigurationManager.get()['listener']
+        ConfigurationManager.update({'listener': self.listener})
+        self.loop = RecognizerLoop()
+        ConfigurationManager.update({'listener': listener})
+        self.loop._load_config()
+        # The workers can't be forked once the threads run
+        self.assertFalse(pool.called)
+        self.assertEqual([name for name, _, _ in self.loop.captures],
+                         ['hall', 'kitchen'])
+        self.assertEqual(self.loop.wakeword_recognizer,
+                         hotwords.create_hotword.return_value)
+
+    def test_mute(self, sources, recognizer, pool, stt):
+        self.loop = RecognizerLoop()
+        self.loop.mute()
+        self.assertEqual(sources.create.return_value.mute.call_count, 2)
+        self.loop.unmute()
+        self.assertEqual(sources.create.return_value.unmute.call_count, 2)
+
+
+class CountingEngine(HotWordEngine):
+    """ Detects the wake word after a number of bytes. """
+
+    def __init__(self, key_phrase, config, lang):
+        super(CountingEngine, self).__init__(key_phrase, config, lang)
+        self.num_phonemes = 10
+        self.streaming = config.get('streaming', True)
+        self.received = 0
+
+    def update(self, chunk):
+        self.received += len(chunk)
+        return self.received >= self.config['after']
+
+    def reset(self):
+        self.received = 0
+
+    def found_wake_word(self, frame_data):
+        return '\x01' in frame_data
+
+
+class LocalWorker(object):
+    """ Runs the requests of the worker in this process. """
+
+    def __init__(self):
+        self.engines = 0
+        self.by_id = {}
+        self.requests = []
+
+    def call(self, engine_id, method, *args):
+        self.requests.append((method, args))
+        return _handle(self.by_id, engine_id, method, args)
+
+
+@mock.patch.dict(HotWordFactory.CLASSES, {'counting': CountingEngine})
+class PooledHotWordTest(unittest.TestCase):
+    def create_hotword(self, worker, engine_id, **config):
+        config = {'hey mycroft': dict(config, module='counting')}
+        return PooledHotWord(worker, engine_id, 'hey mycroft', config)
+
+    def test_streaming_state_per_source(self):
+        worker = LocalWorker()
+        kitchen = self.create_hotword(worker, 1, after=3)
+        hall = self.create_hotword(worker, 2, after=3)
+        self.assertEqual(kitchen.num_phonemes, 10)
+        self.assertTrue(kitchen.streaming)
+
+        self.assertFalse(kitchen.update('ab'))
+        self.assertFalse(hall.update('a'))
+        self.assertTrue(kitchen.update('c'))
+        hall.reset()
+        self.assertFalse(hall.update('ab'))
+        # Only the new audio was sent
+        self.assertEqual([args[0] for method, args in worker.requests
+                          if method == 'update'], ['ab', 'a', 'c', 'ab'])
+
+        kitchen.close()
+        self.assertEqual(list(worker.by_id), [2])
+        # Closed while its source still feeds it
+        self.assertIsNone(kitchen.update('d'))
+
+    def test_windowed_engine(self):
+        worker = LocalWorker()
+        hotword = self.create_hotword(worker, 1, streaming=False)
+        self.assertTrue(hotword.streaming)
+        window = worker.by_id[1]
+        # 10 phonemes of 120 ms, a second of audio checked every 0.2 s
+        self.assertEqual(window.window_size, 32000)
+        self.assertEqual(window.check_size, 6400)
+
+        chunk = '\0' * 2048
+        results = [hotword.update(chunk) for _ in range(3)]
+        self.assertEqual(results, [False, False, False])
+        self.assertTrue(hotword.update('\x01' + '\0' * 2047))
+        hotword.reset()
+        self.assertEqual(window.window, '\0' * 32000)
+        # Clips are still decoded as a whole
+        self.assertTrue(hotword.found_wake_word('\x01'))
+
+    def test_workers(self):
+        pool = HotwordPool(2)
+        self.addCleanup(pool.close)
+        config = {'hey mycroft': {'module': 'counting', 'after': 4}}
+        sources = [pool.create_hotword('hey mycroft', config)
+                   for _ in range(3)]
+        # Spread over the workers
+        workers = [hotword.worker for hotword in sources]
+        self.assertEqual(len(set(workers)), 2)
+        for hotword in sources:
+            self.assertFalse(hotword.update('ab'))
+        self.assertTrue(sources[0].update('cd'))
+        self.assertFalse(sources[1].update('c'))
+        sources[2].close()
+        self.assertEqual(pool.create_hotword('hey mycroft', config).worker,
+                         workers[2])
+
+    def test_workers_exit_on_close(self):
+        # The handler of the voice process, as the PID lock's
+        handler = signal.signal(signal.SIGTERM, lambda *args: None)
+        self.addCleanup(signal.signal, signal.SIGTERM, handler)
+        pool = HotwordPool(2)
+        start = time.time()
+        pool.close()
+        # Closing the connections stops them, no need to terminate
+        self.assertLess(time.time() - start, 1.0)
+        for worker in pool.workers:
+            self.assertFalse(worker.process.is_alive())
+
+
+class ConcurrentStreamsTest(unittest.TestCase):
+    def test_streams_of_two_sources(self):
+        emitter = mock.Mock()
+        stt = mock.Mock(lang='en-us')
+        stt.start_stream.side_effect = lambda rate, width: STTStream(
+            stt, rate, width)
+        stt.execute.side_effect = lambda audio, language: audio.frame_data
+        consumer = AudioConsumer(RecognizerLoopState(), Queue(), emitter,
+                                 stt, mock.Mock(),
+                                 mock.Mock(key_phrase='hey mycroft'))
+        self.addCleanup(consumer.executor.shutdown)
+
+        kitchen = UtteranceStream(source='kitchen')
+        hall = UtteranceStream(source='hall')
+        for stream in (kitchen, hall):
+            stream.open(16000, 2)
+            consumer.process_stream(stream)
+        # Both are transcribed while their chunks arrive interleaved
+        for _ in range(3):
+            kitchen.put('k' * 8000)
+            hall.put('h' * 8000)
+        kitchen.close()
+        hall.close()
+
+        def utterances():
+            return [args[1]['utterances'][0] for args, _ in
+                    emitter.emit.call_args_list
+                    if args[0] == 'recognizer_loop:utterance']
+        timeout = time.time() + 5
+        while len(utterances()) < 2 and time.time() < timeout:
+            time.sleep(0.01)
+        self.assertEqual(utterances(), ['k' * 24000, 'h' * 24000])
@@ -0,0 +1,90 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+import mock
+import pyaudio
+
+from mycroft.client.speech.mic import MutableStream
+
+
+class MutableStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.audio = mock.MagicMock()
+        self.audio.open.return_value.get_input_latency.return_value = 0.01
+        self.stream = MutableStream(pyaudio.paInt16)
+        self.stream.open(self.audio, rate=16000, frames_per_buffer=4)
+
+    def capture(self, data, status=0):
+        return self.stream.callback(data, len(data) / 2, {}, status)
+
+    def test_open_uses_callback(self):
+        kwargs = self.audio.open.call_args[1]
+        self.assertEqual(kwargs['stream_callback'], self.stream.callback)
+        self.assertTrue(kwargs['input'])
+
+    def test_read_frame(self):
+        result = self.capture('abcdefgh')
+        self.assertEqual(result, (None, pyaudio.paContinue))
+        self.assertEqual(self.stream.read(4), 'abcdefgh')
+
+    def test_read_other_sizes(self):
+        self.capture('abcdefgh')
+        self.capture('ijklmnop')
+        self.assertEqual(self.stream.read(2), 'abcd')
+        self.assertEqual(self.stream.read(5), 'efghijklmn')
+        self.assertEqual(self.stream.leftover, 'op')
+
+    def test_muted(self):
+        self.stream.mute()
+        self.capture('abcdefgh')
+        self.stream.unmute()
+        self.capture('ijklmnop')
+        self.assertEqual(self.stream.read(4), '\x00\x00')
+        self.assertEqual(self.stream.read(4), 'ijklmnop')
+
+    def test_overflow(self):
+        for _ in range(MutableStream.MAX_QUEUED_FRAMES + 3):
+            self.capture('abcdefgh')
+        self.capture('abcdefgh', pyaudio.paInputOverflow)
+        self.capture('abcdefgh', pyaudio.paInputUnderflow)
+        self.assertEqual(self.stream.overflows, 6)
+        self.assertEqual(self.stream.underruns, 1)
+
+    @mock.patch('mycroft.client.speech.mic.monotonic')
+    def test_captured_at(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        # The first sample was captured 50 ms before the callback
+        self.stream.callback('abcdefgh', 4, {'input_buffer_adc_time': 2.0,
+                                             'current_time': 2.05}, 0)
+        self.stream.read(4)
+        self.assertAlmostEqual(self.stream.captured_at, 99.95 + 4 / 16000.0)
+        # Not timed by the host API
+        self.capture('ijklmnop')
+        self.stream.read(2)
+        self.assertEqual(self.stream.captured_at, 100.0 - 2 / 16000.0)
+        mock_monotonic.return_value = 101.0
+        self.capture('qrstuvwx')
+        self.assertEqual(self.stream.read(6), 'mnopqrstuvwx')
+        self.assertEqual(self.stream.captured_at, 101.0)
+
+    def test_inactive_stream(self):
+        self.stream.READ_TIMEOUT = 0.01
+        self.stream.wrapped_stream.is_active.return_value = False
+        self.assertRaises(IOError, self.stream.read, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
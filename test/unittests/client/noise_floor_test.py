@@ -0,0 +1,43 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+from mycroft.client.speech.noise_floor import NoiseFloorEstimator
+
+
+class NoiseFloorEstimatorTest(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(NoiseFloorEstimator(10).level(), 0)
+
+    def test_ignores_speech(self):
+        estimator = NoiseFloorEstimator(100, percentile=20)
+        for i in range(100):
+            # 30% of the chunks are loud speech
+            estimator.update(5000 if i % 10 < 3 else 100 + i % 10)
+        self.assertTrue(100 <= estimator.level() < 110)
+
+    def test_window(self):
+        estimator = NoiseFloorEstimator(10, percentile=0)
+        for _ in range(10):
+            estimator.update(50)
+        # The quiet period slides out of the window as the room gets louder
+        for _ in range(10):
+            estimator.update(300)
+        self.assertEqual(len(estimator), 10)
+        self.assertEqual(estimator.level(), 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+import mock
+
+from mycroft.client.speech.listener import RecognizerLoop
+from mycroft.configuration import ConfigurationManager
+
+
+@mock.patch('mycroft.client.speech.listener.STTFactory')
+@mock.patch('mycroft.client.speech.listener.HotWordFactory')
+@mock.patch('mycroft.client.speech.listener.ResponsiveRecognizer')
+@mock.patch('mycroft.client.speech.listener.MutableMicrophone')
+class RecognizerLoopReloadTest(unittest.TestCase):
+    def tearDown(self):
+        ConfigurationManager.remove_listener(self.loop._on_config_changed)
+        ConfigurationManager.load_defaults()
+
+    def create_loop(self):
+        self.loop = RecognizerLoop()
+        self.loop.producer = mock.Mock()
+        self.loop.producers = [self.loop.producer]
+        self.loop.consumer = mock.Mock()
+        self.loop.reload = mock.Mock()
+        return self.loop
+
+    def update_listener(self, **settings):
+        listener = dict(ConfigurationManager.get()['listener'], **settings)
+        ConfigurationManager.update({'listener': listener})
+
+    def test_unrelated_change(self, mic, recognizer, hotwords, stt):
+        loop = self.create_loop()
+        ConfigurationManager.update({'skills': {'test_setting': 1}})
+        loop.apply_config_changes()
+        self.assertFalse(loop.reload.called)
+        self.assertEquals(hotwords.create_hotword.call_count, 2)
+        self.assertFalse(stt.create.called)
+
+    def test_threshold_change(self, mic, recognizer, hotwords, stt):
+        loop = self.create_loop()
+        self.update_listener(multiplier=2.5)
+        loop.apply_config_changes()
+        self.assertFalse(loop.reload.called)
+        self.assertEquals(hotwords.create_hotword.call_count, 2)
+        config = loop.responsive_recognizer.update_config.call_args[0][0]
+        self.assertEquals(config['multiplier'], 2.5)
+
+    def test_hotword_change(self, mic, recognizer, hotwords, stt):
+        loop = self.create_loop()
+        self.update_listener(wake_word='hey computer')
+        loop.apply_config_changes()
+        self.assertFalse(loop.reload.called)
+        self.assertFalse(loop.responsive_recognizer.update_config.called)
+        self.assertEquals(hotwords.create_hotword.call_count, 4)
+        self.assertEquals(loop.consumer.wakeword_recognizer,
+                          loop.wakeword_recognizer)
+        loop.responsive_recognizer.set_wake_word_recognizer.\
+            assert_called_with(loop.wakeword_recognizer, loop.config)
+
+    def test_stt_change(self, mic, recognizer, hotwords, stt):
+        loop = self.create_loop()
+        stt.create.return_value.streaming = True
+        ConfigurationManager.update({'stt': {'module': 'kaldi'}})
+        loop.apply_config_changes()
+        self.assertFalse(loop.reload.called)
+        self.assertEquals(loop.consumer.stt, stt.create.return_value)
+        self.assertTrue(loop.producer.stream_audio)
+
+    def test_capture_change(self, mic, recognizer, hotwords, stt):
+        loop = self.create_loop()
+        self.update_listener(sample_rate=44100)
+        loop.apply_config_changes()
+        self.assertTrue(loop.reload.called)
@@ -0,0 +1,124 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import audioop
+import json
+import shutil
+import tempfile
+import unittest
+import wave
+
+from os.path import join
+
+from mycroft.client.speech.mic import ResponsiveRecognizer
+from mycroft.client.speech.replay import (
+    ListenerReplay,
+    ReplaySource,
+    score
+)
+
+
+class LoudnessEngine(object):
+    """ Streaming engine detecting any loud chunk as the wake word. """
+    num_phonemes = 10
+    streaming = True
+
+    def update(self, chunk):
+        return audioop.rms(chunk[-2048:], 2) > 1000
+
+    def reset(self):
+        pass
+
+
+def write_wav(filename, seconds, labels=None):
+    """Write quiet audio with loud bursts at the given (start, end)."""
+    samples = ['\x0a\x00'] * int(seconds * 16000)
+    for start, end in labels or []:
+        for i in range(int(start * 16000), int(end * 16000)):
+            samples[i] = '\xd0\x07'
+    wav = wave.open(filename, 'wb')
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(16000)
+    wav.writeframes(''.join(samples))
+    wav.close()
+
+
+class ListenerReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_score(self):
+        latencies, false_accepts = score([1.0, 3.5, 9.5],
+                                         [(0.5, 0.75), (3.0, 3.25), (6, 7)],
+                                         max_latency=2.0)
+        self.assertEqual(latencies, [0.25, 0.25])
+        self.assertEqual(false_accepts, 1)
+
+    def test_source(self):
+        filename = join(self.dir, 'quiet.wav')
+        write_wav(filename, 1.0)
+        source = ReplaySource.from_wav(filename)
+        self.assertEqual(source.duration(), 1.0)
+        source.stream.read(8000)
+        self.assertEqual(source.time(), 0.5)
+        source.stream.read(8000)
+        self.assertRaises(EOFError, source.stream.read, 1024)
+
+    def test_replay(self):
+        labeled = join(self.dir, 'labeled.wav')
+        write_wav(labeled, 10.0, [(3.0, 3.5)])
+        with open(join(self.dir, 'labeled.json'), 'w') as f:
+            json.dump({'wake_words': [{'start': 3.0, 'end': 3.5}]}, f)
+        # A loud burst in a file without wake words is a false accept
+        unlabeled = join(self.dir, 'unlabeled.wav')
+        write_wav(unlabeled, 10.0, [(3.0, 3.5)])
+
+        replay = ListenerReplay(ResponsiveRecognizer(LoudnessEngine()))
+        report = replay.run([labeled, unlabeled])
+
+        files = report['files']
+        self.assertEqual(len(files[0]['detections']), 1)
+        self.assertTrue(3.0 <= files[0]['detections'][0] <= 3.2)
+        self.assertEqual(files[0]['hits'], 1)
+        self.assertEqual(files[1]['false_accepts'], 1)
+
+        summary = report['summary']
+        self.assertEqual(summary['audio_sec'], 20.0)
+        self.assertEqual(summary['recall'], 1.0)
+        self.assertEqual(summary['false_accepts_per_hour'], 180.0)
+        self.assertTrue(summary['realtime_factor'] > 1.0)
+        self.assertTrue(summary['peak_rss_mb'] > 0)
+        json.dumps(report)
+
+    def test_back_to_back(self):
+        # Commands 0.75 s apart, the listener must be ready for the next
+        # wake word as soon as the previous command is recorded
+        filename = join(self.dir, 'commands.wav')
+        commands = [(1.0, 2.6), (3.35, 4.95), (5.7, 7.3)]
+        write_wav(filename, 8.0, commands)
+
+        replay = ListenerReplay(ResponsiveRecognizer(LoudnessEngine()))
+        detections = replay.replay(ReplaySource.from_wav(filename))
+
+        self.assertEqual(len(detections), len(commands))
+        for detected, (start, _) in zip(detections, commands):
+            self.assertTrue(start <= detected <= start + 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
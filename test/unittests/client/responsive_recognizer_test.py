@@ -0,0 +1,217 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+import mock
+from pyee import EventEmitter
+from speech_recognition import AudioSource
+
+from mycroft.client.speech.mic import ResponsiveRecognizer, UtteranceStream
+from mycroft.client.speech.vad import VoiceActivityGate
+
+
+class MockStream(object):
+    def __init__(self, chunks, times=None):
+        self.chunks = chunks
+        self.times = times
+        self.reads = 0
+        self.captured_at = None
+
+    def read(self, chunk_size):
+        self.reads += 1
+        if self.times:
+            self.captured_at = self.times[min(self.reads,
+                                              len(self.times)) - 1]
+        return self.chunks[min(self.reads, len(self.chunks)) - 1]
+
+
+class MockSource(AudioSource):
+    def __init__(self, chunks=None, times=None):
+        self.stream = MockStream(chunks or ['\x01\x00' * 1024], times)
+        self.CHUNK = 1024
+        self.SAMPLE_RATE = 16000
+        self.SAMPLE_WIDTH = 2
+
+
+class StreamingEngine(object):
+    num_phonemes = 10
+    streaming = True
+
+    def __init__(self, trigger_after):
+        self.trigger_after = trigger_after
+        self.chunks = []
+        self.resets = 0
+
+    def update(self, chunk):
+        self.chunks.append(chunk)
+        return len(self.chunks) >= self.trigger_after
+
+    def reset(self):
+        self.resets += 1
+
+    def found_wake_word(self, frame_data):
+        raise AssertionError('windowed decoding used in streaming mode')
+
+
+class ResponsiveRecognizerTest(unittest.TestCase):
+    def create_recognizer(self, engine):
+        recognizer = ResponsiveRecognizer(engine)
+        recognizer.vad = VoiceActivityGate()
+        return recognizer
+
+    def test_streaming_wake_word(self):
+        engine = StreamingEngine(trigger_after=5)
+        recognizer = self.create_recognizer(engine)
+        source = MockSource()
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+
+        recognizer._wait_until_wake_word(source, sec_per_buffer)
+
+        # Every captured chunk is decoded exactly once, the first one
+        # preceded by the silence padding the buffer starts with
+        chunk = source.stream.chunks[0]
+        self.assertEqual(source.stream.reads, 5)
+        self.assertEqual(engine.chunks[0], '\0' * 320 + chunk)
+        self.assertEqual(engine.chunks[1:], [chunk] * 4)
+        self.assertEqual(engine.resets, 1)
+
+    def test_gate_skips_silence(self):
+        engine = StreamingEngine(trigger_after=3)
+        recognizer = ResponsiveRecognizer(engine)
+        quiet = '\x0a\x00' * 1024
+        loud = '\xd0\x07' * 1024
+        source = MockSource([quiet] * 20 + [loud])
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+
+        recognizer._wait_until_wake_word(source, sec_per_buffer)
+
+        self.assertEqual(recognizer.decodes_skipped, 20)
+        self.assertEqual(recognizer.decodes_run, 3)
+        # The decoder got the pre-roll along with the first loud chunk
+        pre_roll = int(recognizer.vad.pre_roll_sec * 16000 * 2)
+        self.assertEqual(engine.chunks[0], '\x0a\x00' * (pre_roll / 2) + loud)
+        self.assertEqual(engine.chunks[1:], [loud, loud])
+
+    def test_threshold_follows_noise_floor(self):
+        engine = StreamingEngine(trigger_after=20)
+        recognizer = self.create_recognizer(engine)
+        # rms energy of 100
+        source = MockSource(['\x64\x00' * 1024])
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+
+        recognizer._wait_until_wake_word(source, sec_per_buffer)
+        self.assertEqual(recognizer.energy_threshold,
+                         100 * recognizer.energy_ratio)
+
+    @mock.patch('mycroft.client.speech.mic.play_wav')
+    def test_listen_without_calibration(self, mock_play_wav):
+        engine = StreamingEngine(trigger_after=1)
+        recognizer = self.create_recognizer(engine)
+        recognizer.adjust_for_ambient_noise = mock.Mock()
+        source = MockSource()
+
+        audio = recognizer.listen(source, EventEmitter())
+
+        self.assertFalse(recognizer.adjust_for_ambient_noise.called)
+        # The first chunk read already went to the wake word engine
+        self.assertEqual(len(engine.chunks), 1)
+        self.assertEqual(len(audio.frame_data),
+                         2 + (source.stream.reads - 1) * 2048)
+        # The latency trace of the utterance starts at the wake word
+        stamps = audio.trace['trace']['stamps']
+        self.assertTrue(stamps['wakeword'] <= stamps['record_end'])
+
+    def test_mic_level_on_bus(self):
+        engine = StreamingEngine(trigger_after=10)
+        recognizer = self.create_recognizer(engine)
+        recognizer.mic_level = mock.Mock()
+        recognizer.mic_level_rate = 2
+        recognizer.emitter = mock.Mock()
+        source = MockSource()
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+
+        recognizer._wait_until_wake_word(source, sec_per_buffer)
+
+        # Every chunk goes to shared memory, the bus only gets a few
+        self.assertEqual(recognizer.mic_level.write.call_count, 10)
+        self.assertEqual(recognizer.emitter.emit.call_count, 1)
+        name, data = recognizer.emitter.emit.call_args[0]
+        self.assertEqual(name, 'recognizer_loop:mic_level')
+        self.assertEqual(data['threshold'], recognizer.energy_threshold)
+
+    @mock.patch('mycroft.client.speech.mic.play_wav')
+    def test_listen_streaming(self, mock_play_wav):
+        engine = StreamingEngine(trigger_after=1)
+        recognizer = self.create_recognizer(engine)
+        source = MockSource()
+        opened = []
+        stream = UtteranceStream(opened.append)
+
+        audio = recognizer.listen(source, EventEmitter(), stream)
+
+        # The stream was opened before recording and got the phrase
+        self.assertEqual(opened, [stream])
+        chunks = list(stream)
+        self.assertEqual(''.join(chunks), audio.frame_data[2:])
+        self.assertEqual(stream.duration(), len(chunks) * 1024 / 16000.0)
+
+    def test_start_listening_sound_left_out(self):
+        engine = StreamingEngine(trigger_after=1)
+        recognizer = self.create_recognizer(engine)
+        beep = '\x10\x27' * 1024
+        source = MockSource([beep] * 2 + ['\x01\x00' * 1024])
+        sec_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+        recognizer.earcons = mock.Mock()
+        recognizer.earcons.play.return_value = 2 * sec_per_buffer
+        recognizer.earcon_tail_sec = 0.0
+
+        # The clock advances one chunk per read
+        with mock.patch('mycroft.client.speech.mic.monotonic',
+                        lambda: source.stream.reads * sec_per_buffer):
+            beep_span = recognizer._confirm_listening()
+            frame_data = recognizer._record_phrase(source, sec_per_buffer,
+                                                   beep=beep_span)
+
+        recognizer.earcons.play.assert_called_with('start_listening')
+        self.assertFalse(beep in frame_data)
+        self.assertTrue(len(frame_data) > 2)
+
+    def test_speech_before_sound_kept(self):
+        engine = StreamingEngine(trigger_after=1)
+        recognizer = self.create_recognizer(engine)
+        speech = '\x20\x03' * 1024
+        beep = '\x10\x27' * 1024
+        sec_per_buffer = float(1024) / 16000
+        # Speech captured before the sound, still queued when it plays
+        times = [10.0 - sec_per_buffer, 10.0, 10.0 + sec_per_buffer,
+                 10.0 + 2 * sec_per_buffer, 10.0 + 3 * sec_per_buffer]
+        source = MockSource([speech] * 2 + [beep] * 2 + ['\x01\x00' * 1024],
+                            times)
+        recognizer.earcons = mock.Mock()
+        recognizer.earcons.play.return_value = 2 * sec_per_buffer
+        recognizer.earcon_tail_sec = 0.0
+
+        with mock.patch('mycroft.client.speech.mic.monotonic',
+                        return_value=10.0):
+            beep_span = recognizer._confirm_listening()
+        frame_data = recognizer._record_phrase(source, sec_per_buffer,
+                                               beep=beep_span)
+
+        self.assertTrue(frame_data[2:].startswith(speech * 2))
+        self.assertFalse(beep in frame_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
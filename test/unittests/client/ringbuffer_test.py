@@ -0,0 +1,58 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+from mycroft.client.speech.ringbuffer import RingBuffer
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_fill(self):
+        buf = RingBuffer(8)
+        self.assertEqual(len(buf), 0)
+        buf.append('abc')
+        buf.append('de')
+        self.assertEqual(len(buf), 5)
+        self.assertFalse(buf.is_full())
+        self.assertEqual(buf.get().tobytes(), 'abcde')
+        self.assertEqual(buf.get_last(2).tobytes(), 'de')
+        self.assertEqual(buf.get_last(20).tobytes(), 'abcde')
+
+    def test_wrap(self):
+        buf = RingBuffer(8)
+        reference = ''
+        for chunk in ['abc', 'def', 'ghi', 'jk', 'lmnop', 'q']:
+            buf.append(chunk)
+            reference = (reference + chunk)[-8:]
+            self.assertEqual(buf.get().tobytes(), reference)
+        self.assertTrue(buf.is_full())
+        self.assertEqual(buf.get_last(3).tobytes(), 'opq')
+
+    def test_large_chunk(self):
+        buf = RingBuffer(4)
+        buf.append('ab')
+        buf.append('0123456789')
+        self.assertEqual(buf.get().tobytes(), '6789')
+
+    def test_clear(self):
+        buf = RingBuffer(4)
+        buf.append('abcdef')
+        buf.clear()
+        self.assertEqual(len(buf), 0)
+        buf.append('xy')
+        self.assertEqual(buf.get().tobytes(), 'xy')
+
+
+if __name__ == '__main__':
+    unittest.main()
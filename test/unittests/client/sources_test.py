@@ -0,0 +1,110 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+from threading import Thread
+
+import mock
+
+from mycroft.client.speech.sources import (
+    AudioSourceFactory,
+    FifoSource,
+    NetworkSource
+)
+
+CHUNK = 160
+
+
+class FifoSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'mic.pcm')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_no_writer(self):
+        with FifoSource(self.path, chunk_size=CHUNK) as source:
+            self.assertEqual(source.stream.read(CHUNK), '\0' * CHUNK * 2)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_read(self):
+        with FifoSource(self.path, chunk_size=CHUNK) as source:
+            # Opens the pipe, the writer can then connect
+            source.stream.read(CHUNK)
+            writer = os.open(self.path, os.O_WRONLY)
+            os.write(writer, 'ab' * (CHUNK + 10))
+            self.assertEqual(source.stream.read(CHUNK), 'ab' * CHUNK)
+            # The rest is padded with silence
+            self.assertEqual(source.stream.read(CHUNK),
+                             'ab' * 10 + '\0' * (CHUNK - 10) * 2)
+            os.close(writer)
+
+    def test_muted(self):
+        with FifoSource(self.path, chunk_size=CHUNK) as source:
+            source.stream.read(CHUNK)
+            writer = os.open(self.path, os.O_WRONLY)
+            os.write(writer, 'ab' * CHUNK)
+            source.mute()
+            self.assertTrue(source.is_muted())
+            self.assertEqual(source.stream.read(CHUNK), '\0' * CHUNK * 2)
+            os.close(writer)
+
+
+class NetworkSourceTest(unittest.TestCase):
+    def setUp(self):
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+
+    def tearDown(self):
+        self.server.close()
+
+    def test_read(self):
+        def send():
+            client, _ = self.server.accept()
+            client.sendall('ab' * CHUNK)
+            client.close()
+        thread = Thread(target=send)
+        thread.start()
+        host, port = self.server.getsockname()
+        with NetworkSource(host, port, chunk_size=CHUNK) as source:
+            self.assertEqual(source.stream.read(CHUNK), 'ab' * CHUNK)
+            # The server went away, reads go on with silence
+            self.assertEqual(source.stream.read(CHUNK), '\0' * CHUNK * 2)
+        thread.join()
+
+    def test_no_server(self):
+        host, port = self.server.getsockname()
+        self.server.close()
+        with NetworkSource(host, port, chunk_size=CHUNK) as source:
+            self.assertEqual(source.stream.read(CHUNK), '\0' * CHUNK * 2)
+
+
+class AudioSourceFactoryTest(unittest.TestCase):
+    @mock.patch('mycroft.client.speech.sources.MutableMicrophone')
+    def test_create(self, mic):
+        source = AudioSourceFactory.create({'type': 'microphone',
+                                            'device_index': 2}, 44100, True)
+        mic.assert_called_with(2, 44100, mute=True)
+        self.assertEqual(source, mic.return_value)
+        source = AudioSourceFactory.create({'type': 'tcp', 'host': 'hub',
+                                            'port': 9000})
+        self.assertEqual(source.address, ('hub', 9000))
+        self.assertRaises(ValueError, AudioSourceFactory.create,
+                          {'type': 'bluetooth'})
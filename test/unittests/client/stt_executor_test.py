@@ -0,0 +1,123 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+from Queue import Queue
+from threading import Event
+
+import mock
+
+from mycroft.client.speech.stt_executor import STTExecutor
+
+
+def blocked(text, event):
+    """ Transcription returning text once event is set. """
+    def execute():
+        event.wait(5)
+        return text
+    return execute
+
+
+class STTExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.results = Queue()
+        self.executors = []
+
+    def tearDown(self):
+        for executor in self.executors:
+            executor.shutdown()
+
+    def create_executor(self, **kwargs):
+        executor = STTExecutor(
+            lambda text, context: self.results.put(text), **kwargs)
+        self.executors.append(executor)
+        return executor
+
+    def test_results_in_order(self):
+        executor = self.create_executor(workers=2, supersede=False)
+        first = Event()
+        executor.submit(blocked('first', first))
+        executor.submit(lambda: 'second')
+        # The second result waits for the first one
+        self.assertTrue(self.results.empty())
+        first.set()
+        self.assertEqual(self.results.get(timeout=5), 'first')
+        self.assertEqual(self.results.get(timeout=5), 'second')
+
+    def test_deadline(self):
+        metrics = mock.Mock()
+        executor = self.create_executor(workers=2, supersede=False,
+                                        deadline_sec=0.2, metrics=metrics)
+        stalled = Event()
+        executor.submit(blocked('stalled', stalled))
+        executor.submit(lambda: 'next', deadline_sec=5)
+        self.assertEqual(self.results.get(timeout=5), 'next')
+        metrics.increment.assert_called_with('stt.expired')
+        stalled.set()
+
+    def test_supersede(self):
+        executor = self.create_executor(workers=2)
+        stalled = Event()
+        executor.submit(blocked('old', stalled))
+        executor.submit(lambda: 'new')
+        self.assertEqual(self.results.get(timeout=5), 'new')
+        stalled.set()
+        self.assertEqual(executor.queue_depth(), 0)
+        self.assertTrue(self.results.empty())
+
+    def test_supersede_same_key(self):
+        executor = self.create_executor(workers=2)
+        first = Event()
+        executor.submit(blocked('kitchen', first), key='kitchen')
+        executor.submit(lambda: 'hall', key='hall')
+        # Requests from another source are not cancelled
+        first.set()
+        self.assertEqual(self.results.get(timeout=5), 'kitchen')
+        self.assertEqual(self.results.get(timeout=5), 'hall')
+
+    def test_queue_depth(self):
+        metrics = mock.Mock()
+        executor = self.create_executor(workers=1, supersede=False,
+                                        metrics=metrics)
+        stalled = Event()
+        executor.submit(blocked('first', stalled))
+        executor.submit(lambda: 'second')
+        self.assertEqual(executor.queue_depth(), 2)
+        metrics.level.assert_called_with('stt.queue_depth', 2)
+        stalled.set()
+        self.results.get(timeout=5)
+        self.results.get(timeout=5)
+        self.assertEqual(executor.queue_depth(), 0)
+
+    def test_failed_request(self):
+        executor = self.create_executor(supersede=False)
+
+        def fail():
+            raise ValueError('engine error')
+        executor.submit(fail)
+        executor.submit(lambda: 'after')
+        self.assertEqual(self.results.get(timeout=5), 'after')
+
+    def test_context(self):
+        results = Queue()
+        executor = STTExecutor(lambda text, context:
+                               results.put((text, context)))
+        self.executors.append(executor)
+        executor.submit(lambda: 'text', context={'trace': 'trace'})
+        self.assertEqual(results.get(timeout=5),
+                         ('text', {'trace': 'trace'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
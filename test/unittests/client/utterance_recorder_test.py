@@ -0,0 +1,133 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+import os
+from os.path import join
+from speech_recognition import AudioData
+
+from mycroft.client.speech.utterance_recorder import UtteranceRecorder
+from mycroft.metrics.trace import start_trace
+
+
+def create_recorder(directory, **config):
+    config['directory'] = directory
+    recorder = UtteranceRecorder(config)
+    # Utterances are put directly, without starting the worker thread
+    recorder.start = mock.Mock()
+    recorder.is_alive = mock.Mock(return_value=True)
+    return recorder
+
+
+def create_audio(seconds=0.5):
+    audio = AudioData('\1\0\2\0' * int(8000 * seconds), 16000, 2)
+    audio.trace = start_trace()
+    return audio
+
+
+class UtteranceRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read_index(self):
+        with open(join(self.dir, UtteranceRecorder.INDEX_FILE)) as f:
+            return [json.loads(line) for line in f]
+
+    def test_record(self):
+        recorder = create_recorder(self.dir)
+        audio = create_audio()
+        recorder.put(audio, 'kitchen')
+        recorder.process()
+        index = self.read_index()
+        self.assertEqual(len(index), 1)
+        entry = index[0]
+        self.assertTrue(entry['file'].startswith('kitchen.'))
+        self.assertEqual(entry['source'], 'kitchen')
+        self.assertEqual(entry['trace_id'], audio.trace['trace']['id'])
+        self.assertAlmostEqual(entry['duration_sec'], 0.5)
+        with open(join(self.dir, entry['file']), 'rb') as f:
+            self.assertEqual(f.read(4), 'fLaC')
+
+    def test_transcript(self):
+        recorder = create_recorder(self.dir)
+        audio = create_audio()
+        recorder.put(audio)
+        recorder.add_transcript(audio.trace, 'what time is it')
+        recorder.process()
+        recorder.process()
+        self.assertEqual(self.read_index()[0]['transcript'],
+                         'what time is it')
+
+    def test_no_transcripts(self):
+        recorder = create_recorder(self.dir, transcripts=False)
+        audio = create_audio()
+        recorder.put(audio)
+        recorder.add_transcript(audio.trace, 'what time is it')
+        self.assertEqual(recorder.queue.qsize(), 1)
+
+    def test_queue_full(self):
+        recorder = create_recorder(self.dir)
+        for _ in range(UtteranceRecorder.MAX_QUEUED_UTTERANCES):
+            self.assertTrue(recorder.put(create_audio()))
+        self.assertFalse(recorder.put(create_audio()))
+
+    def test_size_limit(self):
+        recorder = create_recorder(self.dir)
+        for _ in range(3):
+            recorder.put(create_audio())
+            recorder.process()
+        size = recorder.index[0]['size']
+        # Room for two recordings, the oldest is dropped
+        recorder.max_bytes = 2 * size + size / 2
+        recorder.put(create_audio())
+        recorder.process()
+        files = [entry['file'] for entry in self.read_index()]
+        self.assertEqual(len(files), 2)
+        self.assertEqual(sorted(os.listdir(self.dir)),
+                         sorted(files + [UtteranceRecorder.INDEX_FILE]))
+
+    def test_age_limit(self):
+        recorder = create_recorder(self.dir, max_age_days=1)
+        recorder.put(create_audio())
+        recorder.process()
+        recorder.index[0]['time'] = time.time() - 2 * 24 * 3600
+        old = recorder.index[0]['file']
+        recorder.put(create_audio())
+        recorder.process()
+        self.assertNotIn(old, [e['file'] for e in self.read_index()])
+        self.assertFalse(os.path.exists(join(self.dir, old)))
+
+    def test_index_reloaded(self):
+        recorder = create_recorder(self.dir)
+        recorder.put(create_audio())
+        recorder.process()
+        recorder = create_recorder(self.dir)
+        recorder.put(create_audio())
+        recorder.process()
+        self.assertEqual(len(self.read_index()), 2)
+
+    def test_worker(self):
+        recorder = UtteranceRecorder({'directory': self.dir})
+        recorder.put(create_audio())
+        recorder.stop()
+        self.assertEqual(len(self.read_index()), 1)
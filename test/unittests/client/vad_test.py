@@ -0,0 +1,50 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+from mycroft.client.speech.vad import (
+    VADFactory, VoiceActivityGate, EnergyGate
+)
+
+
+class EnergyGateTest(unittest.TestCase):
+    def setUp(self):
+        self.gate = EnergyGate({'close_ratio': 0.5, 'hangover_sec': 0.3})
+
+    def feed(self, energy):
+        return self.gate.is_open('', energy, 100, 0.1)
+
+    def test_hysteresis(self):
+        self.assertFalse(self.feed(50))
+        self.assertTrue(self.feed(150))
+        # Between the close and open levels the gate stays open
+        for _ in range(10):
+            self.assertTrue(self.feed(80))
+        # and closes after hangover_sec below the close level
+        self.assertTrue(self.feed(10))
+        self.assertTrue(self.feed(10))
+        self.assertFalse(self.feed(10))
+
+    def test_factory(self):
+        self.assertEqual(type(VADFactory.create({'module': 'energy'})),
+                         EnergyGate)
+        self.assertEqual(type(VADFactory.create({'module': 'none'})),
+                         VoiceActivityGate)
+        self.assertEqual(type(VADFactory.create({'module': 'unknown'})),
+                         VoiceActivityGate)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import tarfile
+import tempfile
+import time
+import unittest
+
+import mock
+import os
+from os.path import join
+from speech_recognition import AudioData
+
+from mycroft.client.speech.wake_word_upload import (
+    LocalDirUploader,
+    UploaderFactory,
+    WakeWordUploadQueue
+)
+
+
+def create_queue(directory, uploader, **config):
+    queue = WakeWordUploadQueue(directory, config, uploader)
+    # Samples are put directly, without starting the worker thread
+    queue.start = mock.Mock()
+    return queue
+
+
+class WakeWordUploadQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.spool = tempfile.mkdtemp()
+        self.sink = tempfile.mkdtemp()
+        self.uploader = LocalDirUploader({'directory': self.sink})
+        self.audio = AudioData('\0\0' * 1600, 16000, 2)
+
+    def tearDown(self):
+        shutil.rmtree(self.spool)
+        shutil.rmtree(self.sink)
+
+    def test_factory(self):
+        uploader = UploaderFactory.create({'module': 'local'})
+        self.assertIsInstance(uploader, LocalDirUploader)
+
+    def test_save_only(self):
+        queue = create_queue(self.spool, None)
+        queue.put('hey-mycroft.1', self.audio)
+        queue.process()
+        self.assertEqual(os.listdir(self.spool), ['hey-mycroft.1.wav'])
+
+    def test_batches(self):
+        queue = create_queue(self.spool, self.uploader, batch_size=2)
+        queue.put('ww.1', self.audio)
+        queue.process()
+        # Waiting for a full batch
+        self.assertEqual(os.listdir(self.sink), [])
+
+        queue.put('ww.2', self.audio)
+        queue.process()
+        self.assertEqual(os.listdir(self.spool), [])
+        archives = os.listdir(self.sink)
+        self.assertEqual(len(archives), 1)
+        with tarfile.open(join(self.sink, archives[0])) as archive:
+            self.assertEqual(sorted(archive.getnames()),
+                             ['ww.1.wav', 'ww.2.wav'])
+
+    def test_batch_age(self):
+        queue = create_queue(self.spool, self.uploader, batch_size=10,
+                             batch_sec=0)
+        queue.put('ww.1', self.audio)
+        queue.process()
+        self.assertEqual(len(os.listdir(self.sink)), 1)
+
+    def test_backoff(self):
+        uploader = mock.Mock()
+        uploader.upload.return_value = False
+        queue = create_queue(self.spool, uploader, batch_size=1,
+                             retry_sec=10, max_retry_sec=15)
+        queue.put('ww.1', self.audio)
+        queue.process()
+        self.assertEqual(uploader.upload.call_count, 1)
+        self.assertEqual(queue.retry_sec, 15)
+
+        # Nothing is tried before the retry time
+        queue.process()
+        self.assertEqual(uploader.upload.call_count, 1)
+
+        queue.next_upload = 0
+        uploader.upload.return_value = True
+        queue.process()
+        self.assertEqual(uploader.upload.call_count, 2)
+        self.assertEqual(queue.retry_sec, 10)
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def test_limits(self):
+        # Room for two samples of 3244 bytes
+        queue = create_queue(self.spool, None, max_spool_mb=0.007)
+        now = time.time()
+        for i in range(3):
+            queue.put('ww.%d' % i, self.audio)
+            queue.process()
+            stamp = now - 10 + i
+            os.utime(join(self.spool, 'ww.%d.wav' % i), (stamp, stamp))
+        # The oldest sample was dropped
+        self.assertEqual(sorted(os.listdir(self.spool)),
+                         ['ww.1.wav', 'ww.2.wav'])
+
+        queue.max_age = 0
+        queue.next_scan = 0
+        queue.process()
+        self.assertEqual(os.listdir(self.spool), [])
+
+    @mock.patch('mycroft.client.speech.wake_word_upload.os.listdir',
+                wraps=os.listdir)
+    def test_idle(self, mock_listdir):
+        queue = create_queue(self.spool, self.uploader, batch_size=10,
+                             scan_sec=600)
+        queue.put('ww.1', self.audio)
+        queue.process()
+        scans = mock_listdir.call_count
+        self.assertTrue(scans > 0)
+
+        # Nothing was written, the spool is left alone until scan_sec
+        queue.process()
+        self.assertEqual(mock_listdir.call_count, scans)
+        queue.next_scan = 0
+        queue.process()
+        self.assertTrue(mock_listdir.call_count > scans)
+
+    def test_full_queue(self):
+        queue = create_queue(self.spool, None)
+        for i in range(queue.MAX_QUEUED_SAMPLES):
+            self.assertTrue(queue.put('ww.%d' % i, self.audio))
+        self.assertFalse(queue.put('ww.dropped', self.audio))
+
+
+if __name__ == '__main__':
+    unittest.main()
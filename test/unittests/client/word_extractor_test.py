@@ -0,0 +1,61 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import unittest
+
+import mock
+from speech_recognition import AudioData
+
+from mycroft.client.speech.word_extractor import (
+    SegmentWordExtractor,
+    WordExtractor
+)
+
+# 0.5 s of silence, 1 s of wake word and 0.5 s of speech at 16 kHz
+AUDIO = AudioData('\0' * 16000 + '\1' * 32000 + '\2' * 16000, 16000, 2)
+
+
+class SegmentWordExtractorTest(unittest.TestCase):
+    def test_single_decode(self):
+        recognizer = mock.Mock()
+        recognizer.find_wake_word_segment.return_value = (0.5, 1.5)
+        extractor = SegmentWordExtractor(AUDIO, recognizer, None)
+        extractor.calculate_range()
+        self.assertEqual(extractor.decodes, 1)
+        self.assertEqual((extractor.begin, extractor.end), (16000, 48000))
+        self.assertEqual(extractor.get_audio_data_before().frame_data,
+                         '\0' * 16000 + extractor.silence_data)
+        self.assertEqual(extractor.get_audio_data_after().frame_data,
+                         extractor.silence_data + '\2' * 16000)
+
+    def test_not_found(self):
+        recognizer = mock.Mock()
+        recognizer.find_wake_word_segment.return_value = None
+        extractor = SegmentWordExtractor(AUDIO, recognizer, None)
+        extractor.calculate_range()
+        self.assertEqual((extractor.begin, extractor.end), (0, 64000))
+
+    def test_same_range_as_binary_search(self):
+        recognizer = mock.Mock()
+        recognizer.find_wake_word_segment.return_value = (0.5, 1.5)
+        recognizer.is_recognized.side_effect = (
+            lambda data, metrics: data.count('\1') == 32000)
+        binary = WordExtractor(AUDIO, recognizer, None)
+        binary.calculate_range()
+        segment = SegmentWordExtractor(AUDIO, recognizer, None)
+        segment.calculate_range()
+        self.assertTrue(binary.decodes > 10)
+        precision = int(len(AUDIO.frame_data) * WordExtractor.PRECISION_RATE)
+        self.assertTrue(abs(binary.begin - segment.begin) <= precision)
+        self.assertTrue(abs(binary.end - segment.end) <= precision)
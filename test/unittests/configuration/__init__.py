@@ -151,3 +151,24 @@ class ConfigurationManagerTest(AbstractConfigurationTest):
         ConfigurationManager.load_defaults()
         config = ConfigurationManager.get([self.config_path])
         self.assert_config(config, 'pt-br', 'espeak', 'f1')
+
+    def test_version_and_listeners(self):
+        ConfigurationManager.load_defaults()
+        changes = []
+        listener = (lambda sections, version:
+                    changes.append((sections, version)))
+        ConfigurationManager.add_listener(listener, ['tts'])
+        try:
+            version = ConfigurationManager.version()
+            ConfigurationManager.update({'tts': {'module': 'espeak'}})
+            self.assertEquals(ConfigurationManager.version(), version + 1)
+            self.assertEquals(changes, [({'tts'}, version + 1)])
+
+            # Unchanged values and other sections don't notify
+            ConfigurationManager.update({'tts': {'module': 'espeak'}})
+            ConfigurationManager.update({'test_section': 1})
+            self.assertEquals(ConfigurationManager.version(), version + 2)
+            self.assertEquals(len(changes), 1)
+        finally:
+            ConfigurationManager.remove_listener(listener)
+            ConfigurationManager.load_defaults()
@@ -0,0 +1,163 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import unittest
+
+import mock
+
+from mycroft.messagebus.client.ws import WebsocketClient
+from mycroft.messagebus.codec import (
+    CompactJsonCodec,
+    JsonCodec,
+    MessageCodecFactory,
+    MsgpackCodec
+)
+from mycroft.messagebus.message import Message
+from mycroft.messagebus.service import ws as service
+from test.unittests.messagebus.test_subscription import (
+    create_handler,
+    sent_frames
+)
+
+
+def available_codecs():
+    return [name for name in MessageCodecFactory.CLASSES
+            if MessageCodecFactory.create(name)]
+
+
+class TestCodec(unittest.TestCase):
+    def assertSameMessage(self, first, second):
+        self.assertEqual((first.type, first.data, first.context),
+                         (second.type, second.data, second.context))
+
+    def test_round_trip(self):
+        messages = [
+            Message('speak', {'utterance': u'h\xe9llo'}, {'trace': {}}),
+            Message('some.skill.event', {'value': [1, 2.5, None]}),
+            Message('mycroft.stop', {}, {})
+        ]
+        for name in available_codecs():
+            codec = MessageCodecFactory.create(name)
+            for message in messages:
+                frame = codec.encode(message)
+                self.assertIs(MessageCodecFactory.detect(frame), codec)
+                self.assertSameMessage(codec.decode(frame), message)
+
+    def test_compact(self):
+        message = Message('speak', {'utterance': 'hello'})
+        frame = CompactJsonCodec().encode(message)
+        self.assertEqual(frame, '[1,{"utterance":"hello"}]')
+        self.assertLess(len(frame), len(message.serialize()))
+
+    def test_peek_type(self):
+        json_codec = JsonCodec()
+        compact = CompactJsonCodec()
+        frames = [
+            (json_codec, json_codec.encode(Message('speak', {'type': 'x'}))),
+            (json_codec, '{"data": {"type": "x"}, "type": "speak"}'),
+            (compact, '[1,{"type":"x"}]'),
+            (compact, '["speak",{}]'),
+            (compact, '["sp\\u0065ak",{}]')
+        ]
+        for codec, frame in frames:
+            self.assertEqual(codec.peek_type(frame), 'speak')
+
+    def test_unknown_type_id(self):
+        # From a peer with a longer list of types
+        codec = CompactJsonCodec()
+        for frame in ('[999,{}]', '[-1,{}]'):
+            self.assertRaises(ValueError, codec.decode, frame)
+        self.assertRaises(ValueError, codec.peek_type, '[999,{}]')
+
+    def test_negotiate(self):
+        codec = MessageCodecFactory.negotiate(['unknown', 'compact-json.1'])
+        self.assertIsInstance(codec, CompactJsonCodec)
+        self.assertIsInstance(MessageCodecFactory.negotiate([]), JsonCodec)
+
+    def test_msgpack_missing(self):
+        with mock.patch.dict('sys.modules', {'msgpack': None}):
+            with mock.patch.dict(MessageCodecFactory.codecs, clear=True):
+                self.assertIsNone(
+                    MessageCodecFactory.create(MsgpackCodec.name))
+
+
+class TestTranslation(unittest.TestCase):
+    def setUp(self):
+        self.legacy = create_handler('json')
+        self.compact = create_handler('compact-json.1')
+        service.client_connections[:] = [self.legacy, self.compact]
+
+    def tearDown(self):
+        service.client_connections[:] = []
+
+    def test_translated(self):
+        message = Message('speak', {'utterance': 'hello'})
+        frame = CompactJsonCodec().encode(message)
+        self.compact.on_message(frame)
+        # The sender's format is forwarded as it came
+        self.assertEqual(sent_frames(self.compact), [(1, frame)])
+        (opcode, sent), = sent_frames(self.legacy)
+        self.assertEqual(json.loads(sent)['data'], {'utterance': 'hello'})
+
+    def test_not_decoded(self):
+        service.client_connections.remove(self.legacy)
+        frame = CompactJsonCodec().encode(Message('speak'))
+        with mock.patch.object(CompactJsonCodec, 'decode') as decode:
+            self.compact.on_message(frame)
+            self.assertFalse(decode.called)
+        self.assertEqual(sent_frames(self.compact), [(1, frame)])
+
+    def test_writes_coalesced(self):
+        for utterance in ('one', 'two'):
+            self.legacy.on_message(
+                Message('speak', {'utterance': utterance}).serialize())
+        self.assertEqual(len(sent_frames(self.legacy)), 2)
+        self.assertEqual(self.legacy.stream.write.call_count, 1)
+
+
+class TestClientCodec(unittest.TestCase):
+    def setUp(self):
+        self.client = WebsocketClient(codecs=['compact-json.1'])
+        self.client.client = mock.Mock()
+
+    def test_offered(self):
+        self.assertTrue(self.client.url.endswith('?codecs=compact-json.1'))
+
+    def test_switch_on_connected(self):
+        self.client.emit(Message('speak'))
+        self.assertEqual(json.loads(
+            self.client.client.send.call_args[0][0])['type'], 'speak')
+        self.client.on_message(None, Message(
+            'connected', {'codec': 'compact-json.1'}).serialize())
+        self.client.emit(Message('speak'))
+        self.assertEqual(self.client.client.send.call_args[0][0], '[1,{}]')
+
+    def test_undecodable_dropped(self):
+        handler = mock.Mock()
+        self.client.on('message', handler)
+        self.client.pool = mock.Mock()
+        for frame in ('[999,{}]', '{"type": '):
+            self.client.on_message(None, frame)
+        self.assertFalse(handler.called)
+        self.assertFalse(self.client.pool.apply_async.called)
+        self.client.on_message(None, '[1,{}]')
+        self.assertTrue(handler.called)
+
+    def test_message_handlers_get_json(self):
+        handler = mock.Mock()
+        self.client.on('message', handler)
+        self.client.on_message(None, '[1,{"utterance":"hi"}]')
+        self.assertEqual(json.loads(handler.call_args[0][0])['type'],
+                         'speak')
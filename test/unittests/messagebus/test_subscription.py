@@ -0,0 +1,153 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import struct
+import unittest
+
+import mock
+from pyee import EventEmitter
+
+from mycroft.messagebus.client.ws import WebsocketClient
+from mycroft.messagebus.codec import MessageCodecFactory
+from mycroft.messagebus.message import Message
+from mycroft.messagebus.service import ws as service
+from mycroft.messagebus.subscription import (
+    SUBSCRIBE,
+    UNSUBSCRIBE,
+    Subscription
+)
+
+
+def create_handler(codec_name='json'):
+    """ Service side of a connection, without tornado. """
+    handler = service.WebsocketEventHandler.__new__(
+        service.WebsocketEventHandler)
+    handler.emitter = EventEmitter()
+    handler.subscription = Subscription()
+    handler.codec = MessageCodecFactory.create(codec_name)
+    handler.pending = []
+    handler.ws_connection = mock.Mock()
+    handler.stream = mock.Mock()
+    handler.stream.closed.return_value = False
+    return handler
+
+
+def sent_frames(handler):
+    """ Messages written to the stream, as (opcode, data) """
+    handler.flush()
+    frames = []
+    for call in handler.stream.write.call_args_list:
+        data = call[0][0]
+        while data:
+            opcode = ord(data[0]) & 0xf
+            length = ord(data[1])
+            start = 2
+            if length == 126:
+                length, = struct.unpack('!H', data[2:4])
+                start = 4
+            elif length == 127:
+                length, = struct.unpack('!Q', data[2:10])
+                start = 10
+            frames.append((opcode, data[start:start + length]))
+            data = data[start + length:]
+    return frames
+
+
+def sent_types(handler):
+    return [json.loads(data)['type'] for _, data in sent_frames(handler)]
+
+
+class TestSubscription(unittest.TestCase):
+    def test_everything_until_subscribed(self):
+        subscription = Subscription()
+        self.assertTrue(subscription.matches('speak'))
+        subscription.update(SUBSCRIBE, {})
+        self.assertFalse(subscription.matches('speak'))
+
+    def test_types_and_prefixes(self):
+        subscription = Subscription()
+        subscription.update(SUBSCRIBE, {'types': ['speak'],
+                                        'prefixes': ['enclosure.']})
+        self.assertTrue(subscription.matches('speak'))
+        self.assertTrue(subscription.matches('enclosure.mouth.viseme'))
+        self.assertFalse(subscription.matches('speaker'))
+        self.assertFalse(subscription.matches(None))
+        subscription.update(UNSUBSCRIBE, {'prefixes': ['enclosure.']})
+        self.assertFalse(subscription.matches('enclosure.mouth.viseme'))
+        self.assertTrue(subscription.matches('speak'))
+
+
+class TestRouting(unittest.TestCase):
+    def setUp(self):
+        self.legacy = create_handler()
+        self.subscriber = create_handler()
+        service.client_connections[:] = [self.legacy, self.subscriber]
+
+    def tearDown(self):
+        service.client_connections[:] = []
+
+    def test_route(self):
+        self.subscriber.on_message(
+            Message(SUBSCRIBE, {'types': ['speak']}).serialize())
+        for message_type in ('speak', 'enclosure.mouth.viseme'):
+            self.legacy.on_message(Message(message_type).serialize())
+        self.assertEqual(sent_types(self.legacy),
+                         ['speak', 'enclosure.mouth.viseme'])
+        self.assertEqual(sent_types(self.subscriber), ['speak'])
+
+
+class TestClientSubscription(unittest.TestCase):
+    def create_client(self, subscribe=True):
+        client = WebsocketClient(subscribe=subscribe)
+        client.emit = mock.Mock()
+        return client
+
+    def sent(self, client):
+        return [(call[0][0].type, call[0][0].data)
+                for call in client.emit.call_args_list]
+
+    def test_derived_from_handlers(self):
+        client = self.create_client()
+        handler = mock.Mock()
+        client.on('speak', handler)
+        client.on('speak', mock.Mock())
+        client.once('mycroft.skills.loaded', mock.Mock())
+        client.on('message', mock.Mock())
+        self.assertEqual(self.sent(client), [
+            (SUBSCRIBE, {'types': ['speak']}),
+            (SUBSCRIBE, {'types': ['mycroft.skills.loaded']})
+        ])
+        client.emit.reset_mock()
+        client.on_open(None)
+        self.assertEqual(self.sent(client), [
+            (SUBSCRIBE, {'types': ['mycroft.skills.loaded', 'speak']})
+        ])
+
+    def test_unsubscribe_last_handler(self):
+        client = self.create_client()
+        first, second = mock.Mock(), mock.Mock()
+        client.on('speak', first)
+        client.on('speak', second)
+        client.remove('speak', first)
+        client.emit.reset_mock()
+        client.remove_all_listeners('speak')
+        self.assertEqual(self.sent(client),
+                         [(UNSUBSCRIBE, {'types': ['speak']})])
+
+    def test_legacy(self):
+        client = self.create_client(subscribe=False)
+        client.on('speak', mock.Mock())
+        client.on_open(None)
+        self.assertEqual(self.sent(client), [])
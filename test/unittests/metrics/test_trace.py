@@ -0,0 +1,120 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import json
+import shutil
+import tempfile
+import unittest
+
+import mock
+from os.path import join
+
+from mycroft.messagebus.message import Message
+from mycroft.metrics.trace import (
+    LatencyHistogram,
+    TraceCollector,
+    monotonic,
+    stamp,
+    start_trace
+)
+
+
+def traced(message_type, trace_id, **stamps):
+    return Message(message_type, {},
+                   {'trace': {'id': trace_id, 'stamps': stamps}})
+
+
+class TestTrace(unittest.TestCase):
+    def test_monotonic(self):
+        first = monotonic()
+        self.assertTrue(monotonic() >= first)
+
+    def test_stamp(self):
+        context = start_trace('wakeword')
+        stamped = stamp(context, 'record_end')
+        self.assertEqual(stamped['trace']['id'], context['trace']['id'])
+        self.assertEqual(sorted(stamped['trace']['stamps']),
+                         ['record_end', 'wakeword'])
+        # The original context is left unchanged
+        self.assertEqual(list(context['trace']['stamps']), ['wakeword'])
+        # The first time a step is reached is kept
+        again = stamp(stamped, 'record_end')
+        self.assertEqual(again['trace']['stamps']['record_end'],
+                         stamped['trace']['stamps']['record_end'])
+
+    def test_stamp_without_trace(self):
+        self.assertEqual(stamp(None, 'speak'), {})
+        self.assertEqual(stamp({'target': 'cli'}, 'speak'),
+                         {'target': 'cli'})
+
+    def test_histogram(self):
+        histogram = LatencyHistogram()
+        self.assertIsNone(histogram.percentile(50))
+        for seconds in [0.005, 0.2, 0.2, 0.3, 20.0]:
+            histogram.add(seconds)
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.counts, [1, 0, 0, 0, 2, 1, 0, 0, 0, 0, 1])
+        self.assertEqual(histogram.percentile(50), 0.25)
+        self.assertEqual(histogram.percentile(100), 20.0)
+
+
+class TestTraceCollector(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dump_file = join(self.directory, 'trace.json')
+        self.emitter = mock.Mock()
+        self.collector = TraceCollector(self.emitter, self.dump_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_stages(self):
+        collector = self.collector
+        collector.handle_message(traced('recognizer_loop:utterance', 'a',
+                                        wakeword=1.0, record_end=2.0,
+                                        utterance=2.5))
+        collector.handle_message(traced('mycroft.skill.handler.start', 'a',
+                                        intent=2.6, handler_start=2.7))
+        collector.handle_message(traced('speak', 'a', speak=2.8))
+        collector.handle_message(traced('recognizer_loop:audio_output_start',
+                                        'a', tts_synthesized=3.0,
+                                        audio_output_start=3.1))
+        # Repeated messages of a trace don't count twice
+        collector.handle_message(traced('speak', 'a', speak=4.0))
+        # Untraced messages are ignored
+        collector.handle_message(Message('speak', {}))
+
+        stats = collector.stats()
+        self.assertEqual(stats['capture']['count'], 1)
+        self.assertAlmostEqual(stats['capture']['mean_sec'], 1.0)
+        self.assertAlmostEqual(stats['stt']['mean_sec'], 0.5)
+        self.assertAlmostEqual(stats['intent']['mean_sec'], 0.1)
+        self.assertAlmostEqual(stats['tts']['mean_sec'], 0.2)
+        self.assertAlmostEqual(stats['first_audio']['mean_sec'], 1.1)
+        self.assertEqual(stats['handler']['count'], 0)
+
+        with open(self.dump_file) as f:
+            self.assertEqual(json.load(f)['stages']['stt']['count'], 1)
+
+    def test_get(self):
+        self.collector.handle_get(Message('mycroft.trace.get'))
+        message = self.emitter.emit.call_args[0][0]
+        self.assertEqual(message.type, 'mycroft.trace.stats')
+        self.assertIn('first_audio', message.data['stages'])
+
+    def test_max_traces(self):
+        collector = TraceCollector(self.emitter, max_traces=2)
+        for trace_id in 'abc':
+            collector.add(trace_id, {'wakeword': 1.0})
+        self.assertEqual(list(collector.traces), ['b', 'c'])
@@ -20,6 +20,7 @@ import mock
 from adapt.intent import IntentBuilder
 from os.path import join, dirname, abspath
 from re import error
+from threading import Event, Thread
 
 from mycroft.configuration import ConfigurationManager
 from mycroft.messagebus.message import Message
@@ -394,6 +395,28 @@ class MycroftSkillTest(unittest.TestCase):
         self.assertEqual(s.location_pretty, None)
         self.assertEqual(s.location_timezone, None)
 
+    def test_handler_context_per_thread(self):
+        emitter = mock.Mock()
+        s = ConcurrentSkill()
+        s.bind(emitter)
+        s.initialize()
+        handlers = dict(s.events)
+        slow_thread = Thread(target=handlers['slow'],
+                             args=(Message('slow', context={'id': 1}),))
+        slow_thread.start()
+        s.started.wait(5)
+        # Another request of the skill handled meanwhile
+        handlers['fast'](Message('fast', context={'id': 2}))
+        s.finished.set()
+        slow_thread.join()
+
+        spoken = dict((m.data['utterance'], m.context)
+                      for (m,), _ in emitter.emit.call_args_list
+                      if m.type == 'speak')
+        self.assertEqual(spoken, {'slow': {'id': 1}, 'fast': {'id': 2}})
+        # Not handling anything on this thread any more
+        self.assertIsNone(s.handler_context)
+
 
 class TestSkill1(MycroftSkill):
     """ Test skill for normal intent builder syntax """
@@ -444,3 +467,26 @@ class TestSkill4(MycroftSkill):
 
     def stop(self):
         pass
+
+
+class ConcurrentSkill(MycroftSkill):
+    """ Test skill with a handler running while another one waits """
+    def __init__(self):
+        super(ConcurrentSkill, self).__init__()
+        self.started = Event()
+        self.finished = Event()
+
+    def initialize(self):
+        self.add_event('slow', self.handle_slow)
+        self.add_event('fast', self.handle_fast)
+
+    def handle_slow(self, message):
+        self.started.set()
+        self.finished.wait(5)
+        self.speak('slow')
+
+    def handle_fast(self, message):
+        self.speak('fast')
+
+    def stop(self):
+        pass
@@ -0,0 +1,78 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import tempfile
+import unittest
+
+import os
+from os.path import join
+
+from mycroft.stt.grammar import CommandGrammar
+
+
+class TestCommandGrammar(unittest.TestCase):
+    def test_intent_lines(self):
+        grammar = CommandGrammar()
+        grammar.add_intent_line('(turn|switch) off (the|) lights')
+        grammar.add_intent_line('Stop!')
+        # Entity slots and unbalanced lines can't be constrained
+        grammar.add_intent_line('set a timer for {duration}')
+        grammar.add_intent_line('(pause the music')
+        grammar.add_intent_line('# comment')
+        self.assertEqual(sorted(grammar.sentences),
+                         ['( turn | switch ) off [ the ] lights', 'stop'])
+        self.assertEqual(grammar.words(),
+                         {'turn', 'switch', 'off', 'the', 'lights', 'stop'})
+
+    def test_vocabulary(self):
+        grammar = CommandGrammar()
+        grammar.add_vocabulary('Volume')
+        version = grammar.version
+        grammar.add_vocabulary('volume')
+        self.assertEqual(grammar.version, version)
+        grammar.add_vocabulary('turn up')
+        self.assertEqual(grammar.phrases, {'volume', 'turn up'})
+        self.assertEqual(grammar.version, version + 1)
+
+    def test_to_jsgf(self):
+        grammar = CommandGrammar()
+        self.assertIsNone(grammar.to_jsgf())
+        grammar.add_vocabulary('volume')
+        grammar.add_vocabulary('up')
+        grammar.add_intent_line('(pause|stop) music')
+        grammar.add_intent_line('play jazz')
+        jsgf = grammar.to_jsgf({'volume', 'up', 'pause', 'stop', 'music'})
+        self.assertIn('<phrase> = up | volume;', jsgf)
+        self.assertIn('( ( pause | stop ) music )', jsgf)
+        # Sentences with words missing from the dictionary are left out
+        self.assertNotIn('jazz', jsgf)
+        self.assertTrue(jsgf.startswith('#JSGF V1.0;'))
+        self.assertIn('public <command> =', jsgf)
+
+    def test_load_skills(self):
+        directory = tempfile.mkdtemp()
+        try:
+            vocab_dir = join(directory, 'skill-volume', 'vocab', 'en-us')
+            os.makedirs(vocab_dir)
+            with open(join(vocab_dir, 'Volume.voc'), 'w') as f:
+                f.write('volume|loudness\n')
+            with open(join(vocab_dir, 'mute.intent'), 'w') as f:
+                f.write('mute (the|) sound\n')
+            grammar = CommandGrammar()
+            grammar.load_skills(directory, 'en-us')
+            self.assertEqual(grammar.phrases, {'volume', 'loudness'})
+            self.assertEqual(list(grammar.sentences), ['mute [ the ] sound'])
+        finally:
+            shutil.rmtree(directory)
@@ -12,12 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import os
+import tempfile
+import time
 import unittest
 
 import mock
+from speech_recognition import AudioData, AudioFile
 
 import mycroft.stt
 from mycroft.configuration import ConfigurationManager
+from mycroft.stt.grammar import CommandGrammar
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'client', 'data')
 
 
 class TestSTT(unittest.TestCase):
@@ -96,9 +104,32 @@ class TestSTT(unittest.TestCase):
         mock_get.return_value = config
 
         stt = mycroft.stt.MycroftSTT()
-        audio = mock.MagicMock()
+        audio = AudioData('\0\0' * 1600, 16000, 2)
         stt.execute(audio, 'en-us')
         self.assertTrue(mycroft.stt.STTApi.called)
+        flac_data = stt.api.stt.call_args[0][0]
+        self.assertEqual(flac_data[:4], 'fLaC')
+
+    @mock.patch.object(ConfigurationManager, 'get')
+    def test_mycroft_stt_retry(self, mock_get):
+        mycroft.stt.STTApi = mock.MagicMock()
+        config = {'stt': {
+                 'module': 'mycroft',
+                 'mycroft': {'uri': 'https://test.com'}
+            },
+            'lang': 'en-US'
+        }
+        mock_get.return_value = config
+
+        stt = mycroft.stt.MycroftSTT()
+        stt.api.stt.side_effect = [Exception('rejected'), ['text']]
+        audio = AudioData('\0\0' * 4410, 44100, 2)
+        self.assertEqual(stt.execute(audio, 'en-us'), 'text')
+        # Sent again at the recorded rate
+        self.assertEqual(stt.api.stt.call_count, 2)
+        first = stt.api.stt.call_args_list[0][0][0]
+        second = stt.api.stt.call_args_list[1][0][0]
+        self.assertNotEqual(first, second)
 
     @mock.patch.object(ConfigurationManager, 'get')
     def test_google_stt(self, mock_get):
@@ -169,3 +200,240 @@ class TestSTT(unittest.TestCase):
         audio = mock.MagicMock()
         stt = mycroft.stt.KaldiSTT()
         self.assertEquals(stt.execute(audio), 'text')
+
+    @mock.patch.object(ConfigurationManager, 'get')
+    def test_stream_fallback(self, mock_get):
+        mycroft.stt.Recognizer = mock.MagicMock
+        config = {'stt': {
+                 'module': 'google',
+                 'google': {'credential': {'token': 'FOOBAR'}},
+            },
+            "lang": "en-US"
+        }
+        mock_get.return_value = config
+
+        stt = mycroft.stt.GoogleSTT()
+        self.assertFalse(stt.streaming)
+        stream = stt.start_stream(16000, 2)
+        self.assertIsNone(stream.feed('\x01\x00'))
+        stream.feed('\x02\x00')
+        stream.finish()
+
+        # The buffered audio went through execute()
+        audio = stt.recognizer.recognize_google.call_args[0][0]
+        self.assertEqual(audio.frame_data, '\x01\x00\x02\x00')
+        self.assertEqual(audio.sample_rate, 16000)
+
+    @mock.patch('mycroft.stt.post')
+    @mock.patch.object(ConfigurationManager, 'get')
+    def test_kaldi_stream(self, mock_get, mock_post):
+        mycroft.stt.Recognizer = mock.MagicMock
+        config = {'stt': {
+                 'module': 'kaldi',
+                 'kaldi': {'uri': 'https://test.com', 'stream': True},
+            },
+            "lang": "en-US"
+        }
+        mock_get.return_value = config
+        uploaded = []
+
+        def post(uri, data, headers):
+            # Consume the body like requests does for chunked uploads
+            uploaded.extend(data)
+            response = mock.MagicMock()
+            response.json.return_value = {
+                'hypotheses': [{'utterance': 'text'}]
+            }
+            return response
+        mock_post.side_effect = post
+
+        stt = mycroft.stt.KaldiSTT()
+        self.assertTrue(stt.streaming)
+        stream = stt.start_stream(16000, 2)
+        stream.feed('\x01\x00')
+        stream.feed('\x02\x00')
+        self.assertEquals(stream.finish(), 'text')
+        self.assertEqual(uploaded, ['\x01\x00', '\x02\x00'])
+        headers = mock_post.call_args[1]['headers']
+        self.assertIn('rate=(int)16000', headers['Content-Type'])
+
+    @mock.patch('mycroft.stt.post')
+    @mock.patch.object(ConfigurationManager, 'get')
+    def test_kaldi_overlapping_streams(self, mock_get, mock_post):
+        mycroft.stt.Recognizer = mock.MagicMock
+        config = {'stt': {
+                 'module': 'kaldi',
+                 'kaldi': {'uri': 'https://test.com', 'stream': True},
+            },
+            "lang": "en-US"
+        }
+        mock_get.return_value = config
+
+        def post(uri, data, headers):
+            # Answer with the audio uploaded in this request
+            response = mock.MagicMock()
+            response.json.return_value = {
+                'hypotheses': [{'utterance': ' '.join(data)}]
+            }
+            return response
+        mock_post.side_effect = post
+
+        stt = mycroft.stt.KaldiSTT()
+        first = stt.start_stream(16000, 2)
+        first.feed('one')
+        # A second utterance starts before the first is finished
+        second = stt.start_stream(16000, 2)
+        second.feed('two')
+        first.feed('three')
+        self.assertEquals(first.finish(), 'one three')
+        second.feed('four')
+        self.assertEquals(second.finish(), 'two four')
+
+    @mock.patch.object(ConfigurationManager, 'get')
+    def test_hedged_stt(self, mock_get):
+        config = {'stt': {
+                 'module': 'hedged',
+                 'hedged': {'primary': 'slow', 'secondary': 'fast',
+                            'min_delay_sec': 0.05, 'max_delay_sec': 0.1},
+                 'slow': {'delay': 1.0},
+                 'fast': {'delay': 0}
+            },
+            "lang": "en-US"
+        }
+        mock_get.return_value = config
+
+        class DelayedSTT(mycroft.stt.STT):
+            def execute(self, audio, language=None):
+                time.sleep(self.config['delay'])
+                return 'text from ' + str(self.config['delay'])
+
+        classes = {'slow': DelayedSTT, 'fast': DelayedSTT}
+        with mock.patch.dict(mycroft.stt.STTFactory.CLASSES, classes):
+            stt = mycroft.stt.STTFactory.create()
+        self.assertEquals(type(stt), mycroft.stt.HedgedSTT)
+        # Without latency statistics the longest delay is used
+        self.assertEqual(stt.hedge_delay(), 0.1)
+
+        # The secondary answers first once the hedge delay has passed
+        self.assertEqual(stt.execute(mock.Mock()), 'text from 0')
+        self.assertTrue(stt.secondary_stats.percentile(50) < 0.1)
+
+        # A fast primary is used without hedging
+        stt.primary.config = {'delay': 0.01}
+        stt.secondary = mock.Mock()
+        self.assertEqual(stt.execute(mock.Mock()), 'text from 0.01')
+        self.assertFalse(stt.secondary.execute.called)
+
+    def test_latency_stats(self):
+        stats = mycroft.stt.LatencyStats(window=10)
+        self.assertIsNone(stats.percentile(95))
+        for i in range(20):
+            stats.add(i)
+        # Only the last 10 latencies count
+        self.assertEqual(stats.percentile(0), 10)
+        self.assertEqual(stats.percentile(95), 19)
+
+    @mock.patch.object(ConfigurationManager, 'get')
+    def test_pocketsphinx_stt(self, mock_get):
+        mock_get.return_value = {
+            'stt': {
+                'module': 'pocketsphinx',
+                'pocketsphinx': {'fallback': 'remote', 'max_sec': 1.0,
+                                 'min_confidence': 0.5, 'skills_dirs': []}
+            },
+            'lang': 'en-US'
+        }
+        remote = mock.Mock()
+        remote.return_value.execute.return_value = 'remote text'
+        with mock.patch.dict(mycroft.stt.STTFactory.CLASSES,
+                             {'remote': remote}):
+            stt = mycroft.stt.STTFactory.create()
+        self.assertEquals(type(stt), mycroft.stt.PocketsphinxSTT)
+        stt.transcribe = mock.Mock(return_value=('stop', 0.9))
+        short = AudioData('\0\0' * 8000, 16000, 2)
+
+        # Confident matches of short utterances stay local
+        self.assertEqual(stt.execute(short), 'stop')
+        self.assertFalse(remote.return_value.execute.called)
+
+        # Others are escalated
+        stt.transcribe.return_value = ('stop', 0.1)
+        self.assertEqual(stt.execute(short), 'remote text')
+        stt.transcribe.reset_mock()
+        self.assertEqual(stt.execute(AudioData('\0\0' * 32000, 16000, 2)),
+                         'remote text')
+        self.assertFalse(stt.transcribe.called)
+        stt.transcribe.side_effect = Exception
+        self.assertEqual(stt.execute(short), 'remote text')
+
+    @mock.patch.object(ConfigurationManager, 'get')
+    def test_pocketsphinx_phone_loop(self, mock_get):
+        mock_get.return_value = {
+            'stt': {
+                'module': 'pocketsphinx',
+                'pocketsphinx': {'fallback': 'remote', 'skills_dirs': []}
+            },
+            'lang': 'en-US'
+        }
+        remote = mock.Mock()
+        remote.return_value.execute.return_value = 'remote text'
+        with mock.patch.dict(mycroft.stt.STTFactory.CLASSES,
+                             {'remote': remote}):
+            stt = mycroft.stt.STTFactory.create()
+        stt.grammar = CommandGrammar()
+        stt.grammar.add_vocabulary('stop')
+        decoder = mock.Mock()
+        decoder.hyp.return_value.hypstr = 'stop'
+        decoder.hyp.return_value.best_score = -5000
+        decoder.n_frames.return_value = 100
+        decoder.get_logmath.return_value.exp.return_value = 1.0
+        stt.create_decoder = mock.Mock(return_value=decoder)
+        phones = mock.Mock()
+        stt.create_phone_decoder = mock.Mock(return_value=phones)
+
+        # The phone loop scores far better, even though the posterior is
+        # high
+        phones.hyp.return_value.best_score = -4000
+        self.assertEqual(stt.execute(AudioData('\0\0' * 8000, 16000, 2)),
+                         'remote text')
+        self.assertEqual(stt.transcribe(AudioData('\0\0', 16000, 2)),
+                         (None, 0.0))
+        # Within max_score_gap
+        phones.hyp.return_value.best_score = -5500
+        self.assertEqual(stt.execute(AudioData('\0\0' * 8000, 16000, 2)),
+                         'stop')
+        stt.max_score_gap = 20
+        phones.hyp.return_value.best_score = -4000
+        self.assertEqual(stt.execute(AudioData('\0\0' * 8000, 16000, 2)),
+                         'stop')
+        self.assertEqual(stt.create_phone_decoder.call_count, 1)
+
+    @mock.patch.object(ConfigurationManager, 'get')
+    def test_pocketsphinx_out_of_grammar(self, mock_get):
+        (fd, dict_name) = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as f:
+            f.write('stop S T AA P\n')
+        self.addCleanup(os.remove, dict_name)
+        mock_get.return_value = {
+            'stt': {
+                'module': 'pocketsphinx',
+                'pocketsphinx': {'fallback': 'remote', 'max_sec': 10.0,
+                                 'dict': dict_name, 'skills_dirs': []}
+            },
+            'lang': 'en-US'
+        }
+        with mock.patch.dict(mycroft.stt.STTFactory.CLASSES,
+                             {'remote': mock.Mock()}):
+            stt = mycroft.stt.STTFactory.create()
+        stt.grammar = CommandGrammar()
+        stt.grammar.add_vocabulary('stop')
+
+        def transcribe(name):
+            with AudioFile(os.path.join(DATA_DIR, name)) as source:
+                audio = AudioData(source.stream.read(), source.SAMPLE_RATE,
+                                  source.SAMPLE_WIDTH)
+            return stt.transcribe(audio)[0]
+
+        self.assertEqual(transcribe('stop.wav'), 'stop')
+        # Free speech is not forced onto the only command
+        self.assertIsNone(transcribe('weather_mycroft.wav'))
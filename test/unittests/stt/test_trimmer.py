@@ -0,0 +1,65 @@
+# Copyright 2017 Mycroft AI Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import math
+import struct
+import unittest
+
+import mock
+from speech_recognition import AudioData
+
+from mycroft.stt.trimmer import TrimmedAudioData, UtteranceTrimmer
+
+
+def tone(num_samples, amplitude=8000):
+    samples = [int(amplitude * math.sin(i * 0.05))
+               for i in range(num_samples)]
+    return struct.pack('<%dh' % num_samples, *samples)
+
+
+class UtteranceTrimmerTest(unittest.TestCase):
+    def test_trim_silence(self):
+        trimmer = UtteranceTrimmer(16000, 2, margin_sec=0.1)
+        silence = '\0\0' * 1024
+        for _ in range(10):
+            trimmer.add(silence, False)
+        trimmer.add(tone(1024), True)
+        trimmer.add(silence, False)
+        trimmer.add(tone(1024), True)
+        for _ in range(10):
+            trimmer.add(silence, False)
+
+        # 0.1 s margins around the speech, including the pause inside
+        trimmed = trimmer.finish()
+        self.assertEqual(len(trimmed), 2 * (1600 + 3 * 1024 + 1600))
+
+    def test_resample(self):
+        trimmer = UtteranceTrimmer(48000, 2)
+        trimmer.add(tone(4800), True)
+        self.assertEqual(len(trimmer.finish()), 2 * 1600)
+
+    @mock.patch.object(AudioData, 'get_flac_data')
+    def test_trimmed_audio_data(self, mock_get_flac_data):
+        audio = TrimmedAudioData(tone(3200), 16000, 2, tone(1600), 16000)
+        flac_data = audio.get_flac_data()
+        self.assertIs(flac_data, mock_get_flac_data.return_value)
+        # Encoded once, from the trimmed audio
+        self.assertIs(audio.get_flac_data(convert_rate=16000), flac_data)
+        self.assertEqual(mock_get_flac_data.call_count, 1)
+        # Other rates are encoded from the whole recording
+        audio.get_flac_data(convert_rate=8000)
+        mock_get_flac_data.assert_called_with(8000, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import time
 import unittest
 from shutil import rmtree
 
@@ -41,6 +42,18 @@ class TestSignals(unittest.TestCase):
         # Check that the signal is removed after use
         self.assertFalse(isfile('/tmp/mycroft/ipc/signal/test_signal'))
 
+    def test_signal_from_other_process(self):
+        self.assertFalse(check_for_signal('test_signal'))
+        # Create the file directly, like another process would
+        with open('/tmp/mycroft/ipc/signal/test_signal', 'w'):
+            pass
+        for _ in range(100):
+            if check_for_signal('test_signal', -1):
+                break
+            time.sleep(0.01)
+        self.assertTrue(check_for_signal('test_signal'))
+        self.assertFalse(check_for_signal('test_signal'))
+
 
 if __name__ == "__main__":
     unittest.main()